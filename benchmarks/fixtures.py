@@ -0,0 +1,139 @@
+# Copyright (C) 2014 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+"""
+Synthetic inputs for the benchmarks: prefixes of generated text and binary files,
+throwaway recipe metadata and large variant pinnings. Nothing here needs the network.
+"""
+
+import os
+import random
+import shutil
+import sys
+from collections import defaultdict
+
+from conda_build.config import Config
+from conda_build.metadata import MetaData
+from conda_build.variants import get_default_variant
+
+
+def make_prefix(prefix, text_files=400, binary_files=100, size=16 * 1024, seed=0):
+    """
+    Fill ``prefix`` with text and binary files, half of which embed ``prefix``.
+    Returns the prefix-relative paths.
+    """
+    rng = random.Random(seed)
+    encoded = prefix.encode()
+    files = []
+    for i in range(text_files):
+        path = os.path.join("share", f"pkg{i % 10}", f"file{i}.txt")
+        line = b"some ordinary text, nothing to see here\n"
+        data = bytearray(line * (size // len(line)))
+        if i % 2:
+            data[len(data) // 2 : len(data) // 2] = b"prefix=" + encoded + b"/lib\n"
+        files.append(path)
+        _write(prefix, path, data)
+    for i in range(binary_files):
+        path = os.path.join("lib", f"lib{i}.so")
+        data = bytearray(rng.randbytes(size))
+        if i % 2:
+            data[size // 2 : size // 2] = encoded + b"/lib\0"
+        files.append(path)
+        _write(prefix, path, data)
+    return files
+
+
+def _write(prefix, path, data):
+    path = os.path.join(prefix, path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def make_metadata(croot, name="bench"):
+    """Metadata of a minimal recipe building into ``croot``."""
+    config = Config(
+        croot=croot,
+        anaconda_upload=False,
+        verbose=False,
+        activate=False,
+        debug=False,
+        test_run_post=False,
+    )
+    config.variant = get_default_variant(config)
+    config.variants = [config.variant]
+    d = defaultdict(dict)
+    d["package"]["name"] = name
+    d["package"]["version"] = "1.0"
+    d["build"]["number"] = "0"
+    d["requirements"]["build"] = []
+    d["requirements"]["run"] = []
+    d["about"]["license"] = "BSD-3-Clause"
+    d["about"]["summary"] = "a benchmark package"
+    return MetaData.fromdict(d, config=config)
+
+
+def make_pinning(keys=300, varying=6, values=3, zipped=4):
+    """
+    A conda-forge sized pinning of ``keys`` variables. The first ``varying`` of them
+    have ``values`` versions each (the first ``zipped`` zipped in pairs), the others one.
+    """
+    spec = {
+        f"lib{i}": [f"{i}.{j}" for j in range(values if i < varying else 1)]
+        for i in range(keys)
+    }
+    spec["zip_keys"] = [[f"lib{i}", f"lib{i + 1}"] for i in range(0, zipped, 2)]
+    spec["pin_run_as_build"] = {
+        f"lib{i}": {"max_pin": "x.x"} for i in range(0, keys, 7)
+    }
+    return spec
+
+
+def make_recipe_text(keys=300, used=40, lines=2000):
+    """A long meta.yaml-like text with selectors, jinja and requirements on ``used`` keys."""
+    out = [
+        "package:",
+        "  name: bench",
+        "  version: 1.0",
+        "requirements:",
+        "  host:",
+    ]
+    out += [f"    - lib{i} {{{{ lib{i} }}}}" for i in range(0, keys, keys // used)]
+    out += ["  run:"]
+    out += [f"    - lib{i}" for i in range(0, keys, keys // used)]
+    out += ["test:", "  commands:"]
+    selectors = ["linux", "osx", "win", "py>=38", "not win", "aarch64"]
+    for i in range(lines):
+        selector = selectors[i % len(selectors)]
+        out.append(f"    - echo line {i}  # [{selector}]")
+    return "\n".join(out) + "\n"
+
+
+def make_elf_prefix(prefix, limit=50):
+    """
+    Populate ``prefix`` with copies of the running interpreter and the shared libraries
+    next to it, so that their DT_NEEDED entries resolve inside ``prefix``.
+    Returns the paths of the copies, or an empty list when none were found.
+    """
+    lib_dir = os.path.join(sys.base_prefix, "lib")
+    libs = sorted(
+        entry.path
+        for entry in os.scandir(lib_dir)
+        if ".so" in entry.name and entry.is_file(follow_symlinks=False)
+    )[:limit]
+    if not libs:
+        return []
+    paths = []
+    os.makedirs(os.path.join(prefix, "lib"), exist_ok=True)
+    os.makedirs(os.path.join(prefix, "bin"), exist_ok=True)
+    for lib in libs:
+        paths.append(shutil.copy2(lib, os.path.join(prefix, "lib")))
+    for link in os.scandir(lib_dir):
+        # the sonames the binaries link against
+        if link.is_symlink() and os.path.realpath(link.path) in libs:
+            os.symlink(
+                os.path.basename(os.path.realpath(link.path)),
+                os.path.join(prefix, "lib", link.name),
+            )
+    executable = os.path.join(prefix, "bin", "python")
+    paths.append(shutil.copy2(os.path.realpath(sys.executable), executable))
+    return paths
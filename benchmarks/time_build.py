@@ -0,0 +1,84 @@
+# Copyright (C) 2014 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+
+from conda_build import build, utils
+from conda_build.config import CondaPkgFormat
+
+from .fixtures import make_metadata, make_prefix
+
+
+class TimePrefixFiles:
+    """Prefix detection, rewriting and paths.json generation over a generated prefix."""
+
+    # the files are modified in place, so every sample needs a fresh prefix
+    number = 1
+    repeat = 10
+    timeout = 300
+
+    def setup(self):
+        self.croot = tempfile.mkdtemp(prefix="cb-bench-")
+        self.metadata = make_metadata(self.croot)
+        self.prefix = self.metadata.config.host_prefix
+        os.makedirs(self.prefix, exist_ok=True)
+        self.files = make_prefix(self.prefix)
+        utils.reset_binary_file_cache()
+
+    def teardown(self):
+        shutil.rmtree(self.croot, ignore_errors=True)
+
+    def time_get_files_with_prefix(self):
+        build.get_files_with_prefix(self.metadata, [], self.files, self.prefix)
+
+    def time_perform_replacements(self):
+        matches = build.regex_files_py(
+            self.files,
+            self.prefix,
+            tag="prefix",
+            regex_re=self.prefix.encode(),
+            replacement_re=b"/opt/anaconda1anaconda2anaconda3",
+            also_binaries=True,
+            match_records=OrderedDict(),
+        )
+        build.perform_replacements(matches, self.prefix)
+
+    def time_build_info_files_json_v1(self):
+        files_with_prefix = build.get_files_with_prefix(
+            self.metadata, [], self.files, self.prefix
+        )
+        build.build_info_files_json_v1(
+            self.metadata, self.prefix, self.files, files_with_prefix
+        )
+
+
+class TimeBundleConda:
+    """Packaging of a generated host prefix, from post-processing to the indexed archive."""
+
+    number = 1
+    repeat = 3
+    timeout = 600
+    params = [".tar.bz2", ".conda"]
+    param_names = ["format"]
+
+    def setup(self, ext):
+        self.croot = tempfile.mkdtemp(prefix="cb-bench-")
+        self.metadata = make_metadata(self.croot)
+        self.metadata.config.conda_pkg_format = CondaPkgFormat.normalize(ext)
+        host_prefix = self.metadata.config.host_prefix
+        os.makedirs(host_prefix, exist_ok=True)
+        make_prefix(host_prefix, text_files=1000, binary_files=250)
+        os.makedirs(self.metadata.config.info_dir, exist_ok=True)
+        utils.reset_binary_file_cache()
+
+    def teardown(self, ext):
+        shutil.rmtree(self.croot, ignore_errors=True)
+
+    def time_bundle_conda(self, ext):
+        output = {"name": self.metadata.name(), "files": ["share", "lib"]}
+        new_files = set(utils.prefix_files(self.metadata.config.host_prefix))
+        build.bundle_conda(
+            output, self.metadata, env={}, stats={}, new_prefix_files=new_files
+        )
@@ -0,0 +1,38 @@
+# Copyright (C) 2014 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+import shutil
+import tempfile
+
+from conda_build.os_utils.liefldd import get_linkages, have_lief
+from conda_build.utils import on_linux
+
+from .fixtures import make_elf_prefix
+
+
+class TimeLinkages:
+    """Linkage resolution of ELF files inside a prefix, as done for overlinking checks."""
+
+    timeout = 300
+
+    def setup(self):
+        if not (on_linux and have_lief):
+            raise NotImplementedError("needs lief and ELF files")
+        self.prefix = tempfile.mkdtemp(prefix="cb-bench-")
+        self.paths = make_elf_prefix(self.prefix)
+        if not self.paths:
+            raise NotImplementedError("no shared libraries next to the interpreter")
+
+    def teardown(self):
+        shutil.rmtree(self.prefix, ignore_errors=True)
+
+    def time_get_linkages(self):
+        for path in self.paths:
+            get_linkages(
+                path, resolve_filenames=True, recurse=False, envroot=self.prefix
+            )
+
+    def time_get_linkages_recursive(self):
+        for path in self.paths:
+            get_linkages(
+                path, resolve_filenames=True, recurse=True, envroot=self.prefix
+            )
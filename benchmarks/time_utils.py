@@ -0,0 +1,53 @@
+# Copyright (C) 2014 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+import os
+import shutil
+import tempfile
+
+from conda_build.utils import PrefixSnapshot, compute_content_hash, prefix_files
+
+from .fixtures import make_prefix
+
+
+class TimeContentHash:
+    """Content hash of a generated source tree, as used for ``source/path`` recipes."""
+
+    timeout = 300
+
+    def setup(self):
+        self.directory = tempfile.mkdtemp(prefix="cb-bench-")
+        make_prefix(self.directory, text_files=2000, binary_files=200)
+
+    def teardown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def time_compute_content_hash(self):
+        compute_content_hash(self.directory)
+
+    def time_compute_content_hash_with_skips(self):
+        compute_content_hash(self.directory, skip=["lib/", "share/pkg0/"])
+
+
+class TimePrefixListing:
+    """Listing a host prefix again after a build script added a few files to it."""
+
+    timeout = 300
+
+    def setup(self):
+        self.prefix = tempfile.mkdtemp(prefix="cb-bench-")
+        files = make_prefix(self.prefix, text_files=20000, binary_files=0, size=64)
+        for directory in {os.path.dirname(file) for file in files}:
+            os.utime(os.path.join(self.prefix, directory), ns=(0, 0))
+        self.snapshot = PrefixSnapshot(self.prefix)
+        os.makedirs(os.path.join(self.prefix, "new"))
+        for i in range(10):
+            open(os.path.join(self.prefix, "new", f"file{i}"), "w").close()
+
+    def teardown(self):
+        shutil.rmtree(self.prefix, ignore_errors=True)
+
+    def time_prefix_files(self):
+        prefix_files(self.prefix)
+
+    def time_prefix_snapshot_refresh(self):
+        self.snapshot.refresh().files
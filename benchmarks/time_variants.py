@@ -0,0 +1,72 @@
+# Copyright (C) 2014 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+import os
+import shutil
+import tempfile
+
+import yaml
+
+from conda_build.config import Config
+from conda_build.metadata import select_lines
+from conda_build.variants import (
+    explode_variants,
+    find_used_variables_in_text,
+    get_package_variants,
+)
+
+from .fixtures import make_pinning, make_recipe_text
+
+
+class TimeVariants:
+    """Variant expansion and detection of used variables against a large pinning."""
+
+    timeout = 300
+
+    def setup(self):
+        self.spec = make_pinning()
+        self.recipe_text = make_recipe_text()
+        self.variant_keys = tuple(sorted(self.spec))
+
+        self.recipe_dir = tempfile.mkdtemp(prefix="cb-bench-")
+        with open(os.path.join(self.recipe_dir, "meta.yaml"), "w") as f:
+            f.write(make_recipe_text(lines=0))
+        with open(os.path.join(self.recipe_dir, "conda_build_config.yaml"), "w") as f:
+            yaml.safe_dump(self.spec, f)
+        self.config = Config(croot=os.path.join(self.recipe_dir, "croot"))
+
+    def teardown(self):
+        shutil.rmtree(self.recipe_dir, ignore_errors=True)
+
+    def time_explode_variants(self):
+        explode_variants(self.spec)
+
+    def time_get_package_variants(self):
+        get_package_variants(self.recipe_dir, self.config)
+
+    def time_find_used_variables_in_text(self):
+        # memoized; measure the actual scan
+        find_used_variables_in_text.cache_clear()
+        find_used_variables_in_text(self.variant_keys, self.recipe_text)
+
+    def time_find_used_selectors_in_text(self):
+        find_used_variables_in_text.cache_clear()
+        find_used_variables_in_text(
+            self.variant_keys, self.recipe_text, selectors_only=True
+        )
+
+
+class TimeSelectLines:
+    """Selector evaluation over a long recipe."""
+
+    def setup(self):
+        self.recipe_text = make_recipe_text()
+        self.namespace = {
+            "linux": True,
+            "osx": False,
+            "win": False,
+            "aarch64": False,
+            "py": 312,
+        }
+
+    def time_select_lines(self):
+        select_lines(self.recipe_text, self.namespace, variants_in_place=True)
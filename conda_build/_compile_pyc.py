@@ -0,0 +1,51 @@
+# Copyright (C) 2014 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+"""
+Compile .py files to bytecode with a pool of worker processes.
+
+This runs with the python of the build (or host) environment, not with the one running
+conda-build, so it only uses the standard library and must not import conda_build. The
+files (relative to the working directory) and the number of jobs are read as JSON from
+stdin, and a JSON line is written to stdout for every file compiled, with the error if
+it could not be.
+"""
+
+import json
+import py_compile
+import sys
+
+
+def compile_file(path):
+    try:
+        py_compile.compile(path, doraise=True)
+    except Exception as e:
+        return path, str(e).strip() or type(e).__name__
+    return path, None
+
+
+def main():
+    request = json.load(sys.stdin)
+    files = request["files"]
+    jobs = max(1, min(request["jobs"], len(files)))
+    if jobs == 1:
+        results = map(compile_file, files)
+        pool = None
+    else:
+        import multiprocessing
+
+        pool = multiprocessing.Pool(jobs)
+        results = pool.imap_unordered(
+            compile_file, files, chunksize=max(1, min(64, len(files) // (jobs * 8)))
+        )
+    try:
+        for path, error in results:
+            sys.stdout.write(json.dumps({"path": path, "error": error}) + "\n")
+            sys.stdout.flush()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -121,6 +121,7 @@ def get_output_file_paths(
     | os.PathLike
     | Path
     | MetaData
+    | Iterable[str | os.PathLike | Path]
     | Iterable[MetaDataTuple],
     no_download_source: bool = False,
     config: Config | None = None,
@@ -131,26 +132,34 @@ def get_output_file_paths(
 
     Both split packages (recipes with more than one output) and build matrices,
     created with variants, contribute to the list of file paths here.
+
+    Recipes on disk (one or several) are rendered without solving their build and host
+    environments, unless a package's build string depends on the resolved dependencies.
+    See :func:`conda_build.render.plan_output_paths`.
     """
-    from .render import bldpkg_path
+    from .render import bldpkg_path, plan_output_paths
 
     config = get_or_merge_config(config, **kwargs)
 
     if isinstance(recipe_path_or_metadata, (str, Path)):
-        # first, render the parent recipe (potentially multiple outputs, depending on variants).
-        metadata_tuples = render(
+        recipe_path_or_metadata = [recipe_path_or_metadata]
+    elif isinstance(recipe_path_or_metadata, MetaData):
+        recipe_path_or_metadata = [MetaDataTuple(recipe_path_or_metadata, False, False)]
+
+    if isinstance(recipe_path_or_metadata, Iterable):
+        recipe_path_or_metadata = list(recipe_path_or_metadata)
+
+    if isinstance(recipe_path_or_metadata, list) and all(
+        isinstance(recipe, (str, Path)) for recipe in recipe_path_or_metadata
+    ):
+        # render recipes on disk, sharing one config (and build index) between them
+        return plan_output_paths(
             recipe_path_or_metadata,
-            no_download_source=no_download_source,
+            config=get_or_merge_config(config, no_download_source=no_download_source),
             variants=variants,
-            config=config,
-            finalize=True,
-            **kwargs,
         )
 
-    elif isinstance(recipe_path_or_metadata, MetaData):
-        metadata_tuples = [MetaDataTuple(recipe_path_or_metadata, False, False)]
-
-    elif isinstance(recipe_path_or_metadata, Iterable) and all(
+    elif isinstance(recipe_path_or_metadata, list) and all(
         isinstance(recipe, MetaDataTuple)
         and isinstance(recipe.metadata, MetaData)
         and isinstance(recipe.need_download, bool)
@@ -162,8 +171,8 @@ def get_output_file_paths(
     else:
         raise ValueError(
             f"Unknown input type: {type(recipe_path_or_metadata)}; expecting "
-            "PathLike object, MetaData object, or a list of tuples containing "
-            "(MetaData, bool, bool)."
+            "PathLike object, MetaData object, or a list of PathLike objects or "
+            "tuples containing (MetaData, bool, bool)."
         )
 
     # Next, loop over outputs that each metadata defines
@@ -393,7 +402,7 @@ def convert(
 
     platforms = ensure_list(platforms)
     dependencies = ensure_list(dependencies)
-    if package_file.endswith("tar.bz2"):
+    if package_file.endswith((".tar.bz2", ".conda")):
         return conda_convert(
             package_file,
             output_dir=output_dir,
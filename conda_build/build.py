@@ -8,6 +8,7 @@ from __future__ import annotations
 
 import fnmatch
 import json
+import multiprocessing
 import os
 import random
 import re
@@ -16,9 +17,11 @@ import stat
 import string
 import subprocess
 import sys
+import threading
 import time
 import warnings
-from collections import OrderedDict, deque
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from os.path import dirname, isdir, isfile, islink, join
 from pathlib import Path
 from typing import TYPE_CHECKING
@@ -57,6 +60,12 @@ from .exceptions import (
 from .index import _delegated_update_index, get_build_index
 from .metadata import FIELDS, MetaData
 from .os_utils import external
+from .package_writer import (
+    ComponentSizeError,
+    CondaPackageWriter,
+    is_info_file,
+    zstd_compressor,
+)
 from .post import (
     fix_permissions,
     get_build_metadata,
@@ -75,6 +84,7 @@ from .render import (
     reparse,
     try_download,
 )
+from .tracing import argument_attributes, set_attributes, span, traced, tracer
 from .utils import (
     CONDA_PACKAGE_EXTENSIONS,
     MAX_CHUNK_SIZE,
@@ -289,14 +299,13 @@ def regex_files_rg(
                     match_filename_begin = match["data"]["path"]["text"][
                         len(prefix) + 1 :
                     ].replace(os.sep, "/")
-                    match_filename_type = "unknown"
-                    # TODO :: Speed this up, and generalise it, the python version does similar.
-                    with open(os.path.join(prefix, match_filename_begin), "rb") as fh:
-                        data = mmap_or_read(fh)
-                        match_filename_type = (
-                            "binary" if data.find(b"\x00") != -1 else "text"
+                    match_filename_type = (
+                        "binary"
+                        if utils.is_binary_file(
+                            os.path.join(prefix, match_filename_begin)
                         )
-                    assert match_filename_type != "unknown"
+                        else "text"
+                    )
                 elif new_stage == "match":
                     old_stage = stage
                     assert stage == "begin" or stage == "match" or stage == "end"
@@ -387,10 +396,10 @@ def regex_files_py(
         with open(join(prefix, file), "rb+") as f:
             if os.fstat(f.fileno()).st_size == 0:
                 continue
-            data = mmap_or_read(f)
-            type = "binary" if data.find(b"\x00") != -1 else "text"
+            type = "binary" if utils.is_binary_file(join(prefix, file)) else "text"
             if not also_binaries and type == "binary":
                 continue
+            data = mmap_or_read(f)
             # data2 = f.read()
             for match in re.finditer(re_re, data):
                 if match:
@@ -1011,12 +1020,14 @@ def get_all_replacements(variant):
     return repl
 
 
+@traced("detect_prefix_files", argument_attributes("m"))
 def get_files_with_prefix(m, replacements, files_in, prefix):
     import time
 
     start = time.time()
     # It is nonsensical to replace anything in a symlink.
     files = sorted(f for f in files_in if not os.path.islink(os.path.join(prefix, f)))
+    set_attributes(files=len(files))
     ignore_files = m.ignore_prefix_files()
     ignore_types = set()
     if not hasattr(ignore_files, "__iter__"):
@@ -1031,7 +1042,7 @@ def get_files_with_prefix(m, replacements, files_in, prefix):
         (
             None,
             FileMode.binary.name
-            if open(os.path.join(prefix, f), "rb+").read().find(b"\x00") != -1
+            if utils.is_binary_file(os.path.join(prefix, f))
             else FileMode.text.name,
             f,
         )
@@ -1411,6 +1422,23 @@ def create_info_files(m, replacements, files, prefix):
         # make sure we use '/' path separators in metadata
         files = [_f.replace("\\", "/") for _f in files]
 
+    files_with_prefix = create_info_files_without_paths_json(
+        m, replacements, files, prefix
+    )
+    return create_info_files_json_v1(
+        m, m.config.info_dir, prefix, files, files_with_prefix
+    )
+
+
+def create_info_files_without_paths_json(m, replacements, files, prefix):
+    """
+    Creates the metadata files that will be stored in the built package, except for
+    ``info/paths.json``, and returns the files with prefix for it.
+
+    ``files`` is extended with the generated metadata files it must list. It has to
+    use '/' path separators.
+    """
+
     if m.config.filename_hashing:
         write_hash_input(m)
     write_info_json(m)  # actually index.json
@@ -1433,9 +1461,6 @@ def create_info_files(m, replacements, files, prefix):
 
     files_with_prefix = get_files_with_prefix(m, replacements, files, prefix)
     files_with_prefix = record_prefix_files(m, files_with_prefix)
-    checksums = create_info_files_json_v1(
-        m, m.config.info_dir, prefix, files, files_with_prefix
-    )
 
     write_no_link(m, files)
 
@@ -1457,7 +1482,7 @@ def create_info_files(m, replacements, files, prefix):
             m.config.timeout,
             locking=m.config.locking,
         )
-    return checksums
+    return files_with_prefix
 
 
 def get_short_path(m, target_file):
@@ -1551,52 +1576,81 @@ def _recurse_symlink_to_size(path, seen=None):
     return 0
 
 
-def build_info_files_json_v1(m, prefix, files, files_with_prefix):
+def _sha256_for_paths_json(path, st):
+    if stat.S_ISREG(st.st_mode):
+        return utils.compute_sums(path, ("sha256",))["sha256"]
+    # symlinks and directories; stats again to follow links
+    return utils.sha256_checksum(path)
+
+
+def build_info_files_json_v1(m, prefix, files, files_with_prefix, sha256s=None):
     no_link_files = m.get_value("build/no_link")
+    # first entry wins, as with has_prefix
+    prefix_info = {}
+    for placeholder, mode, filename in files_with_prefix:
+        prefix_info.setdefault(filename, (placeholder, mode))
+
+    # a single lstat per file; hardlinked files are grouped by inode in files order
+    stats = {fi: os.lstat(join(prefix, fi)) for fi in files}
+    inode_paths = defaultdict(list)
+    for fi in files:
+        inode_paths[stats[fi].st_ino].append(fi)
+
+    sorted_files = sorted(files)
+    # digests computed while writing the package need not be computed again
+    sha256s = dict(sha256s or {})
+    to_hash = [fi for fi in sorted_files if fi not in sha256s]
+    if to_hash:
+        # hashlib releases the GIL, so hashing scales with threads
+        workers = min(32, (os.cpu_count() or 1) + 4)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            sha256s.update(
+                zip(
+                    to_hash,
+                    executor.map(
+                        _sha256_for_paths_json,
+                        (join(prefix, fi) for fi in to_hash),
+                        (stats[fi] for fi in to_hash),
+                    ),
+                )
+            )
+
     files_json = []
-    files_inodes = get_inodes(files, prefix)
-    for fi in sorted(files):
-        prefix_placeholder, file_mode = has_prefix(fi, files_with_prefix)
+    for fi in sorted_files:
+        sha256 = sha256s[fi]
+        st = stats[fi]
+        prefix_placeholder, file_mode = prefix_info.get(fi, (None, None))
         path = os.path.join(prefix, fi)
         short_path = get_short_path(m, fi)
         if short_path:
             short_path = short_path.replace("\\", "/").replace("\\\\", "/")
+        is_link = stat.S_ISLNK(st.st_mode)
         file_info = {
             "_path": short_path,
-            "sha256": utils.sha256_checksum(path),
-            "path_type": path_type(path),
+            "sha256": sha256,
+            "path_type": PathType.softlink if is_link else PathType.hardlink,
+            "size_in_bytes": _recurse_symlink_to_size(path) if is_link else st.st_size,
         }
-        if file_info["path_type"] == PathType.hardlink:
-            file_info["size_in_bytes"] = os.stat(path).st_size
-        elif file_info["path_type"] == PathType.softlink:
-            file_info["size_in_bytes"] = _recurse_symlink_to_size(path)
-        elif isdir(path):
-            file_info["size_in_bytes"] = 0
         no_link = is_no_link(no_link_files, fi)
         if no_link:
             file_info["no_link"] = no_link
         if prefix_placeholder and file_mode:
             file_info["prefix_placeholder"] = prefix_placeholder
             file_info["file_mode"] = file_mode
-        if (
-            file_info.get("path_type") == PathType.hardlink
-            and os.stat(path).st_nlink > 1
-        ):
-            target_short_path_inode = get_inode(path)
-            inode_paths = [
-                files[index]
-                for index, ino in enumerate(files_inodes)
-                if ino == target_short_path_inode
-            ]
-            file_info["inode_paths"] = inode_paths
+        if not is_link and st.st_nlink > 1:
+            file_info["inode_paths"] = list(inode_paths[st.st_ino])
         files_json.append(file_info)
     return files_json
 
 
-def create_info_files_json_v1(m, info_dir, prefix, files, files_with_prefix):
+def create_info_files_json_v1(
+    m, info_dir, prefix, files, files_with_prefix, sha256s=None
+):
     # fields: "_path", "sha256", "size_in_bytes", "path_type", "file_mode",
     #         "prefix_placeholder", "no_link", "inode_paths"
-    files_json_files = build_info_files_json_v1(m, prefix, files, files_with_prefix)
+    files_json_files = build_info_files_json_v1(
+        m, prefix, files, files_with_prefix, sha256s
+    )
     files_json_info = {
         "paths_version": 1,
         "paths": files_json_files,
@@ -1622,6 +1676,68 @@ def create_info_files_json_v1(m, info_dir, prefix, files, files_with_prefix):
     return checksums
 
 
+def create_conda_package(m, path, files, paths_json_files, files_with_prefix):
+    """
+    Write the ``.conda`` package ``path`` from ``files`` in the host prefix, along with
+    its ``info/paths.json`` for ``paths_json_files``.
+
+    The payload is hashed while it is compressed, then ``paths.json`` is generated from
+    those digests and the ``info`` component is written last. The result is validated
+    against the members that were written. Should a component not come out at the size
+    given to zstd, the package is written again by conda-package-handling, and read
+    back to validate it. Returns the checksums of ``paths.json``.
+    """
+    prefix = m.config.host_prefix
+    if utils.on_win:
+        files = [_f.replace("\\", "/") for _f in files]
+    pkg_files = [f for f in files if not is_info_file(f)]
+    info_files = [f for f in files if is_info_file(f)]
+
+    compressor = zstd_compressor(
+        m.config.zstd_compression_level,
+        threads=m.config.zstd_threads,
+        long_distance_matching=m.config.zstd_long_distance_matching,
+        window_log=m.config.zstd_window_log,
+    )
+    try:
+        with CondaPackageWriter(path, compressor) as writer:
+            sha256s = writer.add_component("pkg", prefix, pkg_files)
+            checksums = create_info_files_json_v1(
+                m,
+                m.config.info_dir,
+                prefix,
+                paths_json_files,
+                files_with_prefix,
+                sha256s,
+            )
+            if "info/paths.json" not in info_files and isfile(
+                join(m.config.info_dir, "paths.json")
+            ):
+                info_files.append("info/paths.json")
+            writer.add_component("info", prefix, info_files)
+    except ComponentSizeError as exc:
+        log = utils.get_logger(__name__)
+        log.warning(
+            f"{exc}, writing {os.path.basename(path)} with conda-package-handling "
+            "instead"
+        )
+        checksums = create_info_files_json_v1(
+            m, m.config.info_dir, prefix, paths_json_files, files_with_prefix
+        )
+        if "info/paths.json" not in info_files and isfile(
+            join(m.config.info_dir, "paths.json")
+        ):
+            info_files.append("info/paths.json")
+        conda_package_handling.api.create(
+            prefix, pkg_files + info_files, path, compressor=compressor
+        )
+        tarcheck.check_all(path, m.config)
+        return checksums
+    tarcheck.check_members(path, writer.members, m.config.info_dir, m.config)
+    return checksums
+
+
+@traced("post_process", argument_attributes("m"))
 def post_process_files(m: MetaData, initial_prefix_files):
     package_name = m.name()
     host_prefix = m.config.host_prefix
@@ -1644,7 +1760,7 @@ def post_process_files(m: MetaData, initial_prefix_files):
     # this is new-style noarch, with a value of 'python'
     if m.noarch != "python":
         utils.create_entry_points(m.get_value("build/entry_points"), config=m.config)
-    current_prefix_files = utils.prefix_files(prefix=host_prefix)
+    current_prefix_files = utils.prefix_snapshot(host_prefix).files
 
     python = (
         m.config.build_python
@@ -1663,7 +1779,7 @@ def post_process_files(m: MetaData, initial_prefix_files):
     )
 
     # The post processing may have deleted some files (like easy-install.pth)
-    current_prefix_files = utils.prefix_files(prefix=host_prefix)
+    current_prefix_files = utils.prefix_snapshot(host_prefix).files
     new_files = sorted(current_prefix_files - initial_prefix_files)
 
     # filter_files will remove .git, trash directories, and conda-meta directories
@@ -1690,13 +1806,15 @@ def post_process_files(m: MetaData, initial_prefix_files):
         # For non noarch: python ones, we don't need to handle entry points in a special way.
         noarch_python.populate_files(m, pkg_files, host_prefix, [])
 
-    current_prefix_files = utils.prefix_files(prefix=host_prefix)
+    current_prefix_files = utils.prefix_snapshot(host_prefix).files
     new_files = current_prefix_files - initial_prefix_files
+    set_attributes(files=len(new_files))
     fix_permissions(new_files, host_prefix)
 
     return new_files
 
 
+@traced("bundle", argument_attributes("metadata"))
 def bundle_conda(
     output,
     metadata: MetaData,
@@ -1772,7 +1890,7 @@ def bundle_conda(
         else:
             args = interpreter.split(" ")
 
-        initial_files = utils.prefix_files(metadata.config.host_prefix)
+        initial_files = utils.prefix_snapshot(metadata.config.host_prefix).files
         env_output = env.copy()
         env_output["TOP_PKG_NAME"] = env["PKG_NAME"]
         env_output["TOP_PKG_VERSION"] = env["PKG_VERSION"]
@@ -1823,6 +1941,8 @@ def bundle_conda(
                 cwd=metadata.config.work_dir,
                 env=env_output,
                 stats=bundle_stats,
+                time_int=metadata.config.stats_interval,
+                disk_time_int=metadata.config.stats_disk_interval,
             )
         except subprocess.CalledProcessError as exc:
             raise BuildScriptException(str(exc), caused_by=exc) from exc
@@ -1853,7 +1973,7 @@ def bundle_conda(
                 os.path.normpath(pth)
                 for pth in utils.expand_globs(files, metadata.config.host_prefix)
             }
-        pfx_files = set(utils.prefix_files(metadata.config.host_prefix))
+        pfx_files = utils.prefix_snapshot(metadata.config.host_prefix).files
         initial_files = {
             item
             for item in (pfx_files - keep_files)
@@ -1891,7 +2011,7 @@ def bundle_conda(
                         f"to the host requirements section.  See {link} for more "
                         "info."
                     )
-        initial_files = set(utils.prefix_files(metadata.config.host_prefix))
+        initial_files = utils.prefix_snapshot(metadata.config.host_prefix).files
 
     for pat in metadata.always_include_files():
         has_matches = False
@@ -1918,41 +2038,63 @@ def bundle_conda(
     # this is also copying things like run_test.sh into info/recipe
     utils.rm_rf(os.path.join(metadata.config.info_dir, "test"))
 
+    ext = CondaPkgFormat.V1.ext
+    if (
+        output.get("type") == CondaPkgFormat.V2
+        or metadata.config.conda_pkg_format == CondaPkgFormat.V2
+    ):
+        ext = CondaPkgFormat.V2.ext
+
     with tmp_chdir(metadata.config.host_prefix):
-        output["checksums"] = create_info_files(
-            metadata, replacements, files, prefix=metadata.config.host_prefix
-        )
+        if ext == CondaPkgFormat.V2.ext:
+            # paths.json is written while packaging, from the digests of the payload
+            if utils.on_win:
+                files = [_f.replace("\\", "/") for _f in files]
+            files_with_prefix = create_info_files_without_paths_json(
+                metadata, replacements, files, prefix=metadata.config.host_prefix
+            )
+            paths_json_files = files
+        else:
+            output["checksums"] = create_info_files(
+                metadata, replacements, files, prefix=metadata.config.host_prefix
+            )
 
     # here we add the info files into the prefix, so we want to re-collect the files list
-    prefix_files = set(utils.prefix_files(metadata.config.host_prefix))
+    prefix_files = utils.prefix_snapshot(metadata.config.host_prefix).files
     files = utils.filter_files(
         prefix_files - initial_files, prefix=metadata.config.host_prefix
     )
 
     basename = "-".join([output["name"], metadata.version(), metadata.build_id()])
+    try:
+        crossed_subdir = metadata.config.target_subdir
+    except AttributeError:
+        crossed_subdir = metadata.config.host_subdir
+    subdir = "noarch" if (metadata.noarch or metadata.noarch_python) else crossed_subdir
+    if metadata.config.output_folder:
+        output_folder = os.path.join(metadata.config.output_folder, subdir)
+    else:
+        output_folder = os.path.join(
+            os.path.dirname(metadata.config.bldpkgs_dir), subdir
+        )
+    os.makedirs(output_folder, exist_ok=True)
+
     tmp_archives = []
     final_outputs = []
-    cph_kwargs = {}
-    ext = CondaPkgFormat.V1.ext
-    if (
-        output.get("type") == CondaPkgFormat.V2
-        or metadata.config.conda_pkg_format == CondaPkgFormat.V2
-    ):
-        ext = CondaPkgFormat.V2.ext
-        cph_kwargs["compression_tuple"] = (
-            ".tar.zst",
-            "zstd",
-            f"zstd:compression-level={metadata.config.zstd_compression_level}",
-        )
-    with TemporaryDirectory() as tmp:
-        conda_package_handling.api.create(
-            metadata.config.host_prefix,
-            files,
-            basename + ext,
-            out_folder=tmp,
-            **cph_kwargs,
-        )
-        tmp_archives = [os.path.join(tmp, basename + ext)]
+    # build the archive next to its final location, so that moving it there once it is
+    #    verified is a rename instead of a copy
+    with TemporaryDirectory(prefix=".tmp-", dir=output_folder) as tmp:
+        tmp_path = os.path.join(tmp, basename + ext)
+        with span("create_archive", files=len(files), format=ext):
+            if ext == CondaPkgFormat.V2.ext:
+                output["checksums"] = create_conda_package(
+                    metadata, tmp_path, files, paths_json_files, files_with_prefix
+                )
+            else:
+                conda_package_handling.api.create(
+                    metadata.config.host_prefix, files, basename + ext, out_folder=tmp
+                )
+        tmp_archives = [tmp_path]
 
         # we're done building, perform some checks
         for tmp_path in tmp_archives:
@@ -1986,30 +2128,8 @@ def bundle_conda(
                         "Package doesn't have necessary files.  It might be too old to inspect."
                         f"Legacy noarch packages are known to fail.  Full message was {e}"
                     )
-            try:
-                crossed_subdir = metadata.config.target_subdir
-            except AttributeError:
-                crossed_subdir = metadata.config.host_subdir
-            subdir = (
-                "noarch"
-                if (metadata.noarch or metadata.noarch_python)
-                else crossed_subdir
-            )
-            if metadata.config.output_folder:
-                output_folder = os.path.join(metadata.config.output_folder, subdir)
-            else:
-                output_folder = os.path.join(
-                    os.path.dirname(metadata.config.bldpkgs_dir), subdir
-                )
             final_output = os.path.join(output_folder, output_filename)
-            if os.path.isfile(final_output):
-                utils.rm_rf(final_output)
-
-            # disable locking here.  It's just a temp folder getting locked.  Removing it proved to be
-            #    a major bottleneck.
-            utils.copy_into(
-                tmp_path, final_output, metadata.config.timeout, locking=False
-            )
+            utils.replace_file(tmp_path, final_output)
             final_outputs.append(final_output)
     _delegated_update_index(
         os.path.dirname(output_folder), verbose=metadata.config.debug, threads=1
@@ -2063,6 +2183,8 @@ def bundle_wheel(
             cwd=metadata.config.work_dir,
             env=env,
             stats=bundle_stats,
+            time_int=metadata.config.stats_interval,
+            disk_time_int=metadata.config.stats_disk_interval,
         )
         log_stats(bundle_stats, f"bundling wheel {metadata.name()}")
         if stats is not None:
@@ -2327,6 +2449,7 @@ def create_build_envs(m: MetaData, notest):
         )
 
 
+@traced("build", argument_attributes("m"))
 def build(
     m: MetaData,
     stats,
@@ -2359,6 +2482,8 @@ def build(
     host_precs = []
     build_precs = []
     output_metas = []
+    utils.reset_binary_file_cache()
+    utils.forget_prefix_snapshots()
 
     with utils.path_prepended(m.config.build_prefix):
         env = environ.get_dict(m=m)
@@ -2524,7 +2649,7 @@ def build(
             os.makedirs(src_dir)
 
         utils.rm_rf(m.config.info_dir)
-        files1 = utils.prefix_files(prefix=m.config.host_prefix)
+        files1 = utils.prefix_snapshot(m.config.host_prefix).files
         os.makedirs(m.config.build_folder, exist_ok=True)
         with open(join(m.config.build_folder, "prefix_files.txt"), "w") as f:
             f.write("\n".join(sorted(list(files1))))
@@ -2593,13 +2718,16 @@ def build(
 
                         # this should raise if any problems occur while building
                         try:
-                            utils.check_call_env(
-                                cmd,
-                                env=env,
-                                rewrite_stdout_env=rewrite_env,
-                                cwd=src_dir,
-                                stats=build_stats,
-                            )
+                            with span("build_script"):
+                                utils.check_call_env(
+                                    cmd,
+                                    env=env,
+                                    rewrite_stdout_env=rewrite_env,
+                                    cwd=src_dir,
+                                    stats=build_stats,
+                                    time_int=m.config.stats_interval,
+                                    disk_time_int=m.config.stats_disk_interval,
+                                )
                         except subprocess.CalledProcessError as exc:
                             raise BuildScriptException(str(exc), caused_by=exc) from exc
                         utils.remove_pycache_from_scripts(m.config.host_prefix)
@@ -2613,7 +2741,7 @@ def build(
     if os.path.isfile(prefix_file_list):
         with open(prefix_file_list) as f:
             initial_files = set(f.read().splitlines())
-    new_prefix_files = utils.prefix_files(prefix=m.config.host_prefix) - initial_files
+    new_prefix_files = utils.prefix_snapshot(m.config.host_prefix).files - initial_files
 
     new_pkgs = default_return
     if not provision_only and post in [True, None]:
@@ -2671,7 +2799,8 @@ def build(
                     output_d.get("files") or output_d.get("script")
                 ):
                     output_d["files"] = (
-                        utils.prefix_files(prefix=m.config.host_prefix) - initial_files
+                        utils.prefix_snapshot(m.config.host_prefix).files
+                        - initial_files
                     )
 
                 # ensure that packaging scripts are copied over into the workdir
@@ -3272,6 +3401,37 @@ def write_test_scripts(
     return test_run_script, test_env_script
 
 
+def _move_build_folders(metadata: MetaData, config: Config) -> None:
+    """Move the host and build prefixes and the work folder out of the way of tests."""
+    for name, prefix in (
+        ("host", metadata.config.host_prefix),
+        ("build", metadata.config.build_prefix),
+    ):
+        if os.path.isdir(prefix):
+            # move host folder to force hardcoded paths to host env to break during tests
+            #    (so that they can be properly addressed by recipe author)
+            dest = os.path.join(
+                os.path.dirname(prefix),
+                "_".join(
+                    (
+                        f"{name}_prefix_moved",
+                        metadata.dist(),
+                        getattr(metadata.config, f"{name}_subdir"),
+                    )
+                ),
+            )
+            shutil_move_more_retrying(prefix, dest, f"{prefix} prefix")
+
+    # nested if so that there's no warning when we just leave the empty workdir in place
+    if metadata.source_provided:
+        dest = os.path.join(
+            os.path.dirname(metadata.config.work_dir),
+            "_".join(("work_moved", metadata.dist(), metadata.config.host_subdir)),
+        )
+        shutil_move_more_retrying(config.work_dir, dest, "work")
+
+
+@traced("test", argument_attributes("recipedir_or_package_or_metadata"))
 def test(
     recipedir_or_package_or_metadata: str | os.PathLike | Path | MetaData,
     config: Config,
@@ -3347,34 +3507,8 @@ def test(
         return True
 
     if metadata.config.remove_work_dir:
-        for name, prefix in (
-            ("host", metadata.config.host_prefix),
-            ("build", metadata.config.build_prefix),
-        ):
-            if os.path.isdir(prefix):
-                # move host folder to force hardcoded paths to host env to break during tests
-                #    (so that they can be properly addressed by recipe author)
-                dest = os.path.join(
-                    os.path.dirname(prefix),
-                    "_".join(
-                        (
-                            f"{name}_prefix_moved",
-                            metadata.dist(),
-                            getattr(metadata.config, f"{name}_subdir"),
-                        )
-                    ),
-                )
-                # Needs to come after create_files in case there's test/source_files
-                shutil_move_more_retrying(prefix, dest, f"{prefix} prefix")
-
-        # nested if so that there's no warning when we just leave the empty workdir in place
-        if metadata.source_provided:
-            dest = os.path.join(
-                os.path.dirname(metadata.config.work_dir),
-                "_".join(("work_moved", metadata.dist(), metadata.config.host_subdir)),
-            )
-            # Needs to come after create_files in case there's test/source_files
-            shutil_move_more_retrying(config.work_dir, dest, "work")
+        # Needs to come after create_files in case there's test/source_files
+        _move_build_folders(metadata, config)
     else:
         log.warning(
             "Not moving work directory after build.  Your package may depend on files "
@@ -3519,13 +3653,16 @@ def test(
                                 v,
                             )
                         )
-            utils.check_call_env(
-                cmd,
-                env=env,
-                cwd=metadata.config.test_dir,
-                stats=test_stats,
-                rewrite_stdout_env=rewrite_env,
-            )
+            with span("test_script"):
+                utils.check_call_env(
+                    cmd,
+                    env=env,
+                    cwd=metadata.config.test_dir,
+                    stats=test_stats,
+                    rewrite_stdout_env=rewrite_env,
+                    time_int=metadata.config.stats_interval,
+                    disk_time_int=metadata.config.stats_disk_interval,
+                )
             log_stats(test_stats, f"testing {metadata.name()}")
             if stats is not None and metadata.config.variants:
                 stats[stats_key(metadata, f"test_{metadata.name()}")] = test_stats
@@ -3547,6 +3684,11 @@ def test(
     return True
 
 
+# serializes the channel index updates of tests_failed(), across the worker processes
+# of _test_packages() as well
+_tests_failed_lock = threading.Lock()
+
+
 def tests_failed(
     package_or_metadata: str | os.PathLike | Path | MetaData,
     move_broken: bool,
@@ -3570,17 +3712,165 @@ def tests_failed(
 
     if move_broken:
         log = utils.get_logger(__name__)
+        with _tests_failed_lock:
+            try:
+                shutil.move(pkg, dest)
+                log.warning(
+                    f"Tests failed for {os.path.basename(pkg)} - moving package to {broken_dir}"
+                )
+            except OSError:
+                pass
+            _delegated_update_index(
+                os.path.dirname(os.path.dirname(pkg)), verbose=config.debug, threads=1
+            )
+    raise CondaBuildUserError("TESTS FAILED: " + os.path.basename(pkg))
+
+
+def _downstream_tests(
+    metadata: MetaData, pkg: str, meta: MetaData
+) -> list[tuple[str, Config]]:
+    """
+    The packages listed in ``test/downstreams`` of ``meta``, resolved against the
+    channel ``pkg`` was built into and downloaded, along with the config to test them.
+    """
+    downstreams = meta.meta.get("test", {}).get("downstreams")
+    if not downstreams:
+        return []
+    channel_urls = tuple(
+        utils.ensure_list(metadata.config.channel_urls)
+        + [utils.path2url(os.path.abspath(os.path.dirname(os.path.dirname(pkg))))]
+    )
+    log = utils.get_logger(__name__)
+    # downstreams can be a dict, for adding capability for worker labels
+    if hasattr(downstreams, "keys"):
+        downstreams = list(downstreams.keys())
+        log.warning(
+            "Dictionary keys for downstreams are being ignored right now.  Coming soon..."
+        )
+    else:
+        downstreams = utils.ensure_list(downstreams)
+    tests = []
+    for dep in downstreams:
+        log.info(f"Testing downstream package: {dep}")
+        # resolve downstream packages to a known package
+
+        r_string = "".join(
+            random.choice(string.ascii_uppercase + string.digits) for _ in range(10)
+        )
+        specs = meta.ms_depends("run") + [
+            MatchSpec(dep),
+            MatchSpec(" ".join(meta.dist().rsplit("-", 2))),
+        ]
+        specs = [utils.ensure_valid_spec(spec) for spec in specs]
         try:
-            shutil.move(pkg, dest)
+            with TemporaryDirectory(prefix="_", suffix=r_string) as tmpdir:
+                precs = environ.get_package_records(
+                    tmpdir,
+                    specs,
+                    env="run",
+                    subdir=meta.config.host_subdir,
+                    bldpkgs_dirs=meta.config.bldpkgs_dirs,
+                    channel_urls=channel_urls,
+                )
+        except (UnsatisfiableError, DependencyNeedsBuildingError) as e:
             log.warning(
-                f"Tests failed for {os.path.basename(pkg)} - moving package to {broken_dir}"
+                f"Skipping downstream test for spec {dep}; was "
+                f"unsatisfiable.  Error was {e}"
             )
-        except OSError:
-            pass
-        _delegated_update_index(
-            os.path.dirname(os.path.dirname(pkg)), verbose=config.debug, threads=1
+            continue
+        # make sure to download that package to the local cache if not there
+        local_file = execute_download_actions(
+            meta,
+            precs,
+            "host",
+            package_subset=[dep],
+            require_files=True,
         )
-    raise CondaBuildUserError("TESTS FAILED: " + os.path.basename(pkg))
+        # test that package, using the local channel so that our new
+        #    upstream dep gets used
+        tests.append((list(local_file.values())[0][0], meta.config.copy()))
+    return tests
+
+
+def _init_test_process(argparse_args: dict, tests_failed_lock) -> None:
+    """
+    Set up a worker process of :func:`_test_packages` like the process that started
+    it: with conda's context from the same command line arguments, and the lock that
+    :func:`tests_failed` shares with the other workers.
+    """
+    global _tests_failed_lock
+    context.__init__(argparse_args=argparse_args)
+    _tests_failed_lock = tests_failed_lock
+
+
+def _test_in_process(package: str, config: Config, log_file: str) -> dict:
+    """
+    Run :func:`test` in a worker process of :func:`_test_packages`, with its output
+    written to ``log_file``. Returns the stats of the test.
+    """
+    stats = {}
+    with open(log_file, "w") as log:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(log.fileno(), sys.stdout.fileno())
+        os.dup2(log.fileno(), sys.stderr.fileno())
+        test(package, config=config, stats=stats)
+    return stats
+
+
+def _tests_concurrently(config: Config) -> bool:
+    """Whether :func:`_test_packages` runs tests in separate processes."""
+    # with the work folder kept, tests see it as SRC_DIR and must share its build folder
+    return config.test_jobs > 1 and config.remove_work_dir
+
+
+def _test_packages(
+    tests: list[tuple[str, Config]], stats: dict, metadata: MetaData
+) -> None:
+    """
+    Test each ``(package, config)`` of ``tests``, one after the other or, with
+    ``test_jobs`` above 1, up to that many at a time in separate processes.
+
+    Concurrent tests each get their own build folder (and thus test prefix and test
+    folder), so the build folders of ``metadata`` are moved out of the way here rather
+    than by :func:`test`. Their output is printed as each of them finishes, and the
+    first failure is raised once all of them are done.
+    """
+    if not _tests_concurrently(metadata.config) or len(tests) <= 1:
+        for package, config in tests:
+            test(package, config=config, stats=stats)
+        return
+
+    _move_build_folders(metadata, metadata.config)
+    failures = []
+    mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=min(metadata.config.test_jobs, len(tests)),
+        mp_context=mp_context,
+        initializer=_init_test_process,
+        initargs=(dict(context._argparse_args or {}), mp_context.Lock()),
+    ) as executor:
+        futures = {}
+        for index, (package, config) in enumerate(tests):
+            config.build_id = f"{config.build_id}_test{index}"
+            os.makedirs(config.build_folder, exist_ok=True)
+            log_file = join(config.build_folder, "test.log")
+            future = executor.submit(_test_in_process, package, config, log_file)
+            futures[future] = config, log_file
+        for future in as_completed(futures):
+            config, log_file = futures[future]
+            if os.path.isfile(log_file):
+                with open(log_file) as f:
+                    sys.stdout.write(f.read())
+            try:
+                stats.update(future.result())
+            except Exception as exc:
+                failures.append(exc)
+                continue
+            if not (config.dirty or config.keep_old_work):
+                utils.rm_rf(config.build_folder)
+    if failures:
+        raise failures[0]
 
 
 def build_tree(
@@ -3594,248 +3884,271 @@ def build_tree(
 ) -> list[str]:
     to_build_recursive = []
     recipe_list = deque(recipe_list)
+    # the spans are only written along with the stats
+    tracer.reset(enabled=bool(config.stats_file))
 
-    if utils.on_win:
-        trash_dir = os.path.join(os.path.dirname(sys.executable), "pkgs", ".trash")
-        if os.path.isdir(trash_dir):
-            # We don't really care if this does a complete job.
-            #    Cleaning up some files is better than none.
-            subprocess.call(f'del /s /q "{trash_dir}\\*.*" >nul 2>&1', shell=True)
-        # delete_trash(None)
-
-    extra_help = ""
-    built_packages = OrderedDict()
-    retried_recipes = []
-    initial_time = time.time()
-
-    if build_only:
-        post = False
-        notest = True
-        config.anaconda_upload = False
-    elif post:
-        post = True
-        config.anaconda_upload = False
-    else:
-        post = None
+    try:
+        if utils.on_win:
+            trash_dir = os.path.join(os.path.dirname(sys.executable), "pkgs", ".trash")
+            if os.path.isdir(trash_dir):
+                # We don't really care if this does a complete job.
+                #    Cleaning up some files is better than none.
+                subprocess.call(f'del /s /q "{trash_dir}\\*.*" >nul 2>&1', shell=True)
+            # delete_trash(None)
+
+        extra_help = ""
+        built_packages = OrderedDict()
+        retried_recipes = []
+        initial_time = time.time()
+
+        if build_only:
+            post = False
+            notest = True
+            config.anaconda_upload = False
+        elif post:
+            post = True
+            config.anaconda_upload = False
+        else:
+            post = None
 
-    # this is primarily for exception handling.  It's OK that it gets clobbered by
-    #     the loop below.
-    metadata = None
+        # this is primarily for exception handling.  It's OK that it gets clobbered by
+        #     the loop below.
+        metadata = None
 
-    while recipe_list:
-        # This loop recursively builds dependencies if recipes exist
-        try:
-            recipe = recipe_list.popleft()
-            name = recipe.name() if hasattr(recipe, "name") else recipe
-            if hasattr(recipe, "config"):
-                metadata = recipe
-                cfg = metadata.config
-                cfg.anaconda_upload = (
-                    config.anaconda_upload
-                )  # copy over anaconda_upload setting
-
-                # this code is duplicated below because we need to be sure that the build id is set
-                #    before downloading happens - or else we lose where downloads are
-                if cfg.set_build_id and metadata.name() not in cfg.build_id:
-                    cfg.compute_build_id(metadata.name(), reset=True)
-                recipe_parent_dir = os.path.dirname(metadata.path)
-                to_build_recursive.append(metadata.name())
-
-                if not metadata.final:
-                    variants_ = (
-                        dict_of_lists_to_list_of_dicts(variants)
-                        if variants
-                        else get_package_variants(metadata)
-                    )
+        while recipe_list:
+            # This loop recursively builds dependencies if recipes exist
+            try:
+                recipe = recipe_list.popleft()
+                name = recipe.name() if hasattr(recipe, "name") else recipe
+                if hasattr(recipe, "config"):
+                    metadata = recipe
+                    cfg = metadata.config
+                    cfg.anaconda_upload = (
+                        config.anaconda_upload
+                    )  # copy over anaconda_upload setting
+
+                    # this code is duplicated below because we need to be sure that the build id is set
+                    #    before downloading happens - or else we lose where downloads are
+                    if cfg.set_build_id and metadata.name() not in cfg.build_id:
+                        cfg.compute_build_id(metadata.name(), reset=True)
+                    recipe_parent_dir = os.path.dirname(metadata.path)
+                    to_build_recursive.append(metadata.name())
+
+                    if not metadata.final:
+                        variants_ = (
+                            dict_of_lists_to_list_of_dicts(variants)
+                            if variants
+                            else get_package_variants(metadata)
+                        )
 
-                    # This is where reparsing happens - we need to re-evaluate the meta.yaml for any
-                    #    jinja2 templating
-                    metadata_tuples = distribute_variants(
-                        metadata, variants_, permit_unsatisfiable_variants=False
-                    )
+                        # This is where reparsing happens - we need to re-evaluate the meta.yaml for any
+                        #    jinja2 templating
+                        metadata_tuples = distribute_variants(
+                            metadata, variants_, permit_unsatisfiable_variants=False
+                        )
+                    else:
+                        metadata_tuples = ((metadata, False, False),)
                 else:
-                    metadata_tuples = ((metadata, False, False),)
-            else:
-                cfg = config
-
-                recipe_parent_dir = os.path.dirname(recipe)
-                recipe = recipe.rstrip("/").rstrip("\\")
-                to_build_recursive.append(os.path.basename(recipe))
-
-                # each tuple is:
-                #    metadata, need_source_download, need_reparse_in_env =
-                # We get one tuple per variant
-                metadata_tuples = render_recipe(
-                    recipe,
-                    config=cfg,
-                    variants=variants,
-                    permit_unsatisfiable_variants=False,
-                    reset_build_id=not cfg.dirty,
-                    bypass_env_check=True,
-                )
-
-            if post in (True, False):
-                metadata_tuples = metadata_tuples[:1]
-
-            # This is the "TOP LEVEL" loop. Only vars used in the top-level
-            # recipe are looped over here.
-
-            for metadata, need_source_download, need_reparse_in_env in metadata_tuples:
-                get_all_replacements(metadata.config.variant)
-                if post is None:
-                    utils.rm_rf(metadata.config.host_prefix)
-                    utils.rm_rf(metadata.config.build_prefix)
-                    utils.rm_rf(metadata.config.test_prefix)
-                if metadata.name() not in metadata.config.build_folder:
-                    metadata.config.compute_build_id(
-                        metadata.name(), metadata.version(), reset=True
+                    cfg = config
+
+                    recipe_parent_dir = os.path.dirname(recipe)
+                    recipe = recipe.rstrip("/").rstrip("\\")
+                    to_build_recursive.append(os.path.basename(recipe))
+
+                    # each tuple is:
+                    #    metadata, need_source_download, need_reparse_in_env =
+                    # We get one tuple per variant
+                    metadata_tuples = render_recipe(
+                        recipe,
+                        config=cfg,
+                        variants=variants,
+                        permit_unsatisfiable_variants=False,
+                        reset_build_id=not cfg.dirty,
+                        bypass_env_check=True,
                     )
 
-                packages_from_this = build(
+                if post in (True, False):
+                    metadata_tuples = metadata_tuples[:1]
+
+                # This is the "TOP LEVEL" loop. Only vars used in the top-level
+                # recipe are looped over here.
+
+                for (
                     metadata,
-                    stats,
-                    post=post,
-                    need_source_download=need_source_download,
-                    need_reparse_in_env=need_reparse_in_env,
-                    built_packages=built_packages,
-                    notest=notest,
-                )
-                if not notest:
-                    for pkg, dict_and_meta in packages_from_this.items():
-                        if pkg.endswith(CONDA_PACKAGE_EXTENSIONS) and os.path.isfile(
-                            pkg
-                        ):
-                            # we only know how to test conda packages
-                            test(pkg, config=metadata.config.copy(), stats=stats)
-                        _, meta = dict_and_meta
-                        downstreams = meta.meta.get("test", {}).get("downstreams")
-                        if downstreams:
-                            channel_urls = tuple(
-                                utils.ensure_list(metadata.config.channel_urls)
-                                + [
-                                    utils.path2url(
-                                        os.path.abspath(
-                                            os.path.dirname(os.path.dirname(pkg))
-                                        )
-                                    )
-                                ]
+                    need_source_download,
+                    need_reparse_in_env,
+                ) in metadata_tuples:
+                    get_all_replacements(metadata.config.variant)
+                    if post is None:
+                        utils.rm_rf(metadata.config.host_prefix)
+                        utils.rm_rf(metadata.config.build_prefix)
+                        utils.rm_rf(metadata.config.test_prefix)
+                    if metadata.name() not in metadata.config.build_folder:
+                        metadata.config.compute_build_id(
+                            metadata.name(), metadata.version(), reset=True
+                        )
+
+                    packages_from_this = build(
+                        metadata,
+                        stats,
+                        post=post,
+                        need_source_download=need_source_download,
+                        need_reparse_in_env=need_reparse_in_env,
+                        built_packages=built_packages,
+                        notest=notest,
+                    )
+                    if not notest and _tests_concurrently(metadata.config):
+                        # we only know how to test conda packages
+                        _test_packages(
+                            [
+                                (pkg, metadata.config.copy())
+                                for pkg in packages_from_this
+                                if pkg.endswith(CONDA_PACKAGE_EXTENSIONS)
+                                and os.path.isfile(pkg)
+                            ],
+                            stats,
+                            metadata,
+                        )
+                        downstream_tests = []
+                        for pkg, (_, meta) in packages_from_this.items():
+                            downstream_tests.extend(
+                                _downstream_tests(metadata, pkg, meta)
                             )
-                            log = utils.get_logger(__name__)
-                            # downstreams can be a dict, for adding capability for worker labels
-                            if hasattr(downstreams, "keys"):
-                                downstreams = list(downstreams.keys())
-                                log.warning(
-                                    "Dictionary keys for downstreams are being "
-                                    "ignored right now.  Coming soon..."
-                                )
-                            else:
-                                downstreams = utils.ensure_list(downstreams)
-                            for dep in downstreams:
-                                log.info(f"Testing downstream package: {dep}")
-                                # resolve downstream packages to a known package
-
-                                r_string = "".join(
-                                    random.choice(
-                                        string.ascii_uppercase + string.digits
-                                    )
-                                    for _ in range(10)
-                                )
-                                specs = meta.ms_depends("run") + [
-                                    MatchSpec(dep),
-                                    MatchSpec(" ".join(meta.dist().rsplit("-", 2))),
-                                ]
-                                specs = [
-                                    utils.ensure_valid_spec(spec) for spec in specs
-                                ]
-                                try:
-                                    with TemporaryDirectory(
-                                        prefix="_", suffix=r_string
-                                    ) as tmpdir:
-                                        precs = environ.get_package_records(
-                                            tmpdir,
-                                            specs,
-                                            env="run",
-                                            subdir=meta.config.host_subdir,
-                                            bldpkgs_dirs=meta.config.bldpkgs_dirs,
-                                            channel_urls=channel_urls,
-                                        )
-                                except (
-                                    UnsatisfiableError,
-                                    DependencyNeedsBuildingError,
-                                ) as e:
-                                    log.warning(
-                                        f"Skipping downstream test for spec {dep}; was "
-                                        f"unsatisfiable.  Error was {e}"
-                                    )
-                                    continue
-                                # make sure to download that package to the local cache if not there
-                                local_file = execute_download_actions(
-                                    meta,
-                                    precs,
-                                    "host",
-                                    package_subset=[dep],
-                                    require_files=True,
-                                )
-                                # test that package, using the local channel so that our new
-                                #    upstream dep gets used
-                                test(
-                                    list(local_file.values())[0][0],
-                                    config=meta.config.copy(),
-                                    stats=stats,
+                        _test_packages(downstream_tests, stats, metadata)
+                        built_packages.update(packages_from_this)
+                    elif not notest:
+                        for pkg, dict_and_meta in packages_from_this.items():
+                            if pkg.endswith(
+                                CONDA_PACKAGE_EXTENSIONS
+                            ) and os.path.isfile(pkg):
+                                # we only know how to test conda packages
+                                test(pkg, config=metadata.config.copy(), stats=stats)
+                            _, meta = dict_and_meta
+                            for package, test_config in _downstream_tests(
+                                metadata, pkg, meta
+                            ):
+                                test(package, config=test_config, stats=stats)
+                            built_packages.update({pkg: dict_and_meta})
+                    else:
+                        built_packages.update(packages_from_this)
+
+                    if os.path.exists(metadata.config.work_dir) and not (
+                        metadata.config.dirty
+                        or metadata.config.keep_old_work
+                        or metadata.get_value("build/no_move_top_level_workdir_loops")
+                    ):
+                        # force the build string to include hashes as necessary
+                        metadata.final = True
+                        dest = os.path.join(
+                            os.path.dirname(metadata.config.work_dir),
+                            "_".join(
+                                (
+                                    "work_moved",
+                                    metadata.dist(),
+                                    metadata.config.host_subdir,
+                                    "main_build_loop",
                                 )
+                            ),
+                        )
+                        # Needs to come after create_files in case there's test/source_files
+                        shutil_move_more_retrying(
+                            metadata.config.work_dir, dest, "work"
+                        )
 
-                        built_packages.update({pkg: dict_and_meta})
-                else:
-                    built_packages.update(packages_from_this)
+                # each metadata element here comes from one recipe, thus it will share one build id
+                #    cleaning on the last metadata in the loop should take care of all of the stuff.
+                metadata.clean()
 
-                if os.path.exists(metadata.config.work_dir) and not (
-                    metadata.config.dirty
-                    or metadata.config.keep_old_work
-                    or metadata.get_value("build/no_move_top_level_workdir_loops")
-                ):
-                    # force the build string to include hashes as necessary
-                    metadata.final = True
-                    dest = os.path.join(
-                        os.path.dirname(metadata.config.work_dir),
-                        "_".join(
-                            (
-                                "work_moved",
-                                metadata.dist(),
-                                metadata.config.host_subdir,
-                                "main_build_loop",
-                            )
-                        ),
-                    )
-                    # Needs to come after create_files in case there's test/source_files
-                    shutil_move_more_retrying(metadata.config.work_dir, dest, "work")
-
-            # each metadata element here comes from one recipe, thus it will share one build id
-            #    cleaning on the last metadata in the loop should take care of all of the stuff.
-            metadata.clean()
-
-            # We *could* delete `metadata_conda_debug.yaml` here, but the user may want to debug
-            # failures that happen after this point and we may as well not make that impossible.
-            # os.unlink(os.path.join(metadata.config.work_dir, 'metadata_conda_debug.yaml'))
-
-        except DependencyNeedsBuildingError as e:
-            skip_names = ["python", "r", "r-base", "mro-base", "perl", "lua"]
-            built_package_paths = [entry[1][1].path for entry in built_packages.items()]
-            add_recipes = []
-            # add the failed one back in at the beginning - but its deps may come before it
-            recipe_list.extendleft([recipe])
-            for pkg, matchspec in zip(e.packages, e.matchspecs):
-                pkg_name = pkg.split(" ")[0].split("=")[0]
-                # if we hit missing dependencies at test time, the error we get says that our
-                #    package that we just built needs to be built.  Very confusing.  Bomb out
-                #    if any of our output metadatas are in the exception list of pkgs.
-                if metadata and any(
-                    pkg_name == output_meta.name()
-                    for (_, output_meta) in metadata.get_output_metadata_set(
-                        permit_undefined_jinja=True
+                # We *could* delete `metadata_conda_debug.yaml` here, but the user may want to debug
+                # failures that happen after this point and we may as well not make that impossible.
+                # os.unlink(os.path.join(metadata.config.work_dir, 'metadata_conda_debug.yaml'))
+
+            except DependencyNeedsBuildingError as e:
+                skip_names = ["python", "r", "r-base", "mro-base", "perl", "lua"]
+                built_package_paths = [
+                    entry[1][1].path for entry in built_packages.items()
+                ]
+                add_recipes = []
+                # add the failed one back in at the beginning - but its deps may come before it
+                recipe_list.extendleft([recipe])
+                for pkg, matchspec in zip(e.packages, e.matchspecs):
+                    pkg_name = pkg.split(" ")[0].split("=")[0]
+                    # if we hit missing dependencies at test time, the error we get says that our
+                    #    package that we just built needs to be built.  Very confusing.  Bomb out
+                    #    if any of our output metadatas are in the exception list of pkgs.
+                    if metadata and any(
+                        pkg_name == output_meta.name()
+                        for (_, output_meta) in metadata.get_output_metadata_set(
+                            permit_undefined_jinja=True
+                        )
+                    ):
+                        raise
+                    if pkg in to_build_recursive:
+                        cfg.clean(remove_folders=False)
+                        raise RuntimeError(
+                            f"Can't build {recipe} due to environment creation error:\n"
+                            + str(e.message)
+                            + "\n"
+                            + extra_help
+                        )
+
+                    if pkg in skip_names:
+                        to_build_recursive.append(pkg)
+                        extra_help = (
+                            "Typically if a conflict is with the Python or R\n"
+                            "packages, the other package or one of its dependencies\n"
+                            "needs to be rebuilt (e.g., a conflict with 'python 3.5*'\n"
+                            "and 'x' means 'x' or one of 'x' dependencies isn't built\n"
+                            "for Python 3.5 and needs to be rebuilt."
+                        )
+
+                    recipe_glob = glob(os.path.join(recipe_parent_dir, pkg_name))
+                    # conda-forge style.  meta.yaml lives one level deeper.
+                    if not recipe_glob:
+                        recipe_glob = glob(
+                            os.path.join(recipe_parent_dir, "..", pkg_name)
+                        )
+                    feedstock_glob = glob(
+                        os.path.join(recipe_parent_dir, pkg_name + "-feedstock")
                     )
+                    if not feedstock_glob:
+                        feedstock_glob = glob(
+                            os.path.join(
+                                recipe_parent_dir, "..", pkg_name + "-feedstock"
+                            )
+                        )
+                    available = False
+                    if recipe_glob or feedstock_glob:
+                        for recipe_dir in recipe_glob + feedstock_glob:
+                            if not any(
+                                path.startswith(recipe_dir)
+                                for path in built_package_paths
+                            ):
+                                dep_metas = render_recipe(
+                                    recipe_dir, config=metadata.config
+                                )
+                                for dep_meta in dep_metas:
+                                    if utils.match_peer_job(
+                                        MatchSpec(matchspec), dep_meta[0], metadata
+                                    ):
+                                        print(
+                                            f"Missing dependency {pkg}, but found "
+                                            f"recipe directory, so building "
+                                            f"{pkg} first"
+                                        )
+                                        add_recipes.append(recipe_dir)
+                                        available = True
+                    if not available:
+                        cfg.clean(remove_folders=False)
+                        raise
+                # if we failed to render due to unsatisfiable dependencies, we should only bail out
+                #    if we've already retried this recipe.
+                if (
+                    not metadata
+                    and retried_recipes.count(recipe)
+                    and retried_recipes.count(recipe)
+                    >= len(metadata.ms_depends("build"))
                 ):
-                    raise
-                if pkg in to_build_recursive:
                     cfg.clean(remove_folders=False)
                     raise RuntimeError(
                         f"Can't build {recipe} due to environment creation error:\n"
@@ -3843,119 +4156,63 @@ def build_tree(
                         + "\n"
                         + extra_help
                     )
+                retried_recipes.append(os.path.basename(name))
+                recipe_list.extendleft(add_recipes)
 
-                if pkg in skip_names:
-                    to_build_recursive.append(pkg)
-                    extra_help = (
-                        "Typically if a conflict is with the Python or R\n"
-                        "packages, the other package or one of its dependencies\n"
-                        "needs to be rebuilt (e.g., a conflict with 'python 3.5*'\n"
-                        "and 'x' means 'x' or one of 'x' dependencies isn't built\n"
-                        "for Python 3.5 and needs to be rebuilt."
-                    )
-
-                recipe_glob = glob(os.path.join(recipe_parent_dir, pkg_name))
-                # conda-forge style.  meta.yaml lives one level deeper.
-                if not recipe_glob:
-                    recipe_glob = glob(os.path.join(recipe_parent_dir, "..", pkg_name))
-                feedstock_glob = glob(
-                    os.path.join(recipe_parent_dir, pkg_name + "-feedstock")
-                )
-                if not feedstock_glob:
-                    feedstock_glob = glob(
-                        os.path.join(recipe_parent_dir, "..", pkg_name + "-feedstock")
-                    )
-                available = False
-                if recipe_glob or feedstock_glob:
-                    for recipe_dir in recipe_glob + feedstock_glob:
-                        if not any(
-                            path.startswith(recipe_dir) for path in built_package_paths
-                        ):
-                            dep_metas = render_recipe(
-                                recipe_dir, config=metadata.config
-                            )
-                            for dep_meta in dep_metas:
-                                if utils.match_peer_job(
-                                    MatchSpec(matchspec), dep_meta[0], metadata
-                                ):
-                                    print(
-                                        f"Missing dependency {pkg}, but found "
-                                        f"recipe directory, so building "
-                                        f"{pkg} first"
-                                    )
-                                    add_recipes.append(recipe_dir)
-                                    available = True
-                if not available:
-                    cfg.clean(remove_folders=False)
-                    raise
-            # if we failed to render due to unsatisfiable dependencies, we should only bail out
-            #    if we've already retried this recipe.
-            if (
-                not metadata
-                and retried_recipes.count(recipe)
-                and retried_recipes.count(recipe) >= len(metadata.ms_depends("build"))
-            ):
-                cfg.clean(remove_folders=False)
-                raise RuntimeError(
-                    f"Can't build {recipe} due to environment creation error:\n"
-                    + str(e.message)
-                    + "\n"
-                    + extra_help
-                )
-            retried_recipes.append(os.path.basename(name))
-            recipe_list.extendleft(add_recipes)
-
-    tarballs = [f for f in built_packages if f.endswith(CONDA_PACKAGE_EXTENSIONS)]
-    if post in [True, None]:
-        # TODO: could probably use a better check for pkg type than this...
-        wheels = [f for f in built_packages if f.endswith(".whl")]
-        handle_anaconda_upload(tarballs, config=config)
-        handle_pypi_upload(wheels, config=config)
+        tarballs = [f for f in built_packages if f.endswith(CONDA_PACKAGE_EXTENSIONS)]
+        if post in [True, None]:
+            # TODO: could probably use a better check for pkg type than this...
+            wheels = [f for f in built_packages if f.endswith(".whl")]
+            handle_anaconda_upload(tarballs, config=config)
+            handle_pypi_upload(wheels, config=config)
 
-    # Print the variant information for each package because it is very opaque and never printed.
-    from .inspect_pkg import get_hash_input
+        # Print the variant information for each package because it is very opaque and never printed.
+        from .inspect_pkg import get_hash_input
 
-    hash_inputs = get_hash_input(tarballs)
-    print(
-        "\nINFO :: The inputs making up the hashes for the built packages are as follows:"
-    )
-    print(json.dumps(hash_inputs, sort_keys=True, indent=2))
-    print("\n")
+        hash_inputs = get_hash_input(tarballs)
+        print(
+            "\nINFO :: The inputs making up the hashes for the built packages are as follows:"
+        )
+        print(json.dumps(hash_inputs, sort_keys=True, indent=2))
+        print("\n")
 
-    total_time = time.time() - initial_time
-    max_memory_used = max([step.get("rss") for step in stats.values()] or [0])
-    total_disk = sum([step.get("disk") for step in stats.values()] or [0])
-    total_cpu_sys = sum([step.get("cpu_sys") for step in stats.values()] or [0])
-    total_cpu_user = sum([step.get("cpu_user") for step in stats.values()] or [0])
+        total_time = time.time() - initial_time
+        max_memory_used = max([step.get("rss") for step in stats.values()] or [0])
+        total_disk = sum([step.get("disk") for step in stats.values()] or [0])
+        total_cpu_sys = sum([step.get("cpu_sys") for step in stats.values()] or [0])
+        total_cpu_user = sum([step.get("cpu_user") for step in stats.values()] or [0])
 
-    print(
-        "{bar}\n"
-        "Resource usage summary:\n"
-        "\n"
-        "Total time: {elapsed}\n"
-        "CPU usage: sys={cpu_sys}, user={cpu_user}\n"
-        "Maximum memory usage observed: {memory}\n"
-        "Total disk usage observed (not including envs): {disk}".format(
-            bar="#" * 84,
-            elapsed=utils.seconds2human(total_time),
-            cpu_sys=utils.seconds2human(total_cpu_sys),
-            cpu_user=utils.seconds2human(total_cpu_user),
-            memory=utils.bytes2human(max_memory_used),
-            disk=utils.bytes2human(total_disk),
+        print(
+            "{bar}\n"
+            "Resource usage summary:\n"
+            "\n"
+            "Total time: {elapsed}\n"
+            "CPU usage: sys={cpu_sys}, user={cpu_user}\n"
+            "Maximum memory usage observed: {memory}\n"
+            "Total disk usage observed (not including envs): {disk}".format(
+                bar="#" * 84,
+                elapsed=utils.seconds2human(total_time),
+                cpu_sys=utils.seconds2human(total_cpu_sys),
+                cpu_user=utils.seconds2human(total_cpu_user),
+                memory=utils.bytes2human(max_memory_used),
+                disk=utils.bytes2human(total_disk),
+            )
         )
-    )
 
-    stats["total"] = {
-        "time": total_time,
-        "memory": max_memory_used,
-        "disk": total_disk,
-    }
+        stats["total"] = {
+            "time": total_time,
+            "memory": max_memory_used,
+            "disk": total_disk,
+        }
 
-    if config.stats_file:
-        with open(config.stats_file, "w") as f:
-            json.dump(stats, f)
+        if config.stats_file:
+            with open(config.stats_file, "w") as f:
+                json.dump(stats, f)
+            tracer.write(config.stats_file)
 
-    return list(built_packages.keys())
+        return list(built_packages.keys())
+    finally:
+        tracer.reset()
 
 
 def handle_anaconda_upload(
@@ -23,7 +23,13 @@ from ..config import (
     conda_pkg_format_default,
     get_channel_urls,
     get_or_merge_config,
+    stats_disk_interval_default,
+    stats_interval_default,
+    test_jobs_default,
     zstd_compression_level_default,
+    zstd_long_distance_matching_default,
+    zstd_threads_default,
+    zstd_window_log_default,
 )
 from ..utils import LoggingContext, is_v1_recipe
 from .actions import KeyValueAction, PackageTypeNormalize
@@ -100,6 +106,16 @@ def parse_args(args: Sequence[str] | None) -> tuple[ArgumentParser, Namespace]:
         dest="notest",
         help="Do not test the package.",
     )
+    parser.add_argument(
+        "--test-jobs",
+        type=int,
+        help=(
+            "Number of packages to test at the same time, each in its own process and "
+            "test environment. Their output is shown once they finish. Defaults to "
+            f"{test_jobs_default}, which tests them one after the other."
+        ),
+        default=context.conda_build.get("test_jobs", test_jobs_default),
+    )
     parser.add_argument(
         "-b",
         "--build-only",
@@ -198,6 +214,44 @@ def parse_args(args: Sequence[str] | None) -> tuple[ArgumentParser, Namespace]:
             "zstd_compression_level", zstd_compression_level_default
         ),
     )
+    parser.add_argument(
+        "--zstd-threads",
+        help=(
+            "When building v2 packages, the number of zstd worker threads compressing "
+            "in parallel. 0 compresses in a single thread, -1 uses one worker per CPU. "
+            f"Defaults to {zstd_threads_default}."
+        ),
+        type=int,
+        default=context.conda_build.get("zstd_threads", zstd_threads_default),
+    )
+    parser.add_argument(
+        "--zstd-long-distance-matching",
+        help=(
+            "When building v2 packages, enable zstd long distance matching, which "
+            "finds repetitions across large packages at the cost of memory. "
+            "--no-zstd-long-distance-matching turns it off when the condarc enables it."
+        ),
+        action=argparse.BooleanOptionalAction,
+        default=str(
+            context.conda_build.get(
+                "zstd_long_distance_matching", zstd_long_distance_matching_default
+            )
+        ).lower()
+        == "true",
+    )
+    parser.add_argument(
+        "--zstd-window-log",
+        help=(
+            "When building v2 packages, log2 of the zstd window size. Larger windows "
+            "compress large packages better but need more memory to decompress. 0 "
+            "uses the default of the compression level. "
+            f"Defaults to {zstd_window_log_default}."
+        ),
+        type=int,
+        # conda only decompresses windows up to 2**27 without extra settings
+        choices=[0, *range(10, 28)],
+        default=context.conda_build.get("zstd_window_log", zstd_window_log_default),
+    )
     pypi_grp = parser.add_argument_group("PyPI upload parameters (twine)")
     pypi_grp.add_argument(
         "--password",
@@ -464,6 +518,28 @@ def parse_args(args: Sequence[str] | None) -> tuple[ArgumentParser, Namespace]:
         "--stats-file",
         help="File path to save build statistics to.  Stats are in JSON format",
     )
+    parser.add_argument(
+        "--stats-interval",
+        type=float,
+        help=(
+            "Seconds between memory and CPU usage samples of build, test and bundle "
+            f"scripts.  Defaults to {stats_interval_default}."
+        ),
+        default=context.conda_build.get("stats_interval", stats_interval_default),
+    )
+    parser.add_argument(
+        "--stats-disk-interval",
+        type=float,
+        help=(
+            "Seconds between disk usage samples of the work directory while build, "
+            "test and bundle scripts run.  0 only measures it when they finish, which "
+            f"avoids competing with the build for I/O.  Defaults to "
+            f"{stats_disk_interval_default}."
+        ),
+        default=context.conda_build.get(
+            "stats_disk_interval", stats_disk_interval_default
+        ),
+    )
     parser.add_argument(
         "--extra-deps",
         nargs="+",
@@ -526,10 +602,10 @@ def check_recipe(path_list):
             )
 
 
-def output_action(recipe: os.PathLike, config: Config):
+def output_action(recipe: os.PathLike | Sequence[os.PathLike], config: Config):
     """Output the conda package filename which would have been created
 
-    :param recipe: Path to recipe or recipe folder
+    :param recipe: Path to recipe or recipe folder, or a list of them to render in one go
     :param config: Config object used for various options
     """
     with LoggingContext(logging.CRITICAL + 1):
@@ -604,8 +680,7 @@ def execute(args: Sequence[str] | None = None) -> int:
         config.verbose = False
         config.quiet = True
         config.debug = False
-        for recipe in parsed.recipe:
-            output_action(recipe, config)
+        output_action(parsed.recipe, config)
         return 0
 
     if parsed.test:
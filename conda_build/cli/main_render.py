@@ -226,6 +226,18 @@ def execute(args: Sequence[str] | None = None) -> int:
         config.verbose = False
         config.debug = False
 
+        # only the filenames are needed, which rarely requires solving any environment
+        if not parsed.file:
+            with LoggingContext(logging.CRITICAL + 1):
+                paths = api.get_output_file_paths(
+                    parsed.recipe,
+                    config=config,
+                    no_download_source=parsed.no_source,
+                    variants=parsed.variants,
+                )
+                print("\n".join(sorted(paths)))
+            return 0
+
     metadata_tuples = api.render(
         parsed.recipe,
         config=config,
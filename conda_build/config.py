@@ -103,6 +103,12 @@ ignore_verify_codes_default = []
 exit_on_verify_error_default = False
 conda_pkg_format_default = CondaPkgFormat.V2
 zstd_compression_level_default = 19
+zstd_threads_default = 0
+zstd_long_distance_matching_default = "false"
+zstd_window_log_default = 0
+test_jobs_default = 1
+stats_interval_default = 2
+stats_disk_interval_default = 0
 
 
 # we need this to be accessible to the CLI, so it needs to be more static.
@@ -175,6 +181,12 @@ def _get_default_settings():
             os.environ.get("CONDA_BUILD_TEST_ENV_TEMPLATE"),
         ),
         Setting("copy_test_source_files", True),
+        # number of packages tested at the same time, each in its own process and
+        #    test prefix
+        Setting(
+            "test_jobs",
+            int(context.conda_build.get("test_jobs", test_jobs_default)),
+        ),
         # should rendering cut out any skipped metadata?
         Setting("trim_skip", True),
         # Use channeldata.json for run_export information during rendering.
@@ -272,6 +284,20 @@ def _get_default_settings():
         Setting("_merge_build_host", False),
         # path to output build statistics to
         Setting("stats_file", None),
+        # seconds between memory/CPU samples of build, test and bundle scripts
+        Setting(
+            "stats_interval",
+            float(context.conda_build.get("stats_interval", stats_interval_default)),
+        ),
+        # seconds between work dir size samples, 0 measures only before and after
+        Setting(
+            "stats_disk_interval",
+            float(
+                context.conda_build.get(
+                    "stats_disk_interval", stats_disk_interval_default
+                )
+            ),
+        ),
         # extra deps to add to test env creation
         Setting("extra_deps", []),
         # customize this so pip doesn't look in places we don't want.  Per-build path by default.
@@ -282,6 +308,27 @@ def _get_default_settings():
                 "zstd_compression_level", zstd_compression_level_default
             ),
         ),
+        # zstd worker threads for .conda packages, 0 compresses in the calling thread
+        # and -1 uses one worker per CPU
+        Setting(
+            "zstd_threads",
+            int(context.conda_build.get("zstd_threads", zstd_threads_default)),
+        ),
+        Setting(
+            "zstd_long_distance_matching",
+            str(
+                context.conda_build.get(
+                    "zstd_long_distance_matching",
+                    zstd_long_distance_matching_default,
+                )
+            ).lower()
+            == "true",
+        ),
+        # log2 of the zstd window size, 0 uses the default of the compression level
+        Setting(
+            "zstd_window_log",
+            int(context.conda_build.get("zstd_window_log", zstd_window_log_default)),
+        ),
         Setting(
             "conda_pkg_format",
             CondaPkgFormat.normalize(
@@ -801,6 +848,13 @@ class Config:
         os.makedirs(path, exist_ok=True)
         return path
 
+    @property
+    def static_lib_index(self):
+        """Where the symbols exported by static libraries are indexed"""
+        path = join(self.src_cache_root, "static_lib_index")
+        os.makedirs(path, exist_ok=True)
+        return path
+
     @property
     def work_dir(self):
         """Where the source for the build is extracted/copied to."""
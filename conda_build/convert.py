@@ -6,22 +6,96 @@ Tools for converting conda packages
 
 from __future__ import annotations
 
+import copy
 import glob
 import hashlib
+import io
 import json
 import os
 import re
 import shutil
 import tarfile
 import tempfile
+import threading
+from abc import ABC, abstractmethod
+from contextlib import ExitStack
 from pathlib import Path
+from queue import Queue
 from typing import TYPE_CHECKING
+from zipfile import ZipFile
 
+import zstandard
+
+from .config import Config
+from .deprecations import deprecated
 from .exceptions import CondaBuildUserError
+from .package_writer import CondaPackageWriter, is_info_file, zstd_compressor
 from .utils import ensure_list, filter_info_files, tar_xf, walk
 
 if TYPE_CHECKING:
-    from collections.abc import Iterable
+    from collections.abc import Iterable, Iterator
+    from typing import BinaryIO
+
+    # a package member and the content of regular files
+    Member = tuple[tarfile.TarInfo, bytes | None]
+
+PREFIX_PLACEHOLDER = "/opt/anaconda1anaconda2anaconda3"
+
+C_EXTENSION_PATTERN = re.compile(
+    r"(Lib\/|lib\/python\d\.\d\/|lib\/)(site-packages\/|lib-dynload)?(.*)"
+)
+
+# bytes of members read but not yet written by every target platform; a larger member
+#    is still read, but only once all the others are written
+MEMBER_BUFFER_SIZE = 256 * 2**20
+# what a member without data (or with little of it) counts for
+MEMBER_OVERHEAD = 512
+
+
+def split_package_name(file_path: str) -> tuple[str, str]:
+    """The name of a ``.tar.bz2`` or ``.conda`` package without and with its extension."""
+    name = os.path.basename(file_path)
+    for extension in (".tar.bz2", ".conda"):
+        if name.endswith(extension):
+            return name[: -len(extension)], extension
+    raise CondaBuildUserError(f"cannot convert: {file_path}")
+
+
+def iter_package(
+    file_path: str, components: Iterable[str] = ("info", "pkg")
+) -> Iterator[tuple[tarfile.TarInfo, BinaryIO | None]]:
+    """
+    The members of a ``.tar.bz2`` or ``.conda`` package in archive order, read as a stream
+    and with a file object for the content of regular files, which is only valid until
+    the next member. ``components`` selects those of a ``.conda`` package.
+    """
+    stem, extension = split_package_name(file_path)
+    with ExitStack() as stack:
+        if extension == ".tar.bz2":
+            tars = [stack.enter_context(tarfile.open(file_path, "r|bz2"))]
+        else:
+            package = stack.enter_context(ZipFile(file_path))
+            tars = (
+                _open_component(stack, package, f"{component}-{stem}.tar.zst")
+                for component in components
+            )
+        for tar in tars:
+            for tarinfo in tar:
+                yield tarinfo, tar.extractfile(tarinfo) if tarinfo.isreg() else None
+
+
+def _open_component(stack: ExitStack, package: ZipFile, name: str) -> tarfile.TarFile:
+    compressed = stack.enter_context(package.open(name))
+    reader = stack.enter_context(zstandard.ZstdDecompressor().stream_reader(compressed))
+    return stack.enter_context(tarfile.open(fileobj=reader, mode="r|"))
+
+
+def read_index(file_path: str) -> dict:
+    """The ``info/index.json`` of a package, read without decompressing more than needed."""
+    for tarinfo, fileobj in iter_package(file_path, components=("info",)):
+        if tarinfo.name == "info/index.json":
+            return json.load(fileobj)
+    raise CondaBuildUserError(f"{file_path} has no info/index.json")
 
 
 def retrieve_c_extensions(file_path, show_imports=False):
@@ -37,31 +111,27 @@ def retrieve_c_extensions(file_path, show_imports=False):
     Keyword arguments:
     show_imports (bool) -- output the C extensions included in the package
     """
-    c_extension_pattern = re.compile(
-        r"(Lib\/|lib\/python\d\.\d\/|lib\/)(site-packages\/|lib-dynload)?(.*)"
-    )
-
     imports = []
-    with tarfile.open(file_path) as tar:
-        for filename in tar.getnames():
-            if filename.endswith((".pyd", ".so")):
-                filename_match = c_extension_pattern.match(filename)
-                import_name = "import {}".format(
-                    filename_match.group(3).replace("/", ".")
-                )
-                imports.append(import_name)
+    for tarinfo, _ in iter_package(file_path):
+        if tarinfo.name.endswith((".pyd", ".so")):
+            filename_match = C_EXTENSION_PATTERN.match(tarinfo.name)
+            import_name = "import {}".format(filename_match.group(3).replace("/", "."))
+            imports.append(import_name)
 
     return imports
 
 
-def retrieve_package_platform(file_path):
+def retrieve_package_platform(file_path, index=None):
     """Retrieve the platform and architecture of the source package.
 
     Positional arguments:
     file_path (str) -- the file path to the source package tar file
+
+    Keyword arguments:
+    index (dict) -- the source package's index.json contents, if already read
     """
-    with tarfile.open(file_path) as tar:
-        index = json.loads(tar.extractfile("info/index.json").read().decode("utf-8"))
+    if index is None:
+        index = read_index(file_path)
 
     platform = index["platform"]
 
@@ -103,7 +173,10 @@ def retrieve_python_version(file_path):
             return matched.group(0)
 
     else:
-        if file_path.endswith((".tar.bz2", ".tar")):
+        if file_path.endswith((".tar.bz2", ".conda")):
+            index = read_index(file_path)
+
+        elif file_path.endswith(".tar"):
             with tarfile.open(file_path) as tar:
                 index = json.loads(
                     tar.extractfile("info/index.json").read().decode("utf-8")
@@ -115,12 +188,19 @@ def retrieve_python_version(file_path):
             with open(path_file) as index_file:
                 index = json.load(index_file)
 
-        build_version_number = re.search(r"(.*)?(py)(\d\d)(.*)?", index["build"]).group(
-            3
-        )
-        build_version = re.sub(r"\A.*py\d\d.*\Z", "python", index["build"])
+        return python_version_from_index(index)
 
-        return f"{build_version}{build_version_number[0]}.{build_version_number[1]}"
+
+def python_version_from_index(index):
+    """Retrieve the python version (e.g. 'python3.6') from the build string of a package.
+
+    Positional arguments:
+    index (dict) -- the contents of the package's index.json file
+    """
+    build_version_number = re.search(r"(.*)?(py)(\d\d)(.*)?", index["build"]).group(3)
+    build_version = re.sub(r"\A.*py\d\d.*\Z", "python", index["build"])
+
+    return f"{build_version}{build_version_number[0]}.{build_version_number[1]}"
 
 
 def extract_temporary_directory(file_path):
@@ -183,6 +263,24 @@ def update_index_file(temp_dir, target_platform, dependencies, verbose):
     with open(index_file) as file:
         index = json.load(file)
 
+    update_index(index, target_platform, dependencies, verbose)
+
+    with open(index_file, "w") as file:
+        json.dump(index, file, indent=2)
+
+    return index_file
+
+
+def update_index(index, target_platform, dependencies, verbose):
+    """Update the contents of an index.json file with the target platform's information.
+
+    Positional arguments:
+    index (dict) -- the source package's index.json contents, updated in place
+    target_platform (str) -- the target platform and architecture in
+        the form of platform-architecture such as linux-64
+    dependencies (List[str]) -- the dependencies passed from the command line
+    verbose (bool) -- show output of items that are updated
+    """
     platform, architecture = target_platform.split("-")
     other_platforms = [
         "linux-ppc64",
@@ -218,10 +316,7 @@ def update_index_file(temp_dir, target_platform, dependencies, verbose):
     if dependencies:
         index["depends"] = update_dependencies(dependencies, index["depends"])
 
-    with open(index_file, "w") as file:
-        json.dump(index, file, indent=2)
-
-    return index_file
+    return index
 
 
 def update_lib_path(path, target_platform, temp_dir=None):
@@ -640,6 +735,7 @@ def create_target_archive(file_path, temp_dir, platform, output_dir):
                 target.add(os.path.join(temp_dir, filename), arcname=filename)
 
 
+@deprecated("27.3", "27.9", addendum="Use `conda_build.convert.conda_convert` instead.")
 def convert_between_unix_platforms(
     file_path, output_dir, platform, dependencies, verbose
 ):
@@ -662,6 +758,7 @@ def convert_between_unix_platforms(
     shutil.rmtree(temp_dir)
 
 
+@deprecated("27.3", "27.9", addendum="Use `conda_build.convert.conda_convert` instead.")
 def convert_between_windows_architechtures(
     file_path, output_dir, platform, dependencies, verbose
 ):
@@ -684,6 +781,7 @@ def convert_between_windows_architechtures(
     shutil.rmtree(temp_dir)
 
 
+@deprecated("27.3", "27.9", addendum="Use `conda_build.convert.conda_convert` instead.")
 def convert_from_unix_to_windows(
     file_path, output_dir, platform, dependencies, verbose
 ):
@@ -734,6 +832,7 @@ def convert_from_unix_to_windows(
     shutil.rmtree(temp_dir)
 
 
+@deprecated("27.3", "27.9", addendum="Use `conda_build.convert.conda_convert` instead.")
 def convert_from_windows_to_unix(
     file_path, output_dir, platform, dependencies, verbose
 ):
@@ -779,6 +878,402 @@ def convert_from_windows_to_unix(
     shutil.rmtree(temp_dir)
 
 
+def _replaced(
+    tarinfo: tarfile.TarInfo, data: bytes | None, name: str | None = None
+) -> Member:
+    """A copy of a member (they are shared between targets) with a new name or content."""
+    tarinfo = copy.copy(tarinfo)
+    if name is not None:
+        tarinfo.name = name
+    if data is not None:
+        tarinfo.size = len(data)
+    return tarinfo, data
+
+
+def _script_lines(data: bytes) -> list[str]:
+    return data.decode("utf-8", "surrogateescape").splitlines()
+
+
+def _script_content(lines: Iterable[str]) -> bytes:
+    return "".join(f"{line}\n" for line in lines).encode("utf-8", "surrogateescape")
+
+
+class PackageConversion:
+    """Convert the members of a package to a platform of the same family.
+
+    Only info/index.json changes. :meth:`convert` is called with each member of the
+    source package, in order, and :meth:`finish` once all of them were converted.
+
+    Positional arguments:
+    platform (str) -- the platform to convert to, such as 'linux-64'
+    index (dict) -- the contents of the source package's index.json file
+    dependencies (List[str]) -- the dependencies passed from the command line
+    verbose (bool) -- show output of items that are updated
+    """
+
+    def __init__(self, platform, index, dependencies, verbose):
+        self.platform = platform
+        self.index = update_index(
+            copy.deepcopy(index), platform, list(dependencies), verbose
+        )
+        self.verbose = verbose
+
+    def convert(self, tarinfo: tarfile.TarInfo, data: bytes | None) -> Iterator[Member]:
+        if tarinfo.name == "info/index.json":
+            yield _replaced(tarinfo, json.dumps(self.index, indent=2).encode())
+        else:
+            yield tarinfo, data
+
+    def finish(self) -> Iterator[Member]:
+        yield from ()
+
+
+class CrossPackageConversion(PackageConversion, ABC):
+    """Convert the members of a package between unix and windows.
+
+    Files are moved and scripts rewritten as they stream by. info/paths.json,
+    info/files and info/has_prefix depend on all of them and are written last.
+    """
+
+    deferred = ("info/paths.json", "info/files", "info/has_prefix")
+
+    def __init__(self, platform, index, dependencies, verbose):
+        super().__init__(platform, index, dependencies, verbose)
+        # source path -> converted path (None when removed), for info/paths.json
+        self.moved: dict[str, str | None] = {}
+        # converted path -> content, of the files with a new content
+        self.rewritten: dict[str, bytes] = {}
+        self.added: dict[str, bytes] = {}
+        self.prefixes: set[str] = set()
+        self.files: list[str] = []
+        self.info: dict[str, Member] = {}
+
+    def convert(self, tarinfo, data):
+        if tarinfo.name in self.deferred or tarinfo.name == "info/index.json":
+            # the deferred files are rewritten from a copy of one of them
+            self.info[tarinfo.name] = tarinfo, data
+            return
+        for member in self.move(tarinfo, data):
+            if not is_info_file(member[0].name) and not member[0].isdir():
+                self.files.append(member[0].name)
+            yield member
+
+    @abstractmethod
+    def move(self, tarinfo: tarfile.TarInfo, data: bytes | None) -> Iterator[Member]:
+        """The members ``tarinfo`` becomes on the other platform."""
+
+    def moved_member(self, tarinfo, data, name):
+        self.moved[tarinfo.name] = name
+        if tarinfo.islnk():
+            tarinfo = copy.copy(tarinfo)
+            tarinfo.linkname = self.moved.get(tarinfo.linkname, tarinfo.linkname)
+        return _replaced(tarinfo, data, name)
+
+    def rewritten_member(self, tarinfo, data, name):
+        self.rewritten[name] = data
+        return self.moved_member(tarinfo, data, name)
+
+    def finish(self):
+        template = self.info["info/index.json"][0]
+        yield _replaced(template, json.dumps(self.index, indent=2).encode())
+
+        if "info/paths.json" in self.info:
+            tarinfo, data = self.info["info/paths.json"]
+            paths = json.loads(data)
+            converted = []
+            for path in paths["paths"]:
+                path["_path"] = self.moved.get(path["_path"], path["_path"])
+                if path["_path"] is None:
+                    continue
+                if path["_path"] in self.rewritten:
+                    content = self.rewritten[path["_path"]]
+                    path["sha256"] = hashlib.sha256(content).hexdigest()
+                    path["size_in_bytes"] = len(content)
+                converted.append(path)
+            for added, content in self.added.items():
+                converted.append(
+                    {
+                        "_path": added,
+                        "path_type": "hardlink",
+                        "sha256": hashlib.sha256(content).hexdigest(),
+                        "size_in_bytes": len(content),
+                    }
+                )
+            paths["paths"] = converted
+            yield _replaced(tarinfo, json.dumps(paths, indent=2).encode())
+
+        if self.verbose:
+            for path in self.files:
+                print(f"Updating {path}")
+        files = "".join(f"{path}\n" for path in sorted(self.files))
+        tarinfo = self.info.get("info/files", (template,))[0]
+        yield _replaced(tarinfo, files.encode(), name="info/files")
+
+        has_prefix = "".join(sorted(self.prefixes))
+        tarinfo = self.info.get("info/has_prefix", (template,))[0]
+        yield _replaced(tarinfo, has_prefix.encode(), name="info/has_prefix")
+
+
+class UnixToWindowsConversion(CrossPackageConversion):
+    """Convert the members of a unix package to windows.
+
+    lib/pythonX.Y/ becomes Lib/ (and lib/ Lib/), bin/ becomes Scripts/, where scripts
+    lose their shebang line, are renamed with a '-script.py' suffix and get an exe.
+    """
+
+    def __init__(self, platform, index, dependencies, verbose):
+        super().__init__(platform, index, dependencies, verbose)
+        # FIXME: Update once win-arm64 native launcher is available
+        launcher = "cli-32.exe" if platform == "win-32" else "cli-64.exe"
+        with open(os.path.join(os.path.dirname(__file__), launcher), "rb") as f:
+            self.launcher = f.read()
+
+    def move(self, tarinfo, data):
+        parts = tarinfo.name.split("/")
+        if parts[0] == "lib":
+            if len(parts) > 1 and re.fullmatch(r"python\d\.\d+", parts[1]):
+                if len(parts) == 2:
+                    # the directory itself, its contents move up
+                    return
+                del parts[1]
+            parts[0] = "Lib"
+            yield self.moved_member(tarinfo, data, "/".join(parts))
+
+        elif parts[0] == "bin":
+            parts[0] = "Scripts"
+            if (
+                len(parts) == 2
+                and tarinfo.isreg()
+                and not parts[1].startswith(".")
+                and b"\0" not in data
+            ):
+                name = retrieve_executable_name(parts[1])
+                script = f"Scripts/{name}-script.py"
+                content = _script_content(_script_lines(data)[1:])
+                yield self.rewritten_member(tarinfo, content, script)
+
+                executable = f"Scripts/{name}.exe"
+                self.added[executable] = self.launcher
+                yield _replaced(tarinfo, self.launcher, executable)
+                self.prefixes.add(f"{PREFIX_PLACEHOLDER} text {script}\n")
+            else:
+                yield self.moved_member(tarinfo, data, "/".join(parts))
+
+        else:
+            yield tarinfo, data
+
+
+class WindowsToUnixConversion(CrossPackageConversion):
+    """Convert the members of a windows package to unix.
+
+    Lib/ becomes lib/pythonX.Y/ and Scripts/ becomes bin/, where the '-script.py'
+    suffix of scripts is replaced by a shebang line and exe and bat files are dropped.
+    """
+
+    def move(self, tarinfo, data):
+        parts = tarinfo.name.split("/")
+        if parts[0] == "Lib":
+            python_version = python_version_from_index(self.index)
+            if len(parts) == 1:
+                yield self.moved_member(tarinfo, data, "lib")
+                yield _replaced(tarinfo, data, f"lib/{python_version}")
+            else:
+                parts[0:1] = ["lib", python_version]
+                yield self.moved_member(tarinfo, data, "/".join(parts))
+
+        elif parts[0] == "Scripts":
+            parts[0] = "bin"
+            if len(parts) == 2 and parts[1].endswith((".exe", ".bat")):
+                self.moved[tarinfo.name] = None
+            elif (
+                len(parts) == 2
+                and tarinfo.isreg()
+                and parts[1].endswith(".py")
+                and not parts[1].startswith(".")
+                and b"\0" not in data
+            ):
+                script = f"bin/{parts[1].replace('-script.py', '')}"
+                lines = [f"#!{PREFIX_PLACEHOLDER}/bin/python", *_script_lines(data)]
+                yield self.rewritten_member(tarinfo, _script_content(lines), script)
+                self.prefixes.add(f"{PREFIX_PLACEHOLDER} text {script}\n")
+            else:
+                yield self.moved_member(tarinfo, data, "/".join(parts))
+
+        else:
+            yield tarinfo, data
+
+
+class _TarBz2Writer:
+    def __init__(self, path):
+        self.tar = tarfile.open(path, "w:bz2")
+
+    def add(self, tarinfo, data):
+        self.tar.addfile(tarinfo, None if data is None else io.BytesIO(data))
+
+    def close(self):
+        self.tar.close()
+
+
+class _CondaWriter:
+    """Stream the pkg component; the (small) info files are written after it."""
+
+    def __init__(self, path, compressor):
+        self.writer = CondaPackageWriter(path, compressor)
+        self.stack = ExitStack()
+        self.pkg = self.stack.enter_context(self.writer.component("pkg"))
+        self.info = []
+
+    def add(self, tarinfo, data):
+        if is_info_file(tarinfo.name):
+            self.info.append((tarinfo, data))
+        else:
+            self.pkg.addfile(tarinfo, None if data is None else io.BytesIO(data))
+
+    def close(self):
+        self.stack.close()
+        with self.writer.component("info") as tar:
+            for tarinfo, data in self.info:
+                tar.addfile(tarinfo, None if data is None else io.BytesIO(data))
+        self.writer.close()
+
+
+class _MemberBuffer:
+    """Bound the bytes of the members handed to the conversion threads.
+
+    :meth:`acquire` blocks the reader until the member fits; every thread calls
+    :meth:`release` once it wrote the member, and its bytes are freed after the last one.
+    """
+
+    def __init__(self, size, consumers):
+        self.size = size
+        self.consumers = consumers
+        self.used = 0
+        self.pending = {}
+        self.condition = threading.Condition()
+
+    def acquire(self, tarinfo):
+        size = max(tarinfo.size, MEMBER_OVERHEAD)
+        with self.condition:
+            self.condition.wait_for(
+                lambda: not self.used or self.used + size <= self.size
+            )
+            self.used += size
+            self.pending[id(tarinfo)] = [size, self.consumers]
+
+    def release(self, tarinfo):
+        with self.condition:
+            pending = self.pending[id(tarinfo)]
+            pending[1] -= 1
+            if not pending[1]:
+                del self.pending[id(tarinfo)]
+                self.used -= pending[0]
+                self.condition.notify_all()
+
+
+class _ConversionThread(threading.Thread):
+    """Convert the members put in :attr:`queue` and write them to ``destination``."""
+
+    def __init__(self, conversion, destination, buffer, compressor):
+        super().__init__(name=f"convert-{conversion.platform}", daemon=True)
+        self.conversion = conversion
+        self.destination = destination
+        self.tmp_dir = tempfile.mkdtemp(
+            prefix=".tmp-", dir=os.path.dirname(destination)
+        )
+        self.partial = os.path.join(self.tmp_dir, os.path.basename(destination))
+        self.buffer = buffer
+        self.compressor = compressor
+        self.queue = Queue()
+        self.aborted = False
+        self.error = None
+
+    def run(self):
+        members = iter(self.queue.get, None)
+        try:
+            if self.destination.endswith(".conda"):
+                writer = _CondaWriter(self.partial, self.compressor)
+            else:
+                writer = _TarBz2Writer(self.partial)
+            for tarinfo, data in members:
+                try:
+                    for converted in self.conversion.convert(tarinfo, data):
+                        writer.add(*converted)
+                finally:
+                    self.buffer.release(tarinfo)
+            if not self.aborted:
+                for converted in self.conversion.finish():
+                    writer.add(*converted)
+            writer.close()
+        except BaseException as e:
+            self.error = e
+        # never leave the reader blocked on a failed target
+        for tarinfo, _ in members:
+            self.buffer.release(tarinfo)
+
+    def close(self, abort=False):
+        self.aborted = abort
+        self.queue.put(None)
+        self.join()
+        if not abort and self.error is None:
+            os.replace(self.partial, self.destination)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        if self.error is not None and not abort:
+            raise self.error
+
+
+def convert_package(file_path, output_dir, conversions, config=None):
+    """Convert a package to several platforms in one pass over its contents.
+
+    The source package is read once, as a stream, and each of its members is handed
+    to one thread per target platform, which converts it and writes (and compresses)
+    the converted package. The converted packages have the format of the source one.
+
+    Positional arguments:
+    file_path (str) -- the file path to the source package's .tar.bz2 or .conda file
+    output_dir (str) -- the file path to where to output the converted packages
+    conversions (List[PackageConversion]) -- the conversions to the target platforms
+
+    Keyword arguments:
+    config (Config) -- the zstd settings of .conda outputs
+    """
+    config = config or Config()
+    compressor = zstd_compressor(
+        config.zstd_compression_level,
+        threads=config.zstd_threads,
+        long_distance_matching=config.zstd_long_distance_matching,
+        window_log=config.zstd_window_log,
+    )
+    buffer = _MemberBuffer(MEMBER_BUFFER_SIZE, len(conversions))
+    threads = []
+    for conversion in conversions:
+        output_directory = os.path.join(output_dir, conversion.platform)
+        os.makedirs(output_directory, exist_ok=True)
+        destination = os.path.join(output_directory, os.path.basename(file_path))
+        threads.append(_ConversionThread(conversion, destination, buffer, compressor))
+    for thread in threads:
+        thread.start()
+
+    try:
+        for tarinfo, fileobj in iter_package(file_path):
+            buffer.acquire(tarinfo)
+            data = None if fileobj is None else fileobj.read()
+            for thread in threads:
+                thread.queue.put((tarinfo, data))
+    except BaseException:
+        for thread in threads:
+            thread.close(abort=True)
+        raise
+
+    errors = []
+    for thread in threads:
+        try:
+            thread.close()
+        except Exception as e:
+            errors.append(e)
+    if errors:
+        raise errors[0]
+
+
 def conda_convert(
     file_path: str,
     output_dir: str = ".",
@@ -789,6 +1284,7 @@ def conda_convert(
     verbose: bool = False,
     quiet: bool = False,
     dry_run: bool = False,
+    config: Config | None = None,
 ) -> None:
     """Convert a conda package between different platforms and architectures.
 
@@ -804,6 +1300,7 @@ def conda_convert(
     verbose (bool) -- show output of items that are updated
     quiet (bool) -- hide all output except warnings and errors
     dry_run (bool) -- show which conversions will take place
+    config (Config) -- the zstd settings of .conda outputs, from the condarc by default
     """
 
     platforms = ensure_list(platforms)
@@ -823,14 +1320,15 @@ def conda_convert(
             "Error: --platform option required for conda package conversion."
         )
 
-    if len(retrieve_c_extensions(file_path)) > 0 and not force:
+    if not force and retrieve_c_extensions(file_path):
         raise CondaBuildUserError(
             f"WARNING: Package {os.path.basename(file_path)} contains C extensions; skipping conversion. "
             "Use -f to force conversion."
         )
 
+    index = read_index(file_path)
     conversion_platform, source_platform, architecture = retrieve_package_platform(
-        file_path
+        file_path, index
     )
     source_platform_architecture = f"{source_platform}-{architecture}"
 
@@ -851,6 +1349,7 @@ def conda_convert(
             "win-arm64",
         ]
 
+    conversions = []
     for platform in platforms:
         if platform == source_platform_architecture:
             print(
@@ -864,22 +1363,13 @@ def conda_convert(
                 f"Converting {os.path.basename(file_path)} from {source_platform_architecture} to {platform}"
             )
 
-        if platform.startswith(("osx", "linux")) and conversion_platform == "unix":
-            convert_between_unix_platforms(
-                file_path, output_dir, platform, dependencies, verbose
-            )
-
-        elif platform.startswith("win") and conversion_platform == "unix":
-            convert_from_unix_to_windows(
-                file_path, output_dir, platform, dependencies, verbose
-            )
-
-        elif platform.startswith(("osx", "linux")) and conversion_platform == "win":
-            convert_from_windows_to_unix(
-                file_path, output_dir, platform, dependencies, verbose
-            )
+        if platform.startswith("win") == (conversion_platform == "win"):
+            conversion = PackageConversion
+        elif conversion_platform == "unix":
+            conversion = UnixToWindowsConversion
+        else:
+            conversion = WindowsToUnixConversion
+        conversions.append(conversion(platform, index, dependencies, verbose))
 
-        elif platform.startswith("win") and conversion_platform == "win":
-            convert_between_windows_architechtures(
-                file_path, output_dir, platform, dependencies, verbose
-            )
+    if conversions:
+        convert_package(file_path, output_dir, conversions, config=config)
@@ -47,6 +47,7 @@ from .exceptions import BuildLockError, DependencyNeedsBuildingError
 from .features import feature_list
 from .index import get_build_index
 from .os_utils import external
+from .tracing import argument_attributes, traced
 from .utils import (
     CONDA_PACKAGE_EXTENSIONS,
     ensure_list,
@@ -829,6 +830,7 @@ last_index_ts = 0
 # NOTE: The function has to retain the "get_install_actions" name for now since
 #       conda_libmamba_solver.solver.LibMambaSolver._called_from_conda_build
 #       checks for this name in the call stack explicitly.
+@traced("solve", argument_attributes(env="env", subdir="subdir"))
 def get_install_actions(
     prefix: str | os.PathLike | Path,
     specs: Iterable[str | MatchSpec],
@@ -1077,6 +1079,7 @@ def _clone_template_env(
         return False
 
 
+@traced("create_env", argument_attributes(env="env", subdir="subdir"))
 def create_env(
     prefix: str | os.PathLike | Path,
     specs_or_precs: Iterable[str | MatchSpec] | Iterable[PackageRecord],
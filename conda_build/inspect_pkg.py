@@ -26,7 +26,7 @@ from .os_utils.ldd import (
     get_package_obj_files,
     get_untracked_obj_files,
 )
-from .os_utils.liefldd import codefile_class, machofile
+from .os_utils.liefldd import codefile_class, machofile, search_path_cache
 from .os_utils.macho import get_rpaths, human_filetype
 from .utils import (
     comma_join,
@@ -45,6 +45,48 @@ if TYPE_CHECKING:
 log = get_logger(__name__)
 
 
+# the build, host and test prefixes of a build, and one more
+_PREFIX_PATH_INDEXES_MAX = 4
+
+# prefix => (state of conda-meta, normcased path => records of the packages with it),
+# least recently used first
+_prefix_path_indexes: dict[
+    str, tuple[tuple[int, frozenset[str]] | None, dict[str, list[PrefixRecord]]]
+] = {}
+
+
+def _prefix_path_index(
+    prefix: str | os.PathLike | Path,
+) -> dict[str, list[PrefixRecord]]:
+    """
+    The packages installed in ``prefix`` by the (normcased) paths of their files, built
+    once for all the lookups of :func:`which_package` and built again when conda-meta
+    changes, i.e. when packages are installed or removed. Only the indexes of the
+    ``_PREFIX_PATH_INDEXES_MAX`` prefixes used last are kept.
+    """
+    prefix = str(prefix)
+    conda_meta = join(prefix, "conda-meta")
+    try:
+        # the listing as well, for filesystems with a coarse mtime resolution
+        state = (os.stat(conda_meta).st_mtime_ns, frozenset(os.listdir(conda_meta)))
+    except OSError:
+        state = None
+    cached = _prefix_path_indexes.pop(prefix, None)
+    if cached and state is not None and cached[0] == state:
+        _prefix_path_indexes[prefix] = cached
+        return cached[1]
+    index: dict[str, list[PrefixRecord]] = {}
+    for prec in PrefixData(prefix).iter_records():
+        for file in prec["files"]:
+            precs = index.setdefault(normcase(file), [])
+            if not precs or precs[-1] is not prec:
+                precs.append(prec)
+    _prefix_path_indexes[prefix] = (state, index)
+    while len(_prefix_path_indexes) > _PREFIX_PATH_INDEXES_MAX:
+        del _prefix_path_indexes[next(iter(_prefix_path_indexes))]
+    return index
+
+
 def which_package(
     path: str | os.PathLike | Path,
     prefix: str | os.PathLike | Path,
@@ -65,9 +107,7 @@ def which_package(
     #       require case-sensitive matches (i.e., normcase on macOS is a no-op).
     normcase_path = normcase(path)
 
-    for prec in PrefixData(str(prefix)).iter_records():
-        if normcase_path in (normcase(file) for file in prec["files"]):
-            yield prec
+    yield from _prefix_path_index(prefix).get(normcase_path, ())
 
 
 def print_object_info(info, key):
@@ -249,7 +289,8 @@ def inspect_linkages(
         else:
             obj_files = get_package_obj_files(installed[name], prefix)
 
-        linkages = get_linkages(obj_files, prefix, sysroot)
+        with search_path_cache.scope():
+            linkages = get_linkages(obj_files, prefix, sysroot)
         pkgmap[name] = depmap = defaultdict(list)
         for binary, paths in linkages.items():
             for lib, path in paths:
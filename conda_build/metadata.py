@@ -1013,6 +1013,39 @@ def get_output_dicts_from_metadata(
     return outputs
 
 
+# a pin_subpackage call whose first argument is a plain string literal (group 2)
+_RE_PIN_SUBPACKAGE = re.compile(
+    r"""pin_subpackage\(\s*(?:(['"])([^'"]*)\1\s*(?=[,)]))?"""
+)
+_RE_JINJA_INCLUDE = re.compile(r"{%-?\s*(?:include|import|from|extends)\b")
+
+
+def _pinned_subpackage_names(metadata):
+    """
+    The names of the outputs that the recipe of metadata refers to with pin_subpackage, the
+    only part of its rendering that depends on other_outputs. None if that cannot be told
+    from the recipe text (names computed in jinja, included templates).
+    """
+    text = metadata.get_recipe_text(force_top_level=True, apply_selectors=False)
+    if _RE_JINJA_INCLUDE.search(text):
+        return None
+    names = set()
+    for match in _RE_PIN_SUBPACKAGE.finditer(text):
+        if match[2] is None:
+            return None
+        names.add(match[2])
+    return frozenset(names)
+
+
+def _pin_subpackage_context(other_outputs, names):
+    """The entries of other_outputs that pin_subpackage can see, for names (all if None)."""
+    return tuple(
+        (key, value)
+        for key, value in other_outputs.items()
+        if names is None or key[0] in names
+    )
+
+
 def finalize_outputs_pass(
     base_metadata,
     render_order,
@@ -1024,6 +1057,11 @@ def finalize_outputs_pass(
     from .render import finalize_metadata
 
     outputs = OrderedDict()
+    # The top-level recipe is resolved again for every output, but that only gives a
+    #    different result for another variant or when the outputs it pins have changed.
+    #    Resolved parents are kept here, keyed by both, and copied for reuse.
+    pinned_names = _pinned_subpackage_names(base_metadata)
+    resolved_parents = {}
     # each of these outputs can have a different set of dependency versions from each other,
     #    but also from base_metadata
     for output_d, metadata in render_order.values():
@@ -1044,7 +1082,20 @@ def finalize_outputs_pass(
             # place, so it can refer to it for any pin_subpackage stuff it has.
             om.other_outputs = metadata.other_outputs
             om.config.variant = metadata.config.variant
-            parent_metadata = om.copy()
+            # the context holds the other outputs' (output_d, metadata) tuples themselves,
+            #    so that they are compared by identity and kept alive during this pass
+            context = _pin_subpackage_context(
+                {**om.other_outputs, **outputs}, pinned_names
+            )
+            parent_key = (
+                deepfreeze(metadata.config.variant),
+                tuple((key, id(value)) for key, value in context),
+            )
+            parent_resolved = parent_key in resolved_parents
+            if parent_resolved:
+                parent_metadata = resolved_parents[parent_key][0].copy()
+            else:
+                parent_metadata = om.copy()
 
             om.other_outputs.update(outputs)
             om.final = False
@@ -1055,13 +1106,15 @@ def finalize_outputs_pass(
             }
 
             om = om.get_output_metadata(output_d)
-            replacements = None
-            if "replacements" in parent_metadata.config.variant:
-                replacements = parent_metadata.config.variant["replacements"]
-                del parent_metadata.config.variant["replacements"]
-            parent_metadata.parse_until_resolved()
-            if replacements:
-                parent_metadata.config.variant["replacements"] = replacements
+            if not parent_resolved:
+                replacements = None
+                if "replacements" in parent_metadata.config.variant:
+                    replacements = parent_metadata.config.variant["replacements"]
+                    del parent_metadata.config.variant["replacements"]
+                parent_metadata.parse_until_resolved()
+                if replacements:
+                    parent_metadata.config.variant["replacements"] = replacements
+                resolved_parents[parent_key] = (parent_metadata.copy(), context)
 
             if not bypass_env_check:
                 fm = finalize_metadata(
@@ -1788,7 +1841,9 @@ class MetaData:
             return _hash_dependencies(hashing_dependencies, self.config.hash_length)
         return hash_
 
-    def build_id(self):
+    def uses_pkg_hash(self) -> bool:
+        """Whether the build string is filled in with the hash of the dependencies, i.e.
+        build/string is either not set or uses the PKG_HASH variable."""
         manual_build_string = self.get_value("build/string")
         # we need the raw recipe for this metadata (possibly an output), so that we can say whether
         #    PKG_HASH is used for anything.
@@ -1798,11 +1853,15 @@ class MetaData:
                 f"Couldn't extract raw recipe text for {self.name()} output"
             )
         raw_manual_build_string = re.search(r"\s*string:", raw_recipe_text)
-        # user setting their own build string.  Don't modify it.
-        if manual_build_string and not (
+        return not manual_build_string or bool(
             raw_manual_build_string
             and re.findall(r"h\{\{\s*PKG_HASH\s*\}\}", raw_manual_build_string.string)
-        ):
+        )
+
+    def build_id(self):
+        # user setting their own build string.  Don't modify it.
+        if not self.uses_pkg_hash():
+            manual_build_string = self.get_value("build/string")
             check_bad_chrs(manual_build_string, "build/string")
             out = manual_build_string
         else:
@@ -7,16 +7,18 @@ import json
 import os
 import struct
 import threading
+import time
 from collections.abc import Hashable
+from contextlib import contextmanager
 from fnmatch import fnmatch
-from functools import partial
+from functools import lru_cache, partial
 from pathlib import Path
 from subprocess import PIPE, Popen
 
 from conda.models.version import VersionOrder
 
 from ..deprecations import deprecated
-from ..utils import on_mac, on_win, rec_glob
+from ..utils import _MTIME_GRANULARITY_NS, get_logger, on_mac, on_win, rec_glob
 from .external import find_executable
 
 # lief cannot handle files it doesn't know about gracefully
@@ -399,6 +401,101 @@ def get_uniqueness_key(filename, file):
     return filename
 
 
+class SearchPathCache:
+    """
+    The files in the directories probed when resolving the libraries needed by binaries.
+
+    The same sysroot and prefix directories are probed for every needed library of every
+    binary, so within :meth:`scope` (an overlinking check, ``conda inspect linkages``)
+    each directory is listed once and its listing answers :meth:`exists`. On its first
+    use in a new scope, a directory is stat'ed and only listed again if its mtime has
+    changed, or was too recent to reveal later changes. Only the listings used by the
+    last scope are kept. Outside of a scope, :meth:`exists` is os.path.exists.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._depth = 0
+        # directory => (mtime, names that exist, their lowercase forms, racy, validated)
+        self._listings = {}
+        self.stats = {"lookups": 0, "stats": 0, "listings": 0, "fallbacks": 0}
+
+    @contextmanager
+    def scope(self):
+        """Answer from the directory listings, and count the filesystem calls made."""
+        with self.lock:
+            if not self._depth:
+                self.stats = dict.fromkeys(self.stats, 0)
+                self._listings = {
+                    directory: (*listing[:4], False)
+                    for directory, listing in self._listings.items()
+                    if listing[4]
+                }
+            self._depth += 1
+        try:
+            yield self
+        finally:
+            with self.lock:
+                self._depth -= 1
+
+    def _list(self, directory, mtime):
+        self.stats["listings"] += 1
+        racy = mtime is None or mtime + _MTIME_GRANULARITY_NS > time.time_ns()
+        names = set()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    # like os.path.exists, dangling symlinks do not count
+                    if not entry.is_symlink() or os.path.exists(entry.path):
+                        names.add(entry.name)
+        except OSError:
+            pass
+        return names, {name.lower() for name in names}, racy
+
+    def _listing(self, directory):
+        listing = self._listings.get(directory)
+        if listing and listing[4]:
+            return listing
+        self.stats["stats"] += 1
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            mtime = None
+        if not listing or listing[3] or listing[0] != mtime:
+            listing = (mtime, *self._list(directory, mtime), True)
+        else:
+            listing = (*listing[:4], True)
+        self._listings[directory] = listing
+        return listing
+
+    def exists(self, path):
+        """Whether path exists, as os.path.exists."""
+        directory, name = os.path.split(path)
+        with self.lock:
+            if not self._depth or not name:
+                return os.path.exists(path)
+            self.stats["lookups"] += 1
+            _, names, lower_names, _, _ = self._listing(directory or os.curdir)
+            if name in names:
+                return True
+            if name.lower() not in lower_names:
+                return False
+            # a case-insensitive filesystem may still find it
+            self.stats["fallbacks"] += 1
+        return os.path.exists(path)
+
+    def format_stats(self):
+        stats = self.stats
+        syscalls = stats["stats"] + stats["listings"] + stats["fallbacks"]
+        return (
+            f"{stats['lookups']} library search path lookups answered with "
+            f"{syscalls} filesystem calls ({stats['listings']} directory listings)"
+        )
+
+
+search_path_cache = SearchPathCache()
+
+
 def _get_resolved_location(
     codefile,
     unresolved,
@@ -463,7 +560,7 @@ def _get_resolved_location(
                 .replace("$SELFDIR", selfdir)
                 .replace("$EXEDIR", exedir)
             )
-            exists = os.path.exists(resolved)
+            exists = search_path_cache.exists(resolved)
             exists_sysroot = exists and sysroot and resolved.startswith(sysroot)
             if resolved_rpath or exists or exists_sysroot:
                 rpath_result = rpath
@@ -474,7 +571,7 @@ def _get_resolved_location(
             return unresolved, None, False
     elif any(a in unresolved for a in ("$SELFDIR", "$EXEDIR")):
         resolved = unresolved.replace("$SELFDIR", selfdir).replace("$EXEDIR", exedir)
-        exists = os.path.exists(resolved)
+        exists = search_path_cache.exists(resolved)
         exists_sysroot = exists and sysroot and resolved.startswith(sysroot)
     else:
         if unresolved.startswith("/"):
@@ -620,7 +717,7 @@ def inspect_linkages_lief(
                     results[lib] = rec
                     parents_by_filename[resolved[0]] = filename2
                     if recurse:
-                        if os.path.exists(resolved[0]):
+                        if search_path_cache.exists(resolved[0]):
                             todo.append([resolved[0], lief.parse(resolved[0])])
                 already_seen.add(uniqueness_key)
     return results
@@ -698,7 +795,60 @@ def is_archive(file):
     return True if signature == b"!<arch>\n" else False
 
 
+def _get_archive_member_names(content):
+    """
+    The names of the members of the ar archive in content, keyed by the offset of their
+    data, with GNU (``//`` table) and BSD (``#1/``) long names resolved.
+    """
+    names = {}
+    long_names = b""
+    index = 8
+    while index + 60 <= len(content):
+        name = content[index : index + 16]
+        try:
+            size = int(content[index + 48 : index + 58])
+        except ValueError:
+            break
+        start = index + 60
+        member = None
+        if name.startswith(b"#1/"):
+            name_len = int(name[3:])
+            member = content[start : start + name_len].rstrip(b"\x00")
+            start += name_len
+        elif name.startswith(b"//"):
+            long_names = content[start : start + size]
+        elif name.startswith(b"/") and name[1:2].isdigit():
+            offset = int(name[1:])
+            member = long_names[offset : long_names.find(b"/\n", offset)]
+        elif name.strip() != b"/" and not name.startswith(b"/SYM64/"):
+            member = name.rstrip().rstrip(b"/")
+        # BSD symbol tables are members named __.SYMDEF (SORTED|64)
+        if member is not None and not member.startswith(b"__.SYMDEF"):
+            names[start] = member.decode("utf-8", errors="replace")
+        index = index + 60 + size + (size & 1)
+    return names
+
+
 def get_static_lib_exports(file):
+    members = get_static_lib_member_exports(file)
+    if members is None:
+        return []
+    functions = [symbol for _, symbols in members for symbol in symbols]
+    return (
+        functions,
+        [[0, 0] for sym in functions],
+        functions,
+        [[0, 0] for sym in functions],
+    )
+
+
+def get_static_lib_member_exports(file):
+    """
+    The symbols exported by each member of the static library file, as a list of (member
+    name, symbols) pairs, or None if it is not an archive. When a member cannot be parsed,
+    the symbols of the archive's symbol table are returned under an empty member name.
+    """
+
     # file = '/Users/rdonnelly/conda/main-augmented-tmp/osx-64_14354bd0cd1882bc620336d9a69ae5b9/lib/python2.7/config/libpython2.7.a'  # noqa: E501
     # References:
     # https://github.com/bminor/binutils-gdb/tree/master/bfd/archive.c
@@ -752,11 +902,10 @@ def get_static_lib_exports(file):
         index += header_sz + name_len
         return index, name, name_len, size, typ
 
-    results = []
     signature, len_signature = _get_archive_signature(file)
     if signature != b"!<arch>\n":
         print(f"ERROR: {file} is not an archive")
-        return results
+        return None
     with open(file, "rb") as f:
         if debug_static_archives:
             print(f"Archive file {file}")
@@ -765,7 +914,8 @@ def get_static_lib_exports(file):
         index += len_signature
         obj_starts = set()
         obj_ends = set()
-        functions = []
+        members = []
+        member_names = _get_archive_member_names(content)
         if index & 1:
             index += 1
         if debug_static_archives:
@@ -908,7 +1058,7 @@ def get_static_lib_exports(file):
                 obj = lief.ELF.parse(raw=content[obj_start:obj_end])
             if not obj:
                 # Cannot do much here except return the index.
-                return syms, [[0, 0] for sym in syms], syms, [[0, 0] for sym in syms]
+                return [("", syms)]
             # You can unpack an archive via:
             # /mingw64/bin/ar.exe xv /mingw64/lib/libz.dll.a
             # obj = lief.PE.parse('C:\\Users\\rdonnelly\\conda\\conda-build\\mingw-w64-libz.dll.a\\d000103.o')
@@ -917,14 +1067,130 @@ def get_static_lib_exports(file):
             #     # lists symbols that are either exported or is_static.
             #     if sym.is_function and (sym.exported or sym.is_static):
             #         functions.append(sym.name)
-            functions.extend(get_symbols(obj, defined=True, undefined=False))
-        return (
-            functions,
-            [[0, 0] for sym in functions],
-            functions,
-            [[0, 0] for sym in functions],
+            members.append(
+                (
+                    member_names.get(obj_start, ""),
+                    get_symbols(obj, defined=True, undefined=False),
+                )
+            )
+        return members
+
+
+@lru_cache(maxsize=1024)
+def _file_sha256_by_stat(path, stat_key):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        while data := f.read(1 << 20):
+            sha256.update(data)
+    return sha256.hexdigest()
+
+
+def file_sha256(path):
+    """
+    The sha256 of the file at path, hashed once for all the callers (the memoized
+    functions, :class:`StaticLibSymbolIndex`) as long as its inode, size and mtime do
+    not change, and its mtime is old enough to reveal later changes.
+    """
+    path = os.path.realpath(path)
+    st = os.stat(path)
+    if st.st_mtime_ns + _MTIME_GRANULARITY_NS > time.time_ns():
+        return _file_sha256_by_stat.__wrapped__(path, None)
+    return _file_sha256_by_stat(
+        path, (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+    )
+
+
+# part of the file names of the tables stored by StaticLibSymbolIndex, bumped whenever
+# their content changes
+_STATIC_LIB_INDEX_VERSION = 1
+
+
+class StaticLibSymbolIndex:
+    """
+    The symbols exported by the members of static libraries.
+
+    Parsing large archives (libstdc++.a, libpython.a, MKL) is slow, so the member to
+    symbols table of every archive is stored as JSON in cache_dir (if given), under the
+    size and sha256 of the archive, the version of these tables and of LIEF, for later
+    builds to load instead.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self.lock = threading.Lock()
+        # realpath => (size, sha256, members)
+        self._archives = {}
+
+    @staticmethod
+    def _signature(path):
+        return os.path.getsize(path), file_sha256(path)
+
+    def _table_path(self, size, sha256):
+        lief_version = lief.__version__ if have_lief else "none"
+        return os.path.join(
+            self.cache_dir,
+            f"{sha256}-{size}-v{_STATIC_LIB_INDEX_VERSION}-lief{lief_version}.json",
         )
 
+    def _load(self, size, sha256):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._table_path(size, sha256)) as f:
+                return [(member, symbols) for member, symbols in json.load(f)]
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def _store(self, size, sha256, members):
+        if not self.cache_dir:
+            return
+        path = self._table_path(size, sha256)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump(members, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            # a read-only or full cache only costs later builds the parsing
+            get_logger(__name__).debug(f"could not store the symbols of {path}: {e}")
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+    def members(self, path):
+        """The (member name, symbols) pairs of the archive at path."""
+        path = os.path.realpath(path)
+        size, sha256 = self._signature(path)
+        with self.lock:
+            cached = self._archives.get(path)
+            if cached and cached[:2] == (size, sha256):
+                return cached[2]
+        members = self._load(size, sha256)
+        if members is None:
+            members = get_static_lib_member_exports(path) or []
+            self._store(size, sha256, members)
+        with self.lock:
+            self._archives[path] = (size, sha256, members)
+        return members
+
+    def exports(self, path):
+        """All the symbols exported by the archive at path, as get_static_lib_exports."""
+        return [symbol for _, symbols in self.members(path) for symbol in symbols]
+
+
+_static_lib_indexes = {}
+_static_lib_indexes_lock = threading.Lock()
+
+
+def get_static_lib_index(cache_dir=None):
+    """The StaticLibSymbolIndex for cache_dir, shared by all callers in this process."""
+    with _static_lib_indexes_lock:
+        if cache_dir not in _static_lib_indexes:
+            _static_lib_indexes[cache_dir] = StaticLibSymbolIndex(cache_dir)
+        return _static_lib_indexes[cache_dir]
+
 
 def get_static_lib_exports_nope(file):
     return [], [], [], []
@@ -1041,7 +1307,9 @@ def get_static_lib_exports_externally(filename):
     return res_nm
 
 
-def get_exports(filename, arch="native", enable_static=False):
+def get_exports(
+    filename, arch="native", enable_static=False, static_lib_index_dir=None
+):
     result = []
     if enable_static and isinstance(filename, str):
         if (
@@ -1065,7 +1333,7 @@ def get_exports(filename, arch="native", enable_static=False):
                 exports2 = exports
             else:
                 try:
-                    exports2, flags2, exports2_all, flags2_all = get_static_lib_exports(
+                    exports2 = get_static_lib_index(static_lib_index_dir).exports(
                         filename
                     )
                 except:
@@ -1193,18 +1461,10 @@ class memoized_by_arg0_filehash:
         newargs = []
         for arg in args:
             if arg is args[0]:
-                sha1 = hashlib.sha1()
-                with open(arg, "rb") as f:
-                    while True:
-                        data = f.read(65536)
-                        if not data:
-                            break
-                        sha1.update(data)
-                # update with file name, if its a different
+                # with the file name, if its a different
                 # file with the same contents, we don't want
                 # to treat it as cached
-                sha1.update(os.path.realpath(arg).encode("utf-8"))
-                arg = sha1.hexdigest()
+                arg = (file_sha256(arg), os.path.realpath(arg))
             if isinstance(arg, list):
                 newargs.append(tuple(arg))
             elif not isinstance(arg, Hashable):
@@ -1225,8 +1485,15 @@ class memoized_by_arg0_filehash:
 
 
 @memoized_by_arg0_filehash
-def get_exports_memoized(filename, arch="native", enable_static=False):
-    return get_exports(filename, arch=arch, enable_static=enable_static)
+def get_exports_memoized(
+    filename, arch="native", enable_static=False, static_lib_index_dir=None
+):
+    return get_exports(
+        filename,
+        arch=arch,
+        enable_static=enable_static,
+        static_lib_index_dir=static_lib_index_dir,
+    )
 
 
 @memoized_by_arg0_filehash
@@ -956,6 +956,110 @@ class elffile(UnixExecutable):
         return self.dt_soname
 
 
+def _elf_dynamic(file):
+    """
+    The header, the dynamic entries (tag, value and file offset of the entry) and the
+    string table section of the dynamic entries of an ELF file, or None if it has no
+    dynamic section with a string table.
+    """
+    file.seek(0)
+    ehdr = elfheader(file)
+    if ehdr.hdr != ELF_HDR:
+        return None
+    sections = []
+    for n in range(ehdr.shnum):
+        file.seek(ehdr.shoff + (n * ehdr.shentsize))
+        sections.append(elfsection(ehdr, file))
+    dynamic = next((s for s in sections if s.sh_type == SHT_DYNAMIC), None)
+    if (
+        dynamic is None
+        or not dynamic.sh_entsize
+        or dynamic.sh_link >= len(sections)
+        or sections[dynamic.sh_link].sh_type != SHT_STRTAB
+    ):
+        return None
+    entry = struct.Struct(ehdr.endian + ehdr.ptr_type * 2)
+    file.seek(dynamic.sh_offset)
+    data = file.read(dynamic.sh_size)
+    entries = []
+    for offset in range(0, len(data) - entry.size + 1, dynamic.sh_entsize):
+        d_tag, d_val = entry.unpack_from(data, offset)
+        if d_tag == DT_NULL:
+            break
+        entries.append((d_tag, d_val, dynamic.sh_offset + offset))
+    return ehdr, entries, sections[dynamic.sh_link]
+
+
+def _elf_string(file, strtab, index):
+    if index >= strtab.sh_size:
+        raise ValueError(f"string index {index} is outside of the string table")
+    file.seek(strtab.sh_offset + index)
+    data = file.read(strtab.sh_size - index)
+    end = data.find(b"\0")
+    return data if end < 0 else data[:end]
+
+
+def elf_get_rpath(path):
+    """
+    The DT_RUNPATH, or if there is none the DT_RPATH, of the ELF file at ``path``, like
+    ``patchelf --print-rpath`` prints it (as a list of paths), or None if the file has
+    no dynamic section to read it from.
+    """
+    with open(path, "rb") as file:
+        dynamic = _elf_dynamic(file)
+        if dynamic is None:
+            return None
+        _, entries, strtab = dynamic
+        values = {d_tag: d_val for d_tag, d_val, _ in entries}
+        d_val = values.get(DT_RUNPATH, values.get(DT_RPATH))
+        if d_val is None:
+            return []
+        rpath = _elf_string(file, strtab, d_val).decode("utf-8", "surrogateescape")
+        return rpath.split(":") if rpath else []
+
+
+def elf_set_rpath(path, rpath, force_rpath=True):
+    """
+    Set the DT_RPATH (or with ``force_rpath=False`` the DT_RUNPATH) of the ELF file at
+    ``path`` to ``rpath`` in place, like ``patchelf [--force-rpath] --set-rpath`` does
+    when the new value is not longer than the existing one. The rest of the old value is
+    zeroed so that no stale path remains in the file.
+
+    Returns False, without changing the file, when this cannot be done in place (no
+    existing value, a longer value or a value shared with other strings), in which
+    case the string table has to grow and patchelf has to be used.
+    """
+    new = rpath.encode("utf-8", "surrogateescape")
+    with open(path, "r+b") as file:
+        dynamic = _elf_dynamic(file)
+        if dynamic is None:
+            return False
+        ehdr, entries, strtab = dynamic
+        rpaths = [entry for entry in entries if entry[0] in (DT_RPATH, DT_RUNPATH)]
+        if len(rpaths) != 1:
+            return False
+        d_tag, d_val, offset = rpaths[0]
+        old = _elf_string(file, strtab, d_val)
+        if len(new) > len(old):
+            return False
+        for other_tag, other_val, other_offset in entries:
+            # the linker merges string suffixes, other strings may end in this one
+            if (
+                other_offset != offset
+                and other_tag in (DT_NEEDED, DT_SONAME)
+                and d_val <= other_val <= d_val + len(old)
+            ):
+                return False
+        new_tag = DT_RPATH if force_rpath else DT_RUNPATH
+        if new != old:
+            file.seek(strtab.sh_offset + d_val)
+            file.write(new + b"\0" * (len(old) - len(new) + 1))
+        if new_tag != d_tag:
+            file.seek(offset)
+            file.write(struct.pack(ehdr.endian + ehdr.ptr_type, new_tag))
+    return True
+
+
 class inscrutablefile(UnixExecutable):
     def __init__(self, file, initial_rpaths_transitive=[]):
         self._dir = None
@@ -0,0 +1,238 @@
+# Copyright (C) 2014 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+"""
+Writer for ``.conda`` packages that hashes the payload while compressing it.
+
+``conda_package_handling.api.create`` reads every file twice to write a ``.conda`` (once
+to size the zstd frame and once to compress it), on top of the read conda-build does to
+hash it for ``info/paths.json``. :class:`CondaPackageWriter` sizes the tarballs from
+``lstat`` results and computes the sha256 of each regular file from the same buffers it
+feeds the compressor, so ``paths.json`` can be written from those digests after the
+``pkg`` component and before the ``info`` component. A tarball that does not come out
+at the size given to zstd raises :class:`ComponentSizeError`, for the caller to fall
+back on ``conda_package_handling``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import tarfile
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+from zipfile import ZIP_STORED, ZipFile
+
+import zstandard
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+
+CONDA_PACKAGE_FORMAT_VERSION = 2
+COPY_BUFSIZE = 1 << 18
+
+
+def zstd_compressor(
+    level: int,
+    threads: int = 0,
+    long_distance_matching: bool = False,
+    window_log: int = 0,
+) -> Callable[[], zstandard.ZstdCompressor]:
+    """
+    Factory of compressors for :class:`CondaPackageWriter`. ``threads`` is the number of
+    zstd workers (0 compresses in the calling thread, -1 uses one per CPU) and a
+    ``window_log`` of 0 keeps the default window size of ``level``.
+    """
+    overrides = {"threads": threads, "enable_ldm": long_distance_matching}
+    if window_log:
+        overrides["window_log"] = window_log
+    params = zstandard.ZstdCompressionParameters.from_level(level, **overrides)
+
+    def compressor():
+        return zstandard.ZstdCompressor(compression_params=params)
+
+    return compressor
+
+
+class ComponentSizeError(ValueError):
+    """A component tarball did not come out at the size computed for it."""
+
+
+def is_info_file(path: str) -> bool:
+    return path.replace("\\", "/").startswith("info/")
+
+
+def _anonymize(tarinfo: tarfile.TarInfo) -> tarfile.TarInfo:
+    tarinfo.uid = tarinfo.gid = 0
+    tarinfo.uname = tarinfo.gname = ""
+    return tarinfo
+
+
+class _HashingReader:
+    """File object updating a sha256 with everything read through it."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.sha256.update(data)
+        return data
+
+
+def _compression_order(prefix: str, files: Iterable[str]) -> list[str]:
+    """
+    ``files`` in the order conda-package-handling writes them: grouped by extension
+    (``.so.*`` and ``.dylib`` as ``.so``), files without one by directory, and by
+    increasing size within a group, empty files last. Similar files end up close
+    together, which helps the compressor. The groups are sorted by name rather than
+    by hash, so that the order is the same on every build.
+    """
+
+    def order(file):
+        # we don't care about empty files so send them back via 100000
+        size = os.lstat(os.path.join(prefix, file)).st_size or 100000
+        _, ext = os.path.splitext(
+            re.sub(r"(\.dylib|\.so)(\..*)?$", ".so", os.path.basename(file))
+        )
+        return ext, "" if ext else os.path.dirname(file), size, file
+
+    return sorted(files, key=order)
+
+
+class _CountingWriter:
+    """File object counting the bytes written through it."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        return self.fileobj.write(data)
+
+    def tell(self):
+        return self.size
+
+
+class _NullWriter:
+    """Sink for a TarFile only used to build TarInfo objects."""
+
+    def write(self, data):
+        return len(data)
+
+    def tell(self):
+        return 0
+
+
+class CondaPackageWriter:
+    """
+    Write a ``.conda`` package component by component. Use as a context manager::
+
+        with CondaPackageWriter(path, compressor) as writer:
+            sha256s = writer.add_component("pkg", prefix, pkg_files)
+            ...  # write info/paths.json using sha256s
+            writer.add_component("info", prefix, info_files)
+
+    The files of a component are written in :func:`_compression_order`. ``members``
+    lists the paths written, in order, for validation without reading the package back.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        compressor: Callable[[], zstandard.ZstdCompressor],
+    ):
+        self.path = os.fspath(path)
+        self.stem = os.path.basename(self.path)[: -len(".conda")]
+        self.compressor = compressor
+        self.members: list[str] = []
+        self._zip = ZipFile(self.path, "x", compression=ZIP_STORED)
+        self._zip.writestr(
+            "metadata.json",
+            json.dumps({"conda_pkg_format_version": CONDA_PACKAGE_FORMAT_VERSION}),
+        )
+
+    def __enter__(self) -> CondaPackageWriter:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+        if exc_type is not None:
+            os.unlink(self.path)
+
+    def close(self) -> None:
+        self._zip.close()
+
+    @contextmanager
+    def component(self, component: str, size: int = -1) -> Iterator[tarfile.TarFile]:
+        """
+        The ``<component>-<stem>.tar.zst`` member as a TarFile to add members to. ``size``
+        is the size of the uncompressed tarball, if known, and :class:`ComponentSizeError`
+        is raised if the tarball does not come out at that size.
+        """
+        name = f"{component}-{self.stem}.tar.zst"
+        with self._zip.open(name, "w", force_zip64=True) as component_file:
+            # a known size lets the decompressor allocate less memory
+            stream = self.compressor().stream_writer(
+                component_file, size=size, closefd=False
+            )
+            counter = _CountingWriter(stream)
+            try:
+                with tarfile.TarFile(
+                    fileobj=counter, mode="w", copybufsize=COPY_BUFSIZE
+                ) as tar:
+                    yield tar
+                if size != -1 and counter.size != size:
+                    raise ComponentSizeError(
+                        f"{name} came out at {counter.size} bytes instead of {size}"
+                    )
+                stream.close()
+            except zstandard.ZstdError as exc:
+                # zstd refuses more or fewer bytes than it was told
+                if size != -1 and counter.size != size:
+                    raise ComponentSizeError(
+                        f"{name} came out at {counter.size} bytes instead of {size}"
+                    ) from exc
+                raise
+
+    def add_component(
+        self, component: str, prefix: str | os.PathLike, files: Iterable[str]
+    ) -> dict[str, str]:
+        """
+        Add ``files`` (relative to ``prefix``) as the ``<component>-<stem>.tar.zst``
+        member. Returns the sha256 of every regular file written, hardlinks included.
+        """
+        prefix = os.fspath(prefix)
+        # gettarinfo records inodes, so repeated hardlinks become LNKTYPE members
+        indexer = tarfile.TarFile(fileobj=_NullWriter(), mode="w")
+        tarinfos = []
+        size = 0
+        for file in _compression_order(prefix, files):
+            tarinfo = _anonymize(
+                indexer.gettarinfo(os.path.join(prefix, file), arcname=file)
+            )
+            tarinfos.append(tarinfo)
+            size += len(tarinfo.tobuf(indexer.format, indexer.encoding, indexer.errors))
+            if tarinfo.isreg():
+                size += -(-tarinfo.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+        # end of archive marker, padded to a full record
+        size += 2 * tarfile.BLOCKSIZE
+        size += -size % tarfile.RECORDSIZE
+
+        sha256s = {}
+        with self.component(component, size) as tar:
+            for tarinfo in tarinfos:
+                if tarinfo.isreg():
+                    with open(os.path.join(prefix, tarinfo.name), "rb") as fh:
+                        reader = _HashingReader(fh)
+                        tar.addfile(tarinfo, reader)
+                    sha256s[tarinfo.name] = reader.sha256.hexdigest()
+                else:
+                    tar.addfile(tarinfo)
+                    if tarinfo.islnk() and tarinfo.linkname in sha256s:
+                        sha256s[tarinfo.name] = sha256s[tarinfo.linkname]
+                self.members.append(tarinfo.name)
+        return sha256s
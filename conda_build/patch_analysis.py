@@ -0,0 +1,332 @@
+# Copyright (C) 2014 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+"""
+In-process analysis of source patches.
+
+Finds the strip level and line endings with which a unified (or git) diff applies to a
+source tree, and whether it applies with offsets or fuzz and reverses, the way GNU
+``patch`` would. Every file is read at most once and nothing is written, so that
+``conda_build.source.apply_one_patch`` only has to run ``patch`` to actually apply it.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+# GNU patch's default fuzz factor
+MAX_FUZZ = 2
+
+_RE_HUNK = re.compile(rb"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+_RE_LF = re.compile(rb"(?<!\r)\n")
+
+# constructs we cannot check without git itself
+_UNSUPPORTED = (
+    b"GIT binary patch",
+    b"Binary files ",
+    b"rename from ",
+    b"copy from ",
+)
+
+#: patch formats tried, in order, as named by ``conda_build.source``
+FORMATS: dict[str, Callable[[bytes], bytes]] = {
+    "native": lambda data: data,
+    "lf": lambda data: data.replace(b"\r\n", b"\n"),
+    "crlf": lambda data: _RE_LF.sub(b"\r\n", data),
+}
+
+
+class UnsupportedPatch(Exception):
+    """The patch uses constructs the analyzer does not handle."""
+
+
+@dataclass
+class Hunk:
+    old_start: int
+    new_start: int
+    # lines (with their line ending) of the old and new side, context included
+    old: list[bytes] = field(default_factory=list)
+    new: list[bytes] = field(default_factory=list)
+    leading_context: int = 0
+    trailing_context: int = 0
+
+    def reversed(self) -> Hunk:
+        return Hunk(
+            self.new_start,
+            self.old_start,
+            self.new,
+            self.old,
+            self.leading_context,
+            self.trailing_context,
+        )
+
+
+@dataclass
+class FilePatch:
+    # None for /dev/null
+    old_path: str | None
+    new_path: str | None
+    hunks: list[Hunk] = field(default_factory=list)
+
+    def reversed(self) -> FilePatch:
+        return FilePatch(
+            self.new_path, self.old_path, [hunk.reversed() for hunk in self.hunks]
+        )
+
+
+@dataclass
+class PatchAnalysis:
+    level: int
+    format: str
+    applicable: bool
+    reversible: bool
+    offsets: bool
+    fuzzy: bool
+
+
+def split_lines(data: bytes) -> list[bytes]:
+    """Split on LF only, keeping line endings (a CR before them stays part of the line)."""
+    lines = [line + b"\n" for line in data.split(b"\n")]
+    if lines[-1] == b"\n":
+        lines.pop()
+    else:
+        lines[-1] = lines[-1][:-1]
+    return lines
+
+
+def _header_path(raw: bytes) -> str | None:
+    path = raw.split(b"\t", 1)[0].rstrip()
+    if path == b"/dev/null":
+        return None
+    if path.startswith(b'"'):
+        raise UnsupportedPatch("quoted file name")
+    return path.decode("utf-8", "surrogateescape")
+
+
+def parse_patch(data: bytes) -> list[FilePatch]:
+    """
+    The file patches of a unified diff. Anything outside of file headers and hunks (mail
+    headers, ``diff --git`` and ``index`` lines, diffstats, ...) is ignored.
+    """
+    lines = split_lines(data)
+    patches: list[FilePatch] = []
+    current = None
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if line.startswith(_UNSUPPORTED):
+            raise UnsupportedPatch(line.decode("utf-8", "replace").strip())
+        if (
+            line.startswith(b"--- ")
+            and i + 1 < len(lines)
+            and lines[i + 1].startswith(b"+++ ")
+        ):
+            current = FilePatch(_header_path(line[4:]), _header_path(lines[i + 1][4:]))
+            patches.append(current)
+            i += 2
+            continue
+        match = _RE_HUNK.match(line)
+        if not match or current is None:
+            i += 1
+            continue
+        old_count = 1 if match[2] is None else int(match[2])
+        new_count = 1 if match[4] is None else int(match[4])
+        hunk = Hunk(int(match[1]), int(match[3]))
+        tags = []
+        i += 1
+        while (
+            len(hunk.old) < old_count
+            or len(hunk.new) < new_count
+            or (i < len(lines) and lines[i].startswith(b"\\"))
+        ):
+            if i >= len(lines):
+                raise UnsupportedPatch("truncated hunk")
+            line = lines[i]
+            tag, text = line[:1], line[1:]
+            if line in (b"\n", b"\r\n"):
+                # a context line whose leading space was stripped
+                tag, text = b" ", line
+            if tag == b" ":
+                hunk.old.append(text)
+                hunk.new.append(text)
+            elif tag == b"-":
+                hunk.old.append(text)
+            elif tag == b"+":
+                hunk.new.append(text)
+            elif tag == b"\\" and tags:
+                # "\ No newline at end of file" applies to the line before
+                if tags[-1] in (b" ", b"-"):
+                    hunk.old[-1] = hunk.old[-1][:-1]
+                if tags[-1] in (b" ", b"+"):
+                    hunk.new[-1] = hunk.new[-1][:-1]
+                i += 1
+                continue
+            else:
+                raise UnsupportedPatch(f"unexpected line in hunk: {line!r}")
+            tags.append(tag)
+            i += 1
+        hunk.leading_context = len(tags) - len(b"".join(tags).lstrip(b" "))
+        hunk.trailing_context = len(tags) - len(b"".join(tags).rstrip(b" "))
+        current.hunks.append(hunk)
+    return patches
+
+
+def _strip(path: str, level: int) -> str:
+    return path.split("/", level)[-1] if level else path
+
+
+class _Tree:
+    """Source files read on demand, with the content patched so far kept in memory."""
+
+    def __init__(self, src_dir: str | os.PathLike, cache: dict[str, bytes | None]):
+        self.src_dir = src_dir
+        self.cache = cache
+        self.changed: dict[str, list[bytes] | None] = {}
+
+    def read(self, path: str) -> list[bytes] | None:
+        if path in self.changed:
+            return self.changed[path]
+        if path not in self.cache:
+            try:
+                with open(os.path.join(self.src_dir, path), "rb") as f:
+                    self.cache[path] = f.read()
+            except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+                self.cache[path] = None
+        data = self.cache[path]
+        return None if data is None else split_lines(data)
+
+
+def _find(
+    lines: list[bytes], pattern: list[bytes], expected: int, lower: int
+) -> int | None:
+    """The position at or after ``lower`` closest to ``expected`` where ``pattern`` is."""
+    last = len(lines) - len(pattern)
+    if last < lower:
+        return None
+    expected = min(max(expected, lower), last)
+    if not pattern:
+        return expected
+    # search outwards, forwards first, like patch does
+    for distance in range(max(expected - lower, last - expected) + 1):
+        for position in (expected + distance, expected - distance):
+            if (
+                lower <= position <= last
+                and lines[position] == pattern[0]
+                and lines[position : position + len(pattern)] == pattern
+            ):
+                return position
+    return None
+
+
+def _apply_hunks(
+    lines: list[bytes], hunks: list[Hunk]
+) -> tuple[list[bytes], bool, bool] | None:
+    """Apply ``hunks`` to ``lines``. Returns the result and whether offsets or fuzz were needed."""
+    result = []
+    lower = 0
+    offset = 0
+    offsets = fuzzy = False
+    for hunk in hunks:
+        # "-l,0" inserts after line l, otherwise l is the first line of the hunk
+        start = hunk.old_start if not hunk.old else max(hunk.old_start - 1, 0)
+        expected = start + offset
+        for fuzz in range(MAX_FUZZ + 1):
+            lead = min(fuzz, hunk.leading_context)
+            trail = min(fuzz, hunk.trailing_context)
+            pattern = hunk.old[lead : len(hunk.old) - trail]
+            position = _find(lines, pattern, expected + lead, lower)
+            if position is not None:
+                break
+            if lead == hunk.leading_context and trail == hunk.trailing_context:
+                return None
+        else:
+            return None
+        fuzzy |= fuzz > 0
+        if position - lead != expected:
+            offsets = True
+            offset = position - lead - start
+        result.extend(lines[lower:position])
+        result.extend(hunk.new[lead : len(hunk.new) - trail])
+        lower = position + len(pattern)
+    result.extend(lines[lower:])
+    return result, offsets, fuzzy
+
+
+def _apply(
+    patches: list[FilePatch], tree: _Tree, level: int
+) -> tuple[bool, bool] | None:
+    """Apply ``patches`` to ``tree``. Returns whether offsets and fuzz were needed."""
+    offsets = fuzzy = False
+    for file_patch in patches:
+        old = file_patch.old_path and _strip(file_patch.old_path, level)
+        new = file_patch.new_path and _strip(file_patch.new_path, level)
+        if old is None:
+            # creation, which patch --forward refuses over an existing file
+            if new is None or tree.read(new) is not None:
+                return None
+            target, lines = new, []
+        else:
+            target = old
+            lines = tree.read(old)
+            if lines is None and new is not None:
+                target = new
+                lines = tree.read(new)
+            if lines is None:
+                # creation of a file named on both sides, as in plain (non-git) diffs
+                if new is None or any(hunk.old for hunk in file_patch.hunks):
+                    return None
+                lines = []
+        applied = _apply_hunks(lines, file_patch.hunks)
+        if applied is None:
+            return None
+        lines, hunk_offsets, hunk_fuzzy = applied
+        offsets |= hunk_offsets
+        fuzzy |= hunk_fuzzy
+        if new is None:
+            if lines:
+                return None
+            tree.changed[target] = None
+        else:
+            tree.changed[new] = lines
+    return offsets, fuzzy
+
+
+def analyze_patch(
+    path: str | os.PathLike, src_dir: str | os.PathLike, levels: Iterable[int]
+) -> PatchAnalysis | None:
+    """
+    Find the first of the strip ``levels`` and then of the :data:`FORMATS` with which the
+    patch at ``path`` applies to ``src_dir``. Returns ``None`` for patches this module
+    cannot analyze (e.g. binary git diffs), in which case ``patch`` has to be asked.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    levels = list(levels)
+    cache: dict[str, bytes | None] = {}
+    try:
+        for level in levels:
+            for fmt, convert in FORMATS.items():
+                patches = parse_patch(convert(data))
+                tree = _Tree(src_dir, cache)
+                applied = _apply(patches, tree, level)
+                if applied is None:
+                    continue
+                reversed_tree = _Tree(src_dir, cache)
+                reversed_tree.changed = tree.changed.copy()
+                reversible = (
+                    _apply(
+                        [patch.reversed() for patch in reversed(patches)],
+                        reversed_tree,
+                        level,
+                    )
+                    is not None
+                )
+                return PatchAnalysis(level, fmt, True, reversible, *applied)
+    except UnsupportedPatch:
+        return None
+    return PatchAnalysis(levels[0], "native", False, False, False, False)
@@ -11,6 +11,7 @@ import stat
 import sys
 import traceback
 from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from copy import copy
 from fnmatch import filter as fnmatch_filter
 from fnmatch import fnmatch
@@ -32,7 +33,7 @@ from os.path import (
     splitext,
 )
 from pathlib import Path
-from subprocess import CalledProcessError, call, check_output
+from subprocess import PIPE, CalledProcessError, Popen, call, check_output
 from typing import TYPE_CHECKING
 
 from conda.core.prefix_data import PrefixData
@@ -44,6 +45,7 @@ from conda.models.records import PrefixRecord
 
 from . import utils
 from .deprecations import deprecated
+from .environ import get_cpu_count
 from .exceptions import (
     CondaBuildException,
     OverDependingError,
@@ -58,15 +60,19 @@ from .os_utils.liefldd import (
     get_rpaths_raw,
     get_runpaths_raw,
     have_lief,
+    search_path_cache,
     set_rpath,
 )
 from .os_utils.pyldd import (
     DLLfile,
     EXEfile,
     codefile_class,
+    elf_get_rpath,
+    elf_set_rpath,
     elffile,
     machofile,
 )
+from .tracing import argument_attributes, traced
 from .utils import (
     FALLBACK_MENUINST_SCHEMA,
     MAX_CHUNK_SIZE,
@@ -286,9 +292,17 @@ def rm_share_info_dir(files, prefix):
             os.unlink(fn)
 
 
-def compile_missing_pyc(files, cwd, python_exe, skip_compile_pyc=()):
+COMPILE_PYC_SCRIPT = join(dirname(__file__), "_compile_pyc.py")
+
+
+def compile_missing_pyc(files, cwd, python_exe, skip_compile_pyc=(), jobs=None):
+    """
+    Compile the .py files in ``files`` (relative to ``cwd``) that have no .pyc yet with
+    ``python_exe``, spread over ``jobs`` worker processes (one per CPU by default).
+    Returns the files that failed to compile, with their errors.
+    """
     if not isfile(python_exe):
-        return
+        return {}
     compile_files = []
     skip_compile_pyc_n = [normpath(skip) for skip in skip_compile_pyc]
     skipped_files = set()
@@ -315,17 +329,75 @@ def compile_missing_pyc(files, cwd, python_exe, skip_compile_pyc=()):
         ):
             compile_files.append(fn)
 
+    failures = {}
     if compile_files:
         if not isfile(python_exe):
             print("compiling .pyc files... failed as no python interpreter was found")
         else:
-            print("compiling .pyc files...")
-            args = [python_exe, "-Wi", "-m", "py_compile"]
-            args_len = len(" ".join(args)) + 1
-            # chunk them to avoid too long comand lines:
-            groups = chunks(compile_files, MAX_CHUNK_SIZE - args_len)
-            for group in groups:
-                call(args + group, cwd=cwd)
+            print(f"compiling {len(compile_files)} .pyc files...")
+            compile_files.sort()
+            remaining = set(compile_files)
+            try:
+                for path, error in _compile_pyc(compile_files, cwd, python_exe, jobs):
+                    remaining.discard(path)
+                    if error:
+                        failures[path] = error
+            except (OSError, CalledProcessError) as e:
+                log = utils.get_logger(__name__)
+                log.warning(
+                    f"compiling .pyc files in parallel failed ({e}), "
+                    "compiling the remaining ones one chunk at a time"
+                )
+                args = [python_exe, "-Wi", "-m", "py_compile"]
+                args_len = len(" ".join(args)) + 1
+                # chunk them to avoid too long comand lines:
+                groups = chunks(sorted(remaining), MAX_CHUNK_SIZE - args_len)
+                for group in groups:
+                    call(args + group, cwd=cwd)
+            if failures:
+                print(f"failed to compile {len(failures)} .pyc files:")
+                for path, error in sorted(failures.items()):
+                    print(f"  {path}: {error}")
+    return failures
+
+
+def _compile_pyc(files, cwd, python_exe, jobs=None):
+    """
+    Compile ``files`` with a single worker process running ``_compile_pyc.py`` in
+    ``python_exe``, which hands them to a pool of ``jobs`` processes. Yields each
+    file as it is compiled, with the error message if it could not be, and prints
+    the progress along the way. Raises CalledProcessError if the worker fails.
+    """
+    jobs = jobs or int(get_cpu_count())
+    # run a copy, so that modules next to it cannot shadow the standard library
+    with TemporaryDirectory() as tmp_dir:
+        script = join(tmp_dir, basename(COMPILE_PYC_SCRIPT))
+        shutil.copyfile(COMPILE_PYC_SCRIPT, script)
+        with Popen(
+            [python_exe, "-Wi", script],
+            cwd=cwd,
+            stdin=PIPE,
+            stdout=PIPE,
+            text=True,
+            encoding="utf-8",
+        ) as process:
+            process.stdin.write(json.dumps({"files": files, "jobs": jobs}))
+            process.stdin.close()
+            step = max(len(files) // 10, 1000)
+            done = 0
+            for line in process.stdout:
+                try:
+                    result = json.loads(line)
+                    path, error = result["path"], result["error"]
+                except (ValueError, TypeError, KeyError):
+                    # not a result, e.g. printed by a .pth file or sitecustomize
+                    continue
+                yield path, error
+                done += 1
+                if not done % step:
+                    print(f"compiled {done}/{len(files)} .pyc files")
+        if process.returncode:
+            raise CalledProcessError(process.returncode, process.args)
 
 
 def check_dist_info_version(name, version, files):
@@ -587,12 +659,8 @@ def check_binary_patchers(elf, prefix, rpath):
 """
 
 
-def mk_relative_linux(f, prefix, rpaths=("lib",), method=None):
-    "Respects the original values and converts abs to $ORIGIN-relative"
-
-    elf = join(prefix, f)
-    origin = dirname(elf)
-
+def _get_rpath_with_tools(elf, prefix, method):
+    "The existing rpath of elf read with patchelf and LIEF, and the method to set it with"
     existing_pe = None
     patchelf = external.find_executable("patchelf", prefix)
     if not patchelf:
@@ -642,6 +710,47 @@ def mk_relative_linux(f, prefix, rpaths=("lib",), method=None):
         # Use LIEF if method is LIEF to get the initial value?
         if method == "LIEF":
             existing = existing2
+    return existing, method
+
+
+def _set_rpath_with_tools(elf, prefix, rpath, method):
+    "Set the rpath of elf with patchelf, or with LIEF if asked for or without patchelf"
+    patchelf = external.find_executable("patchelf", prefix)
+    if not patchelf and method != "LIEF":
+        print(
+            f"ERROR :: You should install patchelf, will proceed with LIEF for {elf} (was {method})"
+        )
+    # check_binary_patchers(elf, prefix, rpath)
+    if not patchelf or (method and method.upper() == "LIEF"):
+        set_rpath(old_matching="*", new_rpath=rpath, file=elf)
+    else:
+        call([patchelf, "--force-rpath", "--set-rpath", rpath, elf])
+
+
+def mk_relative_linux(f, prefix, rpaths=("lib",), method=None):
+    """
+    Respects the original values and converts abs to $ORIGIN-relative
+
+    Unless LIEF is asked for, the rpath is read and, when the new value fits in the
+    string table, set in-process (see pyldd.elf_set_rpath); patchelf (or LIEF) is only
+    run when that is not possible.
+    """
+
+    elf = join(prefix, f)
+    origin = dirname(elf)
+
+    existing = None
+    if not (method and method.upper() == "LIEF"):
+        try:
+            existing = elf_get_rpath(elf)
+        except Exception as e:
+            print(
+                f"WARNING :: reading the rpath of {elf} failed: {e}, will proceed with patchelf"
+            )
+    in_process = existing is not None
+    if not in_process:
+        existing, method = _get_rpath_with_tools(elf, prefix, method)
+
     new = []
     for old in existing:
         if old.startswith("$ORIGIN"):
@@ -664,11 +773,9 @@ def mk_relative_linux(f, prefix, rpaths=("lib",), method=None):
                 new.append(rpath)
     rpath = ":".join(new)
 
-    # check_binary_patchers(elf, prefix, rpath)
-    if not patchelf or (method and method.upper() == "LIEF"):
-        set_rpath(old_matching="*", new_rpath=rpath, file=elf)
-    else:
-        call([patchelf, "--force-rpath", "--set-rpath", rpath, elf])
+    if in_process and elf_set_rpath(elf, rpath):
+        return
+    _set_rpath_with_tools(elf, prefix, rpath, method)
 
 
 def assert_relative_osx(path, host_prefix, build_prefix):
@@ -972,6 +1079,7 @@ def _map_file_to_package(
     ignore_list_syms,
     sysroot_substitution,
     enable_static,
+    static_lib_index=None,
 ):
     # Form a mapping of file => package
 
@@ -1025,7 +1133,9 @@ def _map_file_to_package(
                         exports = {
                             e
                             for e in get_exports_memoized(
-                                fp, enable_static=enable_static
+                                fp,
+                                enable_static=enable_static,
+                                static_lib_index_dir=static_lib_index,
                             )
                             if not any(
                                 fnmatch(e, pattern) for pattern in ignore_list_syms
@@ -1379,6 +1489,7 @@ def check_overlinking_impl(
     channel_urls,
     enable_static=False,
     variants={},
+    static_lib_index=None,
 ):
     verbose = True
     errors = []
@@ -1561,6 +1672,7 @@ def check_overlinking_impl(
         ignore_list_syms,
         sysroot_substitution,
         enable_static,
+        static_lib_index,
     )
 
     for f in files_to_inspect:
@@ -1680,6 +1792,7 @@ def check_overlinking_impl(
         return dict()
 
 
+@traced("check_overlinking", argument_attributes("m"))
 def check_overlinking(m: MetaData, files, host_prefix=None):
     patterns = m.get_value("build/overlinking_ignore_patterns", [])
     files = [
@@ -1710,44 +1823,50 @@ def check_overlinking(m: MetaData, files, host_prefix=None):
             addendum="Use 'build/runpath_allowlist' instead.",
         )
 
-    return check_overlinking_impl(
-        pkg_name=m.name(),
-        pkg_version=m.version(),
-        build_str=m.build_id(),
-        build_number=m.build_number(),
-        subdir=m.config.target_subdir,
-        ignore_run_exports=m.get_value("build/ignore_run_exports"),
-        requirements_run=[
-            req.split(" ")[0] for req in m.get_value("requirements/run", [])
-        ],
-        requirements_build=[
-            req.split(" ")[0] for req in m.get_value("requirements/build", [])
-        ],
-        requirements_host=[
-            req.split(" ")[0] for req in m.get_value("requirements/host", [])
-        ],
-        run_prefix=host_prefix or m.config.host_prefix,
-        build_prefix=m.config.build_prefix,
-        # Support both old and new recipe keys (new preferred)
-        missing_dso_allowlist=m.get_value(
-            "build/missing_dso_allowlist",
-            m.get_value("build/missing_dso_whitelist", []),
-        ),
-        runpath_allowlist=m.get_value(
-            "build/runpath_allowlist",
-            m.get_value("build/runpath_whitelist", []),
-        ),
-        error_overlinking=m.config.error_overlinking,
-        error_overdepending=m.config.error_overdepending,
-        verbose=m.config.verbose,
-        exception_on_error=True,
-        files=files,
-        bldpkgs_dirs=m.config.bldpkgs_dir,
-        output_folder=m.config.output_folder,
-        channel_urls=[*m.config.channel_urls, "local"],
-        enable_static=m.config.enable_static,
-        variants=m.config.variant,
-    )
+    with search_path_cache.scope():
+        result = check_overlinking_impl(
+            pkg_name=m.name(),
+            pkg_version=m.version(),
+            build_str=m.build_id(),
+            build_number=m.build_number(),
+            subdir=m.config.target_subdir,
+            ignore_run_exports=m.get_value("build/ignore_run_exports"),
+            requirements_run=[
+                req.split(" ")[0] for req in m.get_value("requirements/run", [])
+            ],
+            requirements_build=[
+                req.split(" ")[0] for req in m.get_value("requirements/build", [])
+            ],
+            requirements_host=[
+                req.split(" ")[0] for req in m.get_value("requirements/host", [])
+            ],
+            run_prefix=host_prefix or m.config.host_prefix,
+            build_prefix=m.config.build_prefix,
+            # Support both old and new recipe keys (new preferred)
+            missing_dso_allowlist=m.get_value(
+                "build/missing_dso_allowlist",
+                m.get_value("build/missing_dso_whitelist", []),
+            ),
+            runpath_allowlist=m.get_value(
+                "build/runpath_allowlist",
+                m.get_value("build/runpath_whitelist", []),
+            ),
+            error_overlinking=m.config.error_overlinking,
+            error_overdepending=m.config.error_overdepending,
+            verbose=m.config.verbose,
+            exception_on_error=True,
+            files=files,
+            bldpkgs_dirs=m.config.bldpkgs_dir,
+            output_folder=m.config.output_folder,
+            channel_urls=[*m.config.channel_urls, "local"],
+            enable_static=m.config.enable_static,
+            variants=m.config.variant,
+            static_lib_index=m.config.static_lib_index
+            if m.config.enable_static
+            else None,
+        )
+    utils.get_logger(__name__).debug(search_path_cache.format_stats())
+    return result
 
 
 def post_process_shared_lib(m, f, files, host_prefix=None):
@@ -1776,6 +1895,42 @@ def post_process_shared_lib(m, f, files, host_prefix=None):
         mk_relative_osx(path, host_prefix, m, files=files, rpaths=rpaths)
 
 
+def post_process_shared_libs(m, files, prefix_files, host_prefix=None):
+    """
+    Relocate the shared libraries and executables among ``files``. ELF files are
+    patched concurrently, others one at a time. Hardlinks of the same ELF file are
+    patched one after the other by the same worker, in the order of ``files``.
+    """
+    if not host_prefix:
+        host_prefix = m.config.host_prefix
+    elf_inodes = {}
+    for f in files:
+        path = join(host_prefix, f)
+        if codefile_class(path, skip_symlinks=True) == elffile:
+            st = os.lstat(path)
+            elf_inodes.setdefault((st.st_dev, st.st_ino), []).append(f)
+        else:
+            post_process_shared_lib(m, f, prefix_files, host_prefix)
+    if not elf_inodes:
+        return
+
+    def process_links(links):
+        for f in links:
+            post_process_shared_lib(m, f, prefix_files, host_prefix)
+
+    method = m.get_value("build/rpaths_patcher", None)
+    if method and method.upper() == "LIEF":
+        # LIEF is not known to be thread-safe
+        workers = 1
+    else:
+        workers = min(32, (os.cpu_count() or 1) + 4, len(elf_inodes))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in [
+            executor.submit(process_links, links) for links in elf_inodes.values()
+        ]:
+            future.result()
+
+
 def fix_permissions(files, prefix):
     print("Fixing permissions")
     for path in os.scandir(prefix):
@@ -1892,6 +2047,7 @@ def _check_one_menuinst_json(json_file):
         log.info("'%s' is a valid menuinst JSON document", json_file)
 
 
+@traced("post_build", argument_attributes("m"))
 def post_build(m, files, build_python, host_prefix=None, is_already_linked=False):
     print("number of files:", len(files))
 
@@ -1910,8 +2066,9 @@ def post_build(m, files, build_python, host_prefix=None, is_already_linked=False
             m.get_value("build/osx_is_app", False)
         )
         check_symlinks(files, host_prefix, m.config.croot)
-        prefix_files = utils.prefix_files(host_prefix)
+        prefix_files = utils.prefix_snapshot(host_prefix).files
 
+        relocate = []
         for f in files:
             if f.startswith("bin/"):
                 fix_shebang(
@@ -1923,7 +2080,8 @@ def post_build(m, files, build_python, host_prefix=None, is_already_linked=False
             if binary_relocation is True or (
                 isinstance(binary_relocation, list) and f in binary_relocation
             ):
-                post_process_shared_lib(m, f, prefix_files, host_prefix)
+                relocate.append(f)
+        post_process_shared_libs(m, relocate, prefix_files, host_prefix)
     check_overlinking(m, files, host_prefix)
     check_menuinst_json(files, host_prefix)
 
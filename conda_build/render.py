@@ -30,7 +30,8 @@
   ``conda_build.api.render`` (see that module for ``--file`` and other flags).
 
 **Programmatic:** ``conda_build.api.render``, ``conda_build.api.build``. **Paths:** ``bldpkg_path``
-and helpers in this file.
+and helpers in this file; ``plan_output_paths`` backs ``conda_build.api.get_output_file_paths``
+for recipes on disk.
 """
 
 from __future__ import annotations
@@ -70,6 +71,7 @@ from .config import CondaPkgFormat
 from .exceptions import CondaBuildUserError, DependencyNeedsBuildingError, RecipeError
 from .index import get_build_index
 from .metadata import MetaData, MetaDataTuple, combine_top_level_metadata_with_output
+from .tracing import argument_attributes, traced
 from .utils import (
     CONDA_PACKAGE_EXTENSION_V1,
     package_record_to_requirement,
@@ -1061,6 +1063,7 @@ def open_recipe(recipe: str | os.PathLike | Path) -> Iterator[Path]:
         sys.exit(f"Error: non-recipe: {recipe}")
 
 
+@traced("render", argument_attributes(recipe="recipe_dir"))
 def render_recipe(
     recipe_dir: str | os.PathLike | Path,
     config: Config,
@@ -1173,6 +1176,72 @@ def render_metadata_tuples(
     return list(output_metas.values())
 
 
+def filename_needs_solve(m: MetaData) -> bool:
+    """Whether the package filename of an output rendered with ``bypass_env_check`` can
+    still change once its build and host environments are solved.
+
+    Unless the build string is set entirely by hand, it depends on the solve: the
+    ``py``/``np``/``pl``/``lua``/``r`` prefix comes from run requirements that run_exports
+    fill in and from the exact build/host pins, and the dependency hash covers virtual
+    packages that run_exports may add.  Only outputs without anything to solve for in
+    build and host are safe to name up front.
+    """
+    if m.skip() or not m.uses_pkg_hash():
+        return False
+    # other outputs of the recipe are not solved for, and neither are their run_exports
+    other_outputs = {name for (name, _) in getattr(m, "other_outputs", {})}
+    return any(
+        spec.split()[0] not in other_outputs
+        for env in ("build", "host")
+        for spec in m.get_depends_top_and_out(env)
+    )
+
+
+def plan_output_paths(
+    recipe_dirs: Iterable[str | os.PathLike | Path],
+    config: Config,
+    variants: dict[str, Any] | None = None,
+    permit_unsatisfiable_variants: bool = True,
+) -> list[str]:
+    """Paths of the packages the recipes would create, solving only where it matters.
+
+    Each variant is rendered with ``bypass_env_check`` first and only finalized against
+    the index when :func:`filename_needs_solve` holds for one of its conda outputs.  All
+    recipes share ``config``, so the build index is fetched once for the whole batch.
+    """
+    paths = set()
+    for recipe_dir in recipe_dirs:
+        metadata_tuples = render_recipe(
+            recipe_dir,
+            config=config,
+            no_download_source=config.no_download_source,
+            variants=variants,
+            permit_unsatisfiable_variants=permit_unsatisfiable_variants,
+            bypass_env_check=True,
+        )
+        for meta, _, _ in metadata_tuples:
+            if meta.skip() and config.trim_skip:
+                continue
+            outputs = meta.get_output_metadata_set(
+                permit_unsatisfiable_variants=permit_unsatisfiable_variants,
+                bypass_env_check=True,
+            )
+            if any(
+                filename_needs_solve(om)
+                for od, om in outputs
+                if not od.get("type") or od["type"].startswith("conda")
+            ):
+                outputs = meta.get_output_metadata_set(
+                    permit_unsatisfiable_variants=permit_unsatisfiable_variants,
+                )
+            for _, om in outputs:
+                if not om.skip():
+                    paths.add(bldpkg_path(om))
+                elif not config.trim_skip:
+                    paths.add(utils.get_skip_message(om))
+    return sorted(paths)
+
+
 # Keep this out of the function below so it can be imported by other modules.
 FIELDS = [
     "package",
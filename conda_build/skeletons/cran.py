@@ -994,7 +994,11 @@ def skeletonize(
             rm_rf(config.work_dir)
             m = MetaData.fromdict({"source": {"git_url": location}}, config=config)
             source.git_source(
-                m.get_section("source"), m.config.git_cache, m.config.work_dir
+                m.get_section("source"),
+                m.config.git_cache,
+                m.config.work_dir,
+                timeout=m.config.timeout,
+                locking=m.config.locking,
             )
             new_git_tag = git_tag if git_tag else get_latest_git_tag(config)
             p = subprocess.Popen(
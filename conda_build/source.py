@@ -6,6 +6,7 @@ import locale
 import os
 import re
 import shutil
+import subprocess
 import sys
 import tempfile
 import time
@@ -16,28 +17,32 @@ from typing import TYPE_CHECKING
 from urllib.parse import urljoin
 
 from conda.exceptions import CondaHTTPError
-from conda.gateways.connection.download import download
 from conda.gateways.disk.create import TemporaryDirectory
-from conda.gateways.disk.read import compute_sum
 from conda.utils import url_path
 
 from .exceptions import MissingDependency
 from .os_utils import external
+from .patch_analysis import analyze_patch
+from .tracing import argument_attributes, traced
 from .utils import (
     LoggingContext,
     check_call_env,
     check_output_env,
     compute_content_hash,
+    compute_sums,
     convert_path_for_cygwin_or_msys2,
     convert_unix_path_to_win,
     copy_into,
     decompressible_exts,
+    download_with_sums,
     ensure_list,
+    get_lock,
     get_logger,
     on_win,
     rm_rf,
     safe_print_unicode,
     tar_xf,
+    try_acquire_locks,
 )
 
 if TYPE_CHECKING:
@@ -46,6 +51,7 @@ if TYPE_CHECKING:
 log = get_logger(__name__)
 
 git_submod_re = re.compile(r"(?:.+)\.(.+)\.(?:.+)\s(.+)")
+git_commit_re = re.compile(r"[0-9a-fA-F]{7,64}")
 ext_re = re.compile(r"(.*?)(\.(?:tar\.)?[^.]+)$")
 ACCEPTED_HASH_TYPES = ("md5", "sha1", "sha224", "sha256", "sha384", "sha512")
 CONTENT_HASH_KEYS = ("content_sha256", "content_sha384", "content_sha512")
@@ -82,10 +88,16 @@ def download_to_cache(cache_folder, recipe_path, source_dict, verbose=False):
             "Add hash to recipe to use source cache."
         )
 
+    # every declared hash plus sha256 for the cache filename, computed in one pass
+    hash_types = set(source_dict).intersection(ACCEPTED_HASH_TYPES)
+    if not hash_added:
+        hash_types.add("sha256")
+
     path = join(cache_folder, fn)
     if isfile(path):
         if verbose:
             log.info(f"Found source in cache: {fn}")
+        hashes = compute_sums(path, hash_types)
     else:
         if verbose:
             log.info(f"Downloading source to cache: {fn}")
@@ -104,7 +116,7 @@ def download_to_cache(cache_folder, recipe_path, source_dict, verbose=False):
                 if verbose:
                     log.info(f"Downloading {url}")
                 with LoggingContext():
-                    download(url, path)
+                    hashes = download_with_sums(url, path, hash_types)
             except CondaHTTPError as e:
                 log.warning(f"Error: {str(e).strip()}")
                 rm_rf(path)
@@ -119,24 +131,20 @@ def download_to_cache(cache_folder, recipe_path, source_dict, verbose=False):
             rm_rf(path)
             raise RuntimeError(f"Could not download {url}")
 
-    hashed = None
-    for hash_type in set(source_dict).intersection(ACCEPTED_HASH_TYPES):
-        if hash_type in source_dict:
-            expected_hash = source_dict[hash_type]
-            hashed = compute_sum(path, hash_type)
-            if expected_hash != hashed:
-                rm_rf(path)
-                raise RuntimeError(
-                    f"{hash_type.upper()} mismatch for {unhashed_fn}: "
-                    f"obtained '{hashed}' != expected '{expected_hash}'"
-                )
+    for hash_type in sorted(set(source_dict).intersection(ACCEPTED_HASH_TYPES)):
+        expected_hash = source_dict[hash_type]
+        hashed = hashes[hash_type]
+        if expected_hash != hashed:
+            rm_rf(path)
+            raise RuntimeError(
+                f"{hash_type.upper()} mismatch for {unhashed_fn}: "
+                f"obtained '{hashed}' != expected '{expected_hash}'"
+            )
 
     # this is really a fallback.  If people don't provide the hash, we still need to prevent
     #    collisions in our source cache, but the end user will get no benefit from the cache.
     if not hash_added:
-        if not hashed:
-            hashed = compute_sum(path, "sha256")
-        dest_path = append_hash_to_fn(path, hashed)
+        dest_path = append_hash_to_fn(path, hashes["sha256"])
         if not os.path.isfile(dest_path):
             shutil.move(path, dest_path)
         path = dest_path
@@ -150,13 +158,13 @@ def hoist_single_extracted_folder(nested_folder):
     This is for when your archive extracts into its own folder, so that we don't need to
     know exactly what that folder is called."""
     parent = os.path.dirname(nested_folder)
-    flist = os.listdir(nested_folder)
-    with TemporaryDirectory() as tmpdir:
-        for entry in flist:
-            shutil.move(os.path.join(nested_folder, entry), os.path.join(tmpdir, entry))
-        rm_rf(nested_folder)
-        for entry in flist:
-            shutil.move(os.path.join(tmpdir, entry), os.path.join(parent, entry))
+    # Stage inside the parent so every move is a rename on the same filesystem. Moving
+    # the folder aside first lets an entry named like the folder itself be hoisted.
+    with TemporaryDirectory(dir=parent, prefix=".hoist-") as tmpdir:
+        staged = os.path.join(tmpdir, os.path.basename(nested_folder))
+        os.rename(nested_folder, staged)
+        for entry in os.listdir(staged):
+            shutil.move(os.path.join(staged, entry), os.path.join(parent, entry))
 
 
 def unpack(
@@ -169,7 +177,12 @@ def unpack(
     timeout=900,
     locking=True,
 ):
-    """Uncompress a downloaded source."""
+    """Uncompress a downloaded source.
+
+    The archive is extracted into a staging folder inside ``src_dir`` so that moving the
+    extracted entries into place never copies data across filesystems. A single
+    top-level folder is stripped (unless ``no_hoist`` is set) by moving its entries
+    straight into ``src_dir``."""
     src_path, unhashed_fn = download_to_cache(
         cache_folder, recipe_path, source_dict, verbose
     )
@@ -178,7 +191,7 @@ def unpack(
         os.makedirs(src_dir)
     if verbose:
         print("Extracting download")
-    with TemporaryDirectory(dir=croot) as tmpdir:
+    with TemporaryDirectory(dir=src_dir, prefix=".unpack-") as tmpdir:
         unhashed_dest = os.path.join(tmpdir, unhashed_fn)
         if src_path.lower().endswith(decompressible_exts):
             tar_xf(src_path, tmpdir)
@@ -197,14 +210,14 @@ def unpack(
         if not flist:
             log.warning("Empty source archive detected: %s. Ignoring...", src_path)
             return
+        extracted = tmpdir
         folder = os.path.join(tmpdir, flist[0])
         # Hoisting is destructive of information, in CDT packages, a single top level
         # folder of /usr64 must not be discarded.
         if len(flist) == 1 and os.path.isdir(folder) and "no_hoist" not in source_dict:
-            hoist_single_extracted_folder(folder)
-        flist = os.listdir(tmpdir)
-        for f in flist:
-            shutil.move(os.path.join(tmpdir, f), os.path.join(src_dir, f))
+            extracted = folder
+        for f in os.listdir(extracted):
+            shutil.move(os.path.join(extracted, f), os.path.join(src_dir, f))
 
 
 def check_git_lfs(git, cwd, git_ref):
@@ -223,64 +236,51 @@ def git_lfs_fetch(git, cwd, git_ref, stdout, stderr):
     )
 
 
-def git_mirror_checkout_recursive(
-    git,
-    mirror_dir,
-    checkout_dir,
-    git_url,
-    git_cache,
-    git_ref=None,
-    git_depth=-1,
-    is_top_level=True,
-    verbose=True,
-):
-    """Mirror (and checkout) a Git repository recursively.
-
-    It's not possible to use `git submodule` on a bare
-    repository, so the checkout must be done before we
-    know which submodules there are.
+# (mirror_dir, git_ref) pairs already fetched by this process, repeated requests for
+# the same ref of a mirror (e.g. one per variant) reuse that fetch
+_fetched_git_mirrors = set()
 
-    Worse, submodules can be identified by using either
-    absolute URLs or relative paths.  If relative paths
-    are used those need to be relocated upon mirroring,
-    but you could end up with `../../../../blah` and in
-    that case conda-build could be tricked into writing
-    to the root of the drive and overwriting the system
-    folders unless steps are taken to prevent that.
-    """
 
-    if verbose:
-        stdout = None
-        stderr = None
-    else:
-        FNULL = open(os.devnull, "wb")
-        stdout = FNULL
-        stderr = FNULL
+def _git_commit_in_mirror(git, mirror_dir, git_ref):
+    """Whether ``git_ref`` is a commit hash that ``mirror_dir`` already contains.
 
-    if not mirror_dir.startswith(git_cache + os.sep):
-        sys.exit(
-            f"Error: Attempting to mirror to {mirror_dir} which is outside of GIT_CACHE {git_cache}"
+    Branches and tags can move upstream, so only commit hashes are trusted without
+    fetching."""
+    if not git_commit_re.fullmatch(git_ref):
+        return False
+    try:
+        commit = check_output_env(
+            [git, "rev-parse", "--verify", "--quiet", f"{git_ref}^{{commit}}"],
+            cwd=mirror_dir,
+            stderr=subprocess.DEVNULL,
         )
+    except CalledProcessError:
+        return False
+    return commit.decode("utf-8").strip().startswith(git_ref.lower())
 
-    # This is necessary for Cygwin git and m2-git, although it is fixed in newer MSYS2.
-    git_mirror_dir = convert_path_for_cygwin_or_msys2(git, mirror_dir).rstrip("/")
-    git_checkout_dir = convert_path_for_cygwin_or_msys2(git, checkout_dir).rstrip("/")
 
-    # Set default here to catch empty dicts
-    git_ref = git_ref or "HEAD"
+def _update_git_mirror(
+    git, mirror_dir, git_mirror_dir, git_url, git_ref, git_depth, stdout, stderr
+):
+    """Create or update the bare mirror of ``git_url`` so it contains ``git_ref``.
 
-    mirror_dir = mirror_dir.rstrip("/")
-    if not isdir(os.path.dirname(mirror_dir)):
-        os.makedirs(os.path.dirname(mirror_dir))
+    Must be called while holding the mirror's lock."""
+    fetch_key = (mirror_dir, git_ref)
     if isdir(mirror_dir):
         try:
             if git_ref != "HEAD":
-                check_call_env(
-                    [git, "fetch"], cwd=mirror_dir, stdout=stdout, stderr=stderr
-                )
+                if fetch_key not in _fetched_git_mirrors and not _git_commit_in_mirror(
+                    git, mirror_dir, git_ref
+                ):
+                    args = [git, "fetch"]
+                    # keep shallow mirrors shallow instead of fetching the full history
+                    if git_depth > 0 and isfile(join(mirror_dir, "shallow")):
+                        args += ["--depth", str(git_depth)]
+                    check_call_env(args, cwd=mirror_dir, stdout=stdout, stderr=stderr)
+                    _fetched_git_mirrors.add(fetch_key)
                 if check_git_lfs(git, mirror_dir, git_ref):
                     git_lfs_fetch(git, mirror_dir, git_ref, stdout, stderr)
-            else:
+            elif fetch_key not in _fetched_git_mirrors:
                 # Unlike 'git clone', fetch doesn't automatically update the cache's HEAD,
                 # So here we explicitly store the remote HEAD in the cache's local refs/heads,
                 # and then explicitly set the cache's HEAD.
@@ -304,6 +304,7 @@ def git_mirror_checkout_recursive(
                     stdout=stdout,
                     stderr=stderr,
                 )
+                _fetched_git_mirrors.add(fetch_key)
         except CalledProcessError:
             msg = (
                 "Failed to update local git cache. "
@@ -314,6 +315,9 @@ def git_mirror_checkout_recursive(
             # Maybe the failure was caused by a corrupt mirror directory.
             # Delete it so the user can try again.
             shutil.rmtree(mirror_dir)
+            _fetched_git_mirrors.difference_update(
+                {key for key in _fetched_git_mirrors if key[0] == mirror_dir}
+            )
             raise
     else:
         args = [git, "clone", "--mirror"]
@@ -338,11 +342,82 @@ def git_mirror_checkout_recursive(
                 args + [git_url, git_mirror_dir], stdout=stdout, stderr=stderr
             )
         assert isdir(mirror_dir)
+        # a fresh clone is as current as a fetch
+        _fetched_git_mirrors.add(fetch_key)
 
-    # Now clone from mirror_dir into checkout_dir.
-    check_call_env(
-        [git, "clone", git_mirror_dir, git_checkout_dir], stdout=stdout, stderr=stderr
-    )
+
+def git_mirror_checkout_recursive(
+    git,
+    mirror_dir,
+    checkout_dir,
+    git_url,
+    git_cache,
+    git_ref=None,
+    git_depth=-1,
+    is_top_level=True,
+    verbose=True,
+    timeout=900,
+    locking=True,
+):
+    """Mirror (and checkout) a Git repository recursively.
+
+    It's not possible to use `git submodule` on a bare
+    repository, so the checkout must be done before we
+    know which submodules there are.
+
+    Worse, submodules can be identified by using either
+    absolute URLs or relative paths.  If relative paths
+    are used those need to be relocated upon mirroring,
+    but you could end up with `../../../../blah` and in
+    that case conda-build could be tricked into writing
+    to the root of the drive and overwriting the system
+    folders unless steps are taken to prevent that.
+    """
+
+    if verbose:
+        stdout = None
+        stderr = None
+    else:
+        FNULL = open(os.devnull, "wb")
+        stdout = FNULL
+        stderr = FNULL
+
+    if not mirror_dir.startswith(git_cache + os.sep):
+        sys.exit(
+            f"Error: Attempting to mirror to {mirror_dir} which is outside of GIT_CACHE {git_cache}"
+        )
+
+    # This is necessary for Cygwin git and m2-git, although it is fixed in newer MSYS2.
+    git_mirror_dir = convert_path_for_cygwin_or_msys2(git, mirror_dir).rstrip("/")
+    git_checkout_dir = convert_path_for_cygwin_or_msys2(git, checkout_dir).rstrip("/")
+
+    # Set default here to catch empty dicts
+    git_ref = git_ref or "HEAD"
+
+    mirror_dir = mirror_dir.rstrip("/")
+    if not isdir(os.path.dirname(mirror_dir)):
+        os.makedirs(os.path.dirname(mirror_dir))
+    # Concurrent builds share the mirror, so only one of them may update it at a time.
+    # Whoever waited for the lock will usually find the mirror already up to date.
+    locks = [get_lock(mirror_dir, timeout=timeout)] if locking else []
+    with try_acquire_locks(locks, timeout):
+        _update_git_mirror(
+            git,
+            mirror_dir,
+            git_mirror_dir,
+            git_url,
+            git_ref,
+            git_depth,
+            stdout,
+            stderr,
+        )
+
+        # Now clone from mirror_dir into checkout_dir.
+        check_call_env(
+            [git, "clone", git_mirror_dir, git_checkout_dir],
+            stdout=stdout,
+            stderr=stderr,
+        )
     if is_top_level:
         checkout = git_ref
         if git_url.startswith("."):
@@ -398,6 +473,8 @@ def git_mirror_checkout_recursive(
                     git_depth=git_depth,
                     is_top_level=False,
                     verbose=verbose,
+                    timeout=timeout,
+                    locking=locking,
                 )
 
     if is_top_level:
@@ -422,7 +499,15 @@ def git_mirror_checkout_recursive(
         FNULL.close()
 
 
-def git_source(source_dict, git_cache, src_dir, recipe_path=None, verbose=True):
+def git_source(
+    source_dict,
+    git_cache,
+    src_dir,
+    recipe_path=None,
+    verbose=True,
+    timeout=900,
+    locking=True,
+):
     """Download a source from a Git repo (or submodule, recursively)"""
     if not isdir(git_cache):
         os.makedirs(git_cache)
@@ -462,6 +547,8 @@ def git_source(source_dict, git_cache, src_dir, recipe_path=None, verbose=True):
         git_depth=git_depth,
         is_top_level=True,
         verbose=verbose,
+        timeout=timeout,
+        locking=locking,
     )
     return git
 
@@ -803,6 +890,35 @@ def _get_patch_attributes(
             )
         return result
 
+    levels = [strip_level]
+    if strip_level_guessed:
+        levels += [level for level in range(3) if level != strip_level]
+    analysis = analyze_patch(path, src_dir, levels)
+    if analysis is not None:
+        # the analysis only picks the strip level and format, patch still gets a dry run
+        # before applying it. Patches are applied as they are (--binary), so a patch that
+        # only applies after converting its line endings is not applicable
+        applicable = analysis.applicable and analysis.format == "native"
+        if analysis.applicable and not applicable:
+            log.warning(
+                f"{path} only applies with {analysis.format} line endings, "
+                "please convert it"
+            )
+        if analysis.level != strip_level:
+            files = {f.split("/", analysis.level)[-1] for f in files_list}
+        result.update(
+            files=files,
+            level=analysis.level,
+            dry_runnable=applicable and "native",
+            applicable=applicable and "native",
+            reversible=applicable and analysis.reversible and "native",
+            offsets=analysis.offsets,
+            fuzzy=analysis.fuzzy,
+            stderr=False,
+            args=[f"-Np{analysis.level}", "-i", path, "--binary"],
+        )
+        return result
+
     class noop_context:
         value = None
 
@@ -931,7 +1047,8 @@ def apply_one_patch(src_dir, recipe_dir, rel_path, config, git=None):
         #    atomic.
         #
         # Still, we do our best to mitigate all of this as follows:
-        # 1. We use --dry-run to test for applicability first.
+        # 1. We use --dry-run to test for applicability first, even when the patch was
+        #    found applicable in-process, since only patch itself decides how it applies.
         # 2 We check for native application of a native patch (--binary, without --ignore-whitespace)
         #
         # Some may bemoan the loss of patch failure artifacts, but it is fairly random which
@@ -1011,7 +1128,11 @@ def apply_one_patch(src_dir, recipe_dir, rel_path, config, git=None):
 
             try:
                 try_apply_patch(
-                    patch_exe, patch_args, cwd=src_dir, stdout=stdout, stderr=stderr
+                    patch_exe,
+                    patch_args,
+                    cwd=src_dir,
+                    stdout=stdout,
+                    stderr=stderr,
                 )
             except Exception as e:
                 exception = e
@@ -1026,6 +1147,7 @@ def apply_patch(src_dir, patch, config, git=None):
     )
 
 
+@traced("source", argument_attributes("metadata"))
 def provide(metadata):
     """
     given a recipe_dir:
@@ -1058,6 +1180,8 @@ def provide(metadata):
                     src_dir,
                     metadata.path,
                     verbose=metadata.config.verbose,
+                    timeout=metadata.config.timeout,
+                    locking=metadata.config.locking,
                 )
             # build to make sure we have a work directory with source in it. We
             #    want to make sure that whatever version that is does not
@@ -1,8 +1,11 @@
 # Copyright (C) 2014 Anaconda, Inc
 # SPDX-License-Identifier: BSD-3-Clause
 import json
-import tarfile
-from os.path import basename, normpath
+from contextlib import closing
+from os.path import basename, join, normpath
+from zipfile import ZipFile
+
+import libarchive
 
 from .utils import codec, filter_info_files
 
@@ -12,63 +15,171 @@ def dist_fn(fn):
         return fn[:-4]
     elif fn.endswith(".tar.bz2"):
         return fn[:-8]
+    elif fn.endswith(".conda"):
+        return fn[:-6]
     else:
         raise Exception(f"did not expect filename: {fn!r}")
 
 
+def _info_files_violations(listed, members):
+    violations = []
+    seta = set(listed)
+    if len(listed) != len(seta):
+        violations.append("info/files: duplicates")
+
+    # before filtering, which drops duplicates
+    members = [normpath(m) for m in members]
+    if len(members) != len(set(members)):
+        violations.append("info/files: duplicate members")
+
+    setb = set(filter_info_files(members, ""))
+
+    for p in sorted(seta ^ setb):
+        if p not in seta:
+            violations.append(f"info/files: {p!r} not in info/files")
+        if p not in setb:
+            violations.append(f"info/files: {p!r} not in tarball")
+    return violations
+
+
+def _index_json_violations(info, expected):
+    violations = [
+        f"{varname}: {info.get(varname)!r} != {expected[varname]!r}"
+        for varname in ("name", "version")
+        if info.get(varname) != expected[varname]
+    ]
+    if not isinstance(info.get("build_number"), int):
+        violations.append(
+            f"build_number: {info.get('build_number')!r} is not an integer"
+        )
+    return violations
+
+
+def _subdir_violations(info, config):
+    if info.get("subdir") in [config.host_subdir, "noarch", config.target_subdir]:
+        return []
+    return [
+        "Inconsistent subdir in package - index.json expecting {}, got {}".format(
+            config.host_subdir, info.get("subdir")
+        )
+    ]
+
+
+def _raise_violations(violations, exception=Exception):
+    if violations:
+        raise exception("\n".join(violations))
+
+
+def _check_info_files(listed, members):
+    _raise_violations(_info_files_violations(listed, members))
+
+
+def _check_index_json(info, expected):
+    _raise_violations(_index_json_violations(info, expected))
+
+
+def _check_subdir(info, config):
+    _raise_violations(_subdir_violations(info, config), AssertionError)
+
+
+def _components(path, prefix):
+    """The entries of the tarballs of a .tar.bz2 or of the .conda components ``prefix``."""
+    if not path.endswith(".conda"):
+        with libarchive.file_reader(path) as archive:
+            yield from archive
+        return
+    with ZipFile(path) as zf:
+        for name in zf.namelist():
+            if name.startswith(prefix) and name.endswith(".tar.zst"):
+                with zf.open(name) as fh, libarchive.stream_reader(fh) as archive:
+                    yield from archive
+
+
+def read_info(path):
+    """
+    The contents of the info/ members of the package at ``path``. The package is read
+    until the first member after info/ (conda packages store it first), and only the
+    info component of a .conda package is read at all.
+    """
+    info = {}
+    with closing(_components(path, "info-")) as entries:
+        for entry in entries:
+            name = normpath(entry.pathname)
+            if name.startswith("info/"):
+                if entry.isfile:
+                    info[name] = b"".join(entry.get_blocks())
+            elif info:
+                break
+    return info
+
+
+def list_members(path):
+    """The names of all the members of the package at ``path``, without reading their data."""
+    return [entry.pathname for entry in _components(path, "")]
+
+
 class TarCheck:
+    """
+    Consistency checks of a .tar.bz2 or .conda package, streamed with libarchive.
+
+    Checking index.json, the subdir and prefix lengths only reads info/ (see
+    :func:`read_info`), so it costs about the size of the metadata rather than a full
+    decompression. The names of all the members, needed by :meth:`info_files`, are
+    listed on first use, in :attr:`members`.
+    """
+
     def __init__(self, path, config):
-        self.t = tarfile.open(path)
-        self.paths = {m.path for m in self.t.getmembers()}
+        self.path = path
         self.dist = dist_fn(basename(path))
         self.name, self.version, self.build = self.dist.split("::", 1)[-1].rsplit(
             "-", 2
         )
         self.config = config
+        self._info = None
+        self._members = None
 
     def __enter__(self):
         return self
 
     def __exit__(self, e_type, e_value, traceback):
-        self.t.close()
-
-    def info_files(self):
-        lista = [
+        pass
+
+    @property
+    def info(self):
+        if self._info is None:
+            self._info = read_info(self.path)
+        return self._info
+
+    @property
+    def members(self):
+        """The member names in the order of the package, duplicates included."""
+        if self._members is None:
+            self._members = list_members(self.path)
+        return self._members
+
+    @property
+    def paths(self):
+        return {normpath(p) for p in self.members}
+
+    def _listed_files(self):
+        return [
             normpath(p.strip().decode("utf-8"))
-            for p in self.t.extractfile("info/files").readlines()
+            for p in self.info["info/files"].splitlines()
         ]
-        seta = set(lista)
-        if len(lista) != len(seta):
-            raise Exception("info/files: duplicates")
-
-        files_in_tar = [normpath(m.path) for m in self.t.getmembers()]
-        files_in_tar = filter_info_files(files_in_tar, "")
-        setb = set(files_in_tar)
-        if len(files_in_tar) != len(setb):
-            raise Exception("info_files: duplicate members")
-
-        if seta == setb:
-            return
-        for p in sorted(seta | setb):
-            if p not in seta:
-                print(f"{p!r} not in info/files")
-            if p not in setb:
-                print(f"{p!r} not in tarball")
-        raise Exception("info/files")
+
+    def _index(self):
+        return json.loads(self.info["info/index.json"].decode("utf-8"))
+
+    def info_files(self):
+        _check_info_files(self._listed_files(), self.members)
 
     def index_json(self):
-        info = json.loads(self.t.extractfile("info/index.json").read().decode("utf-8"))
-        for varname in "name", "version":
-            if info[varname] != getattr(self, varname):
-                raise Exception(
-                    f"{varname}: {info[varname]!r} != {getattr(self, varname)!r}"
-                )
-        assert isinstance(info["build_number"], int)
+        _check_index_json(self._index(), {"name": self.name, "version": self.version})
 
     def prefix_length(self):
         prefix_length = None
-        if "info/has_prefix" in self.t.getnames():
-            prefix_files = self.t.extractfile("info/has_prefix").readlines()
+        if "info/has_prefix" in self.info:
+            prefix_files = self.info["info/has_prefix"].splitlines()
             for line in prefix_files:
                 try:
                     prefix, file_type, _ = line.split()
@@ -83,22 +194,56 @@ class TarCheck:
         return prefix_length
 
     def correct_subdir(self):
-        info = json.loads(self.t.extractfile("info/index.json").read().decode("utf-8"))
-        assert info["subdir"] in [
-            self.config.host_subdir,
-            "noarch",
-            self.config.target_subdir,
-        ], "Inconsistent subdir in package - index.json expecting {}, got {}".format(
-            self.config.host_subdir, info["subdir"]
-        )
+        _check_subdir(self._index(), self.config)
+
+    def violations(self):
+        """All the inconsistencies found by the checks of :func:`check_all`."""
+        violations = []
+        for member in ("info/files", "info/index.json"):
+            if member not in self.info:
+                violations.append(f"{member}: missing")
+        if "info/files" in self.info:
+            violations.extend(
+                _info_files_violations(self._listed_files(), self.members)
+            )
+        if "info/index.json" in self.info:
+            info = self._index()
+            violations.extend(
+                _index_json_violations(
+                    info, {"name": self.name, "version": self.version}
+                )
+            )
+            violations.extend(_subdir_violations(info, self.config))
+        return violations
 
 
 def check_all(path, config):
-    x = TarCheck(path, config)
-    x.info_files()
-    x.index_json()
-    x.correct_subdir()
-    x.t.close()
+    violations = TarCheck(path, config).violations()
+    if violations:
+        raise Exception(
+            f"{basename(path)} is inconsistent:\n"
+            + "\n".join(f"  {violation}" for violation in violations)
+        )
+
+
+def check_members(path, members, info_dir, config):
+    """
+    Run the checks of :func:`check_all` for a package that was just written, using the
+    member names it was written with and the metadata in ``info_dir`` instead of
+    reading the package back.
+    """
+    name, version, _ = dist_fn(basename(path)).split("::", 1)[-1].rsplit("-", 2)
+    with open(join(info_dir, "files"), "rb") as fh:
+        listed = [normpath(p.strip().decode("utf-8")) for p in fh]
+    with open(join(info_dir, "index.json"), "rb") as fh:
+        info = json.loads(fh.read().decode("utf-8"))
+    _raise_violations(
+        [
+            *_info_files_violations(listed, members),
+            *_index_json_violations(info, {"name": name, "version": version}),
+            *_subdir_violations(info, config),
+        ]
+    )
 
 
 def check_prefix_lengths(files, config):
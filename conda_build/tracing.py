@@ -0,0 +1,268 @@
+# Copyright (C) 2014 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+"""
+Nested timing spans for the Python-side phases of a build.
+
+The ``stats`` dicts only cover the subprocesses conda-build runs (build, test and bundle
+scripts). Spans cover everything else as well (rendering, solving, environment creation,
+post-processing, packaging, ...) and nest, so that the time of each phase can be
+attributed to an output and variant.
+
+When ``--stats-file`` is given, the spans of a ``build_tree`` run are written next to it
+as a Chrome trace (``<stats-file>.trace.json``, loadable in ``chrome://tracing`` or
+Perfetto) and as OpenTelemetry-style JSON lines (``<stats-file>.spans.jsonl``).
+Otherwise the tracer is disabled: spans are neither timed nor kept, and the attributes
+of :func:`traced` functions are not computed.
+"""
+
+from __future__ import annotations
+
+import inspect
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+    from typing import Any
+
+# attributes copied from the enclosing span when a span does not set them itself
+INHERITED_ATTRIBUTES = ("output", "variant")
+
+
+def _io_counters() -> tuple[int, int]:
+    try:
+        import psutil
+
+        counters = psutil.Process().io_counters()
+    except (ImportError, AttributeError, OSError):
+        # not available on macOS or without psutil
+        return 0, 0
+    return counters.read_bytes, counters.write_bytes
+
+
+def _cpu_times() -> tuple[float, float]:
+    """CPU seconds of this process and of its reaped child processes."""
+    times = os.times()
+    return time.process_time(), times.children_user + times.children_system
+
+
+@dataclass
+class Span:
+    name: str
+    attributes: dict[str, Any] = field(default_factory=dict)
+    parent: Span | None = None
+    span_id: str = field(default_factory=lambda: secrets.token_hex(8))
+    thread_id: int = field(default_factory=threading.get_ident)
+    start: float = 0.0
+    end: float = 0.0
+    cpu: float = 0.0
+    children_cpu: float = 0.0
+    bytes_read: int = 0
+    bytes_written: int = 0
+
+    def set(self, **attributes) -> None:
+        """Record attributes such as the number of ``files`` a phase touched."""
+        self.attributes.update(attributes)
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    def resolved_attributes(self) -> dict[str, Any]:
+        attributes = {}
+        parent = self.parent
+        while parent is not None:
+            for key in INHERITED_ATTRIBUTES:
+                if key in parent.attributes:
+                    attributes.setdefault(key, parent.attributes[key])
+            parent = parent.parent
+        attributes.update(self.attributes)
+        return attributes
+
+
+class Tracer:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.spans: list[Span] = []
+        self.trace_id = secrets.token_hex(16)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def reset(self, enabled: bool = False) -> None:
+        """Drop the spans recorded so far and start a new trace, if ``enabled``."""
+        with self._lock:
+            self.enabled = enabled
+            self.spans = []
+            self.trace_id = secrets.token_hex(16)
+
+    def current(self) -> Span | None:
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        if not self.enabled:
+            # not timed, nor kept
+            yield Span(name, attributes)
+            return
+        stack = self._local.__dict__.setdefault("stack", [])
+        span = Span(name, attributes, parent=stack[-1] if stack else None)
+        stack.append(span)
+        cpu, children_cpu = _cpu_times()
+        read, written = _io_counters()
+        span.start = time.time()
+        try:
+            yield span
+        finally:
+            span.end = time.time()
+            end_cpu, end_children_cpu = _cpu_times()
+            end_read, end_written = _io_counters()
+            span.cpu = end_cpu - cpu
+            span.children_cpu = end_children_cpu - children_cpu
+            span.bytes_read = end_read - read
+            span.bytes_written = end_written - written
+            stack.pop()
+            with self._lock:
+                self.spans.append(span)
+
+    def chrome_trace(self) -> dict[str, Any]:
+        """The spans in the Chrome trace event format ("complete" events)."""
+        pid = os.getpid()
+        return {
+            "traceEvents": [
+                {
+                    "name": span.name,
+                    "cat": "conda-build",
+                    "ph": "X",
+                    "ts": span.start * 1e6,
+                    "dur": span.duration * 1e6,
+                    "pid": pid,
+                    "tid": span.thread_id,
+                    "args": {
+                        **span.resolved_attributes(),
+                        "cpu": span.cpu,
+                        "children_cpu": span.children_cpu,
+                        "bytes_read": span.bytes_read,
+                        "bytes_written": span.bytes_written,
+                    },
+                }
+                for span in sorted(self.spans, key=lambda span: span.start)
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def otel_spans(self) -> Iterator[dict[str, Any]]:
+        """The spans as dicts following the OpenTelemetry span data model."""
+        for span in sorted(self.spans, key=lambda span: span.start):
+            yield {
+                "trace_id": self.trace_id,
+                "span_id": span.span_id,
+                "parent_span_id": span.parent.span_id if span.parent else None,
+                "name": span.name,
+                "start_time_unix_nano": int(span.start * 1e9),
+                "end_time_unix_nano": int(span.end * 1e9),
+                "attributes": {
+                    **span.resolved_attributes(),
+                    "process.cpu.time": span.cpu,
+                    "process.children.cpu.time": span.children_cpu,
+                    "process.io.read_bytes": span.bytes_read,
+                    "process.io.write_bytes": span.bytes_written,
+                    "thread.id": span.thread_id,
+                },
+            }
+
+    def write(self, stats_file: str | os.PathLike) -> tuple[str, str]:
+        """Write the Chrome trace and the JSON lines next to ``stats_file``."""
+        root = os.path.splitext(stats_file)[0]
+        chrome_path = f"{root}.trace.json"
+        jsonl_path = f"{root}.spans.jsonl"
+        with open(chrome_path, "w") as f:
+            json.dump(self.chrome_trace(), f, default=str)
+        with open(jsonl_path, "w") as f:
+            for span in self.otel_spans():
+                f.write(json.dumps(span, default=str) + "\n")
+        return chrome_path, jsonl_path
+
+
+#: the tracer used by conda-build itself
+tracer = Tracer()
+
+
+def span(name: str, **attributes):
+    """Context manager timing ``name`` as a child of the current span."""
+    return tracer.span(name, **attributes)
+
+
+def set_attributes(**attributes) -> None:
+    """Add attributes (e.g. the number of ``files`` handled) to the current span."""
+    current = tracer.current()
+    if current is not None:
+        current.set(**attributes)
+
+
+def traced(
+    name: str, attributes: Callable[[dict[str, Any]], dict[str, Any]] | None = None
+) -> Callable:
+    """
+    Decorator running the function in a span called ``name``. ``attributes``, if given,
+    is called with the function's bound arguments (a name to value mapping, defaults
+    applied) and returns the span's attributes.
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            span_attributes = {}
+            if attributes:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                span_attributes = attributes(bound.arguments)
+            with tracer.span(name, **span_attributes):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def metadata_attributes(metadata) -> dict[str, Any]:
+    """Span attributes identifying the output and variant ``metadata`` describes."""
+    try:
+        return {
+            "output": metadata.name(),
+            "variant": {
+                key: metadata.config.variant.get(key)
+                for key in sorted(metadata.get_used_loop_vars())
+            },
+        }
+    except (Exception, SystemExit):
+        # never fail a build because of tracing; e.g. a path instead of metadata, or
+        # metadata that cannot be rendered yet (MetaData.name() exits then)
+        return {}
+
+
+def argument_attributes(
+    metadata: str | None = None, **names: str
+) -> Callable[[dict[str, Any]], dict[str, Any]]:
+    """
+    Build a :func:`traced` ``attributes`` callable: the output and variant of the
+    ``metadata`` argument, plus ``attribute=argument`` pairs given as ``names``.
+    """
+
+    def attributes(arguments: dict[str, Any]) -> dict[str, Any]:
+        result = metadata_attributes(arguments[metadata]) if metadata else {}
+        result.update((key, arguments[arg]) for key, arg in names.items())
+        return result
+
+    return attributes
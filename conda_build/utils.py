@@ -2,7 +2,9 @@
 # SPDX-License-Identifier: BSD-3-Clause
 from __future__ import annotations
 
+import codecs
 import contextlib
+import errno
 import fnmatch
 import hashlib
 import json
@@ -21,8 +23,9 @@ import tempfile
 import time
 import urllib.parse as urlparse
 import urllib.request as urllib
-from collections import OrderedDict, defaultdict
+from collections import defaultdict, deque
 from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
 from functools import cache, partial
 from glob import glob
 from io import StringIO
@@ -43,8 +46,8 @@ from os.path import (
     join,
 )
 from pathlib import Path
-from threading import Thread
-from typing import TYPE_CHECKING, overload
+from threading import Event, Thread
+from typing import TYPE_CHECKING, NamedTuple, overload
 
 import conda_package_handling.api
 import filelock
@@ -58,9 +61,13 @@ from conda.base.constants import (
 from conda.base.context import context
 from conda.common.path import unix_path_to_win, win_path_to_unix
 from conda.exceptions import CondaHTTPError
-from conda.gateways.connection.download import download
+from conda.gateways.connection.download import (
+    disable_ssl_verify_warning,
+    download,
+    download_http_errors,
+)
+from conda.gateways.connection.session import get_session
 from conda.gateways.disk.create import TemporaryDirectory
-from conda.gateways.disk.read import compute_sum
 from conda.models.channel import Channel
 from conda.models.match_spec import MatchSpec
 from conda.models.records import PackageRecord
@@ -189,6 +196,29 @@ class DummyPsutilProcess:
         return []
 
 
+# bytes of build output the rewriter reads at once, and the pipe size it asks for
+REWRITE_CHUNK_SIZE = 1 << 16
+REWRITE_PIPE_SIZE = 1 << 20
+
+
+def _compile_rewrite_pattern(env):
+    """Compile the values of ``env`` into a single regex with a bytes replacement map.
+
+    Longer values come first in the alternation so that they win over common prefixes.
+    """
+    if on_win:
+        replacement_t = "%{}%"
+    else:
+        replacement_t = "${}"
+    replacements = {
+        value.encode("utf-8"): replacement_t.format(key).encode("utf-8")
+        for key, value in sorted(env.items(), key=lambda kv: len(kv[1]), reverse=True)
+        if value
+    }
+    pattern = re.compile(b"|".join(re.escape(value) for value in replacements))
+    return pattern, replacements
+
+
 def _setup_rewrite_pipe(env):
     """Rewrite values of env variables back to $ENV in stdout
 
@@ -197,40 +227,50 @@ def _setup_rewrite_pipe(env):
 
     Useful for replacing "~/conda/conda-bld/pkg_<date>/_h_place..." with "$PREFIX"
 
+    The output is read in chunks of bytes and rewritten with one regex substitution
+    per chunk, flushing complete lines only so that values are never split.
+
     Returns an FD to be passed to Popen(stdout=...)
     """
-    # replacements is the env dict reversed,
-    # ordered by the length of the value so that longer replacements
-    # always occur first in case of common prefixes
-    replacements = OrderedDict()
-    for k, v in sorted(env.items(), key=lambda kv: len(kv[1]), reverse=True):
-        replacements[v] = k
+    pattern, replacements = _compile_rewrite_pattern(env)
+    # a value could straddle two reads; hold back at most this many unterminated bytes
+    overlap = max(map(len, replacements), default=1) - 1
 
     r_fd, w_fd = os.pipe()
-    r = os.fdopen(r_fd, "rt")
-    if on_win:
-        replacement_t = "%{}%"
-    else:
-        replacement_t = "${}"
+    if on_linux:
+        import fcntl
+
+        try:
+            # a larger pipe keeps chatty builds from blocking on a busy rewriter
+            fcntl.fcntl(w_fd, fcntl.F_SETPIPE_SZ, REWRITE_PIPE_SIZE)
+        except (AttributeError, OSError):
+            pass
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def rewrite(data):
+        if replacements:
+            data = pattern.sub(lambda match: replacements[match.group()], data)
+        sys.stdout.write(decoder.decode(data))
 
     def rewriter():
+        pending = b""
         while True:
-            try:
-                line = r.readline()
-                if not line:
-                    # reading done
-                    r.close()
-                    os.close(w_fd)
-                    return
-                for s, key in replacements.items():
-                    line = line.replace(s, replacement_t.format(key))
-                sys.stdout.write(line)
-            except UnicodeDecodeError:
-                try:
-                    txt = os.read(r, 10000)
-                    sys.stdout.write(txt or "")
-                except TypeError:
-                    pass
+            chunk = os.read(r_fd, REWRITE_CHUNK_SIZE)
+            if not chunk:
+                # reading done
+                rewrite(pending)
+                sys.stdout.write(decoder.decode(b"", final=True))
+                os.close(r_fd)
+                os.close(w_fd)
+                return
+            pending += chunk
+            end = pending.rfind(b"\n") + 1
+            if not end and len(pending) > REWRITE_PIPE_SIZE:
+                # no line break in sight, flush what cannot be part of a split value
+                end = len(pending) - overlap
+            if end:
+                rewrite(pending[:end])
+                pending = pending[end:]
 
     t = Thread(target=rewriter)
     t.daemon = True
@@ -239,32 +279,39 @@ def _setup_rewrite_pipe(env):
     return w_fd
 
 
-class PopenWrapper:
-    # Small wrapper around subprocess.Popen to allow memory usage monitoring
-    # copied from ProtoCI, https://github.com/ContinuumIO/ProtoCI/blob/59159bc2c9f991fbfa5e398b6bb066d7417583ec/protoci/build2.py#L20  # NOQA
+class ResourceMonitor:
+    """
+    Track the memory and CPU usage of every process spawned by this process from a
+    single background thread, sampling every ``interval`` seconds.
 
-    def __init__(self, *args, **kwargs):
-        self.elapsed = None
+    The size of ``disk_usage_dir`` is measured when monitoring starts and stops and, only
+    if ``disk_interval`` is set, every ``disk_interval`` seconds in between. Measuring it
+    walks the whole directory, which competes with the build for I/O on large work dirs.
+    """
+
+    def __init__(self, disk_usage_dir, interval=2, disk_interval=None):
+        self.disk_usage_dir = disk_usage_dir
+        self.interval = interval
+        self.disk_interval = disk_interval
         self.rss = 0
         self.vms = 0
-        self.returncode = None
         self.disk = 0
         self.processes = 1
+        self.cpu_user = 0
+        self.cpu_sys = 0
+        self._cpu_usage = defaultdict(dict)
+        self._stopped = Event()
+        self._thread = None
 
-        self.out, self.err = self._execute(*args, **kwargs)
-
-    def _execute(self, *args, **kwargs):
         try:
             import psutil
 
-            psutil_exceptions = (
-                psutil.NoSuchProcess,
-                psutil.AccessDenied,
-                psutil.NoSuchProcess,
-            )
+            self._psutil_exceptions = (psutil.NoSuchProcess, psutil.AccessDenied)
+            # Create a process of this (the parent) process
+            self._parent = psutil.Process(os.getpid())
         except ImportError as e:
-            psutil = None
-            psutil_exceptions = (OSError, ValueError)
+            self._psutil_exceptions = (OSError, ValueError)
+            self._parent = DummyPsutilProcess()
             log = get_logger(__name__)
             log.warning(f"psutil import failed.  Error was {e}")
             log.warning(
@@ -272,71 +319,116 @@ class PopenWrapper:
                 "get CPU time and memory usage statistics."
             )
 
-        # The polling interval (in seconds)
-        time_int = kwargs.pop("time_int", 2)
+    def start(self):
+        self._sample_disk()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
 
-        disk_usage_dir = kwargs.get("cwd", sys.prefix)
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+        self._sample_processes()
+        self._sample_disk()
 
-        # Create a process of this (the parent) process
-        parent = psutil.Process(os.getpid()) if psutil else DummyPsutilProcess()
+    def _run(self):
+        last_disk_sample = time.monotonic()
+        while True:
+            self._sample_processes()
+            if (
+                self.disk_interval
+                and time.monotonic() - last_disk_sample >= self.disk_interval
+            ):
+                self._sample_disk()
+                last_disk_sample = time.monotonic()
+            if self._stopped.wait(self.interval):
+                break
 
-        cpu_usage = defaultdict(dict)
+    def _sample_disk(self):
+        self.disk = max(directory_size(self.disk_usage_dir), self.disk)
+
+    def _sample_processes(self):
+        # We need to get all of the children of our process since our
+        # process spawns other processes.  Collect all of the child
+        # processes
+        rss = 0
+        vms = 0
+        processes = 0
+        # We use the parent process to get mem usage of all spawned processes
+        for child in self._parent.children(recursive=True):
+            child_cpu_usage = self._cpu_usage[child.pid]
+            try:
+                mem = child.memory_info()
+                rss += mem.rss
+                vms += mem.rss
+                # listing child times are only available on linux, so we don't use them.
+                #    we are instead looping over children and getting each individually.
+                #    https://psutil.readthedocs.io/en/latest/#psutil.Process.cpu_times
+                cpu_stats = child.cpu_times()
+                child_cpu_usage["sys"] = cpu_stats.system
+                child_cpu_usage["user"] = cpu_stats.user
+            except self._psutil_exceptions:
+                # process already died.  Just ignore it.
+                continue
+            processes += 1
 
-        # Using the convenience Popen class provided by psutil
-        start_time = time.time()
-        _popen = (
-            psutil.Popen(*args, **kwargs)
-            if psutil
-            else subprocess.Popen(*args, **kwargs)
+        # Sum the memory usage of all the children together (2D columnwise sum)
+        self.rss = max(rss, self.rss)
+        self.vms = max(vms, self.vms)
+        self.cpu_sys = sum(
+            child.get("sys", 0) for child in list(self._cpu_usage.values())
         )
-        try:
-            while self.returncode is None:
-                # We need to get all of the children of our process since our
-                # process spawns other processes.  Collect all of the child
-                # processes
-
-                rss = 0
-                vms = 0
-                processes = 0
-                # We use the parent process to get mem usage of all spawned processes
-                for child in parent.children(recursive=True):
-                    child_cpu_usage = cpu_usage.get(child.pid, {})
-                    try:
-                        mem = child.memory_info()
-                        rss += mem.rss
-                        vms += mem.rss
-                        # listing child times are only available on linux, so we don't use them.
-                        #    we are instead looping over children and getting each individually.
-                        #    https://psutil.readthedocs.io/en/latest/#psutil.Process.cpu_times
-                        cpu_stats = child.cpu_times()
-                        child_cpu_usage["sys"] = cpu_stats.system
-                        child_cpu_usage["user"] = cpu_stats.user
-                        cpu_usage[child.pid] = child_cpu_usage
-                    except psutil_exceptions:
-                        # process already died.  Just ignore it.
-                        continue
-                    processes += 1
+        self.cpu_user = sum(
+            child.get("user", 0) for child in list(self._cpu_usage.values())
+        )
+        self.processes = max(processes, self.processes)
 
-                # Sum the memory usage of all the children together (2D columnwise sum)
-                self.rss = max(rss, self.rss)
-                self.vms = max(vms, self.vms)
-                self.cpu_sys = sum(child["sys"] for child in cpu_usage.values())
-                self.cpu_user = sum(child["user"] for child in cpu_usage.values())
-                self.processes = max(processes, self.processes)
 
-                # Get disk usage
-                self.disk = max(directory_size(disk_usage_dir), self.disk)
+class PopenWrapper:
+    # Small wrapper around subprocess.Popen to allow memory usage monitoring
+    # copied from ProtoCI, https://github.com/ContinuumIO/ProtoCI/blob/59159bc2c9f991fbfa5e398b6bb066d7417583ec/protoci/build2.py#L20  # NOQA
 
-                time.sleep(time_int)
-                self.elapsed = time.time() - start_time
-                self.returncode = _popen.poll()
+    def __init__(self, *args, **kwargs):
+        self.elapsed = None
+        self.rss = 0
+        self.vms = 0
+        self.returncode = None
+        self.disk = 0
+        self.processes = 1
+        self.cpu_user = 0
+        self.cpu_sys = 0
+
+        self.out, self.err = self._execute(*args, **kwargs)
+
+    def _execute(self, *args, **kwargs):
+        # The polling intervals (in seconds)
+        time_int = kwargs.pop("time_int", 2)
+        disk_time_int = kwargs.pop("disk_time_int", None)
 
+        monitor = ResourceMonitor(
+            kwargs.get("cwd", sys.prefix),
+            interval=time_int,
+            disk_interval=disk_time_int,
+        )
+
+        start_time = time.time()
+        _popen = subprocess.Popen(*args, **kwargs)
+        monitor.start()
+        try:
+            self.returncode = _popen.wait()
         except KeyboardInterrupt:
             _popen.kill()
             raise
-
-        self.disk = max(directory_size(disk_usage_dir), self.disk)
-        self.elapsed = time.time() - start_time
+        finally:
+            monitor.stop()
+            self.elapsed = time.time() - start_time
+
+        self.rss = monitor.rss
+        self.vms = monitor.vms
+        self.disk = monitor.disk
+        self.processes = monitor.processes
+        self.cpu_user = monitor.cpu_user
+        self.cpu_sys = monitor.cpu_sys
         return _popen.stdout, _popen.stderr
 
     def __repr__(self):
@@ -374,6 +466,9 @@ def _func_defaulting_env_to_os_environ(func, *popenargs, **kwargs):
     stats = kwargs.get("stats")
     if "stats" in kwargs:
         del kwargs["stats"]
+    monitor_kwargs = {
+        key: kwargs.pop(key) for key in ("time_int", "disk_time_int") if key in kwargs
+    }
 
     rewrite_stdout_env = kwargs.pop("rewrite_stdout_env", None)
     if rewrite_stdout_env:
@@ -381,7 +476,7 @@ def _func_defaulting_env_to_os_environ(func, *popenargs, **kwargs):
 
     out = None
     if stats is not None:
-        proc = PopenWrapper(_args, **kwargs)
+        proc = PopenWrapper(_args, **kwargs, **monitor_kwargs)
         if func == "output":
             out = proc.out.read()
 
@@ -639,6 +734,30 @@ def move_with_fallback(src, dst):
             )
 
 
+def replace_file(src: str | os.PathLike, dst: str | os.PathLike) -> None:
+    """
+    Move the file ``src`` to ``dst``, atomically replacing any existing ``dst``.
+    Across filesystems, ``src`` is copied next to ``dst`` first and then renamed.
+    """
+    try:
+        os.replace(src, dst)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    fd, tmp = tempfile.mkstemp(
+        prefix=f".{os.path.basename(dst)}.", dir=os.path.dirname(dst)
+    )
+    os.close(fd)
+    try:
+        shutil.copy2(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    os.unlink(src)
+
+
 # http://stackoverflow.com/a/22331852/1170370
 def copytree(src, dst, symlinks=False, ignore=None, dry_run=False):
     if not os.path.exists(dst):
@@ -866,7 +985,43 @@ def tar_xf_getnames(tarball):
     return result
 
 
-def tar_xf(tarball, dir_path):
+# tarball extensions whose decompression can be done by a multi-threaded external tool
+PARALLEL_DECOMPRESSORS = {
+    "xz": (".tar.xz", ".txz"),
+    "zstd": (".tar.zst", ".tzst"),
+}
+
+
+def _parallel_decompressor(tarball):
+    if on_win:
+        return None
+    for tool, exts in PARALLEL_DECOMPRESSORS.items():
+        if tarball.lower().endswith(exts):
+            return shutil.which(tool)
+    return None
+
+
+def _extract_piped(decompressor, tarball, flags, threads=0):
+    """
+    Decompress ``tarball`` with ``decompressor`` using ``threads`` worker threads (0
+    means one per core) and let libarchive unpack the resulting stream concurrently.
+    Returns False if the external tool failed, so the caller can fall back to libarchive
+    decompressing the file on its own.
+    """
+    with subprocess.Popen(
+        [decompressor, f"-T{threads}", "-d", "-c", tarball],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    ) as proc:
+        try:
+            libarchive.extract_fd(proc.stdout.fileno(), flags)
+        except libarchive.exception.ArchiveError:
+            proc.kill()
+            return False
+    return proc.returncode == 0
+
+
+def tar_xf(tarball, dir_path, threads=0):
     flags = (
         libarchive.extract.EXTRACT_TIME
         | libarchive.extract.EXTRACT_PERM
@@ -878,7 +1033,11 @@ def tar_xf(tarball, dir_path):
         tarball = os.path.join(os.getcwd(), tarball)
     try:
         with tmp_chdir(os.path.realpath(dir_path)):
-            libarchive.extract_file(tarball, flags)
+            decompressor = _parallel_decompressor(tarball)
+            if not decompressor or not _extract_piped(
+                decompressor, tarball, flags, threads
+            ):
+                libarchive.extract_file(tarball, flags)
     except libarchive.exception.ArchiveError:
         # try again, maybe we are on Windows and the archive contains symlinks
         # https://github.com/conda/conda-build/issues/3351
@@ -892,10 +1051,11 @@ def tar_xf(tarball, dir_path):
 
 
 def file_info(path):
+    sums = compute_sums(path, ("md5", "sha256"))
     return {
         "size": getsize(path),
-        "md5": compute_sum(path, "md5"),
-        "sha256": compute_sum(path, "sha256"),
+        "md5": sums["md5"],
+        "sha256": sums["sha256"],
         "mtime": getmtime(path),
     }
 
@@ -1626,6 +1786,7 @@ def rm_rf(path: str | os.PathLike) -> None:
 
     rm_rf(str(path))
     delete_prefix_from_linked_data(str(path))
+    forget_prefix_snapshots(path)
 
 
 # https://stackoverflow.com/a/31459386/1170370
@@ -1806,6 +1967,160 @@ def prefix_files(prefix: str | os.PathLike | Path) -> set[str]:
     return prefix_files
 
 
+class FileStat(NamedTuple):
+    inode: int
+    size: int
+    mtime: int
+
+
+class _ScannedDirectory(NamedTuple):
+    inode: int
+    mtime: int
+    # modified too shortly before the scan for its mtime to reveal later changes
+    racy: bool
+    # prefix-relative paths of the files and symlinks (to directories as well) in it
+    files: dict[str, FileStat]
+    directories: tuple[str, ...]
+
+
+#: the coarsest timestamp granularity of the filesystems we care about (FAT)
+_MTIME_GRANULARITY_NS = 2_000_000_000
+
+
+class PrefixSnapshot:
+    """
+    The files of ``prefix`` (as :func:`prefix_files` lists them) with their inode, size
+    and mtime.
+
+    :meth:`refresh` takes a new snapshot that only lists again the directories whose
+    inode or mtime changed, and stats nothing but directories otherwise. Creating,
+    deleting or renaming a file updates the mtime of its directory, so this catches
+    every change to the list of files. Content changed in place is not noticed.
+    """
+
+    def __init__(
+        self,
+        prefix: str | os.PathLike | Path,
+        _previous: dict[str, _ScannedDirectory] | None = None,
+    ):
+        self.prefix = os.path.abspath(prefix)
+        self._directories: dict[str, _ScannedDirectory] = {}
+        self._files: frozenset[str] | None = None
+        previous = _previous or {}
+        pending = [""]
+        while pending:
+            relroot = pending.pop()
+            path = join(self.prefix, relroot)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            scanned = previous.get(relroot)
+            if (
+                scanned is None
+                or scanned.racy
+                or (scanned.inode, scanned.mtime) != (st.st_ino, st.st_mtime_ns)
+            ):
+                scanned = self._scan(path, relroot, st)
+            self._directories[relroot] = scanned
+            pending.extend(join(relroot, name) for name in scanned.directories)
+
+    @staticmethod
+    def _scan(path: str, relroot: str, st: os.stat_result) -> _ScannedDirectory:
+        start = time.time_ns()
+        files = {}
+        directories = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            directories.append(entry.name)
+                        else:
+                            entry_st = entry.stat(follow_symlinks=False)
+                            files[join(relroot, entry.name)] = FileStat(
+                                entry_st.st_ino, entry_st.st_size, entry_st.st_mtime_ns
+                            )
+                    except FileNotFoundError:
+                        # deleted while listing
+                        continue
+        except OSError:
+            # like os.walk, skip directories that cannot be listed
+            pass
+        return _ScannedDirectory(
+            st.st_ino,
+            st.st_mtime_ns,
+            st.st_mtime_ns + _MTIME_GRANULARITY_NS > start,
+            files,
+            tuple(directories),
+        )
+
+    def refresh(self) -> PrefixSnapshot:
+        """A new snapshot of the prefix, reusing the unchanged parts of this one."""
+        return PrefixSnapshot(self.prefix, self._directories)
+
+    @property
+    def files(self) -> set[str]:
+        """The prefix-relative paths of all files (a new set on every access)."""
+        if self._files is None:
+            self._files = frozenset().union(
+                *(scanned.files.keys() for scanned in self._directories.values())
+            )
+        return set(self._files)
+
+    @property
+    def stats(self) -> dict[str, FileStat]:
+        stats = {}
+        for scanned in self._directories.values():
+            stats.update(scanned.files)
+        return stats
+
+    def diff(self, earlier: PrefixSnapshot) -> tuple[set[str], set[str], set[str]]:
+        """
+        The files added since ``earlier``, removed since ``earlier`` and, among the
+        others, those replaced or changed in a directory that had to be listed again.
+        """
+        stats, earlier_stats = self.stats, earlier.stats
+        added = stats.keys() - earlier_stats.keys()
+        removed = earlier_stats.keys() - stats.keys()
+        changed = {
+            path
+            for path in stats.keys() & earlier_stats.keys()
+            if stats[path] != earlier_stats[path]
+        }
+        return added, removed, changed
+
+
+_prefix_snapshots: dict[str, PrefixSnapshot] = {}
+
+
+def prefix_snapshot(prefix: str | os.PathLike | Path) -> PrefixSnapshot:
+    """
+    A :class:`PrefixSnapshot` of ``prefix``, refreshed from the last one taken with this
+    function. Prefer ``prefix_snapshot(prefix).files`` over :func:`prefix_files` for
+    prefixes listed repeatedly, like the host prefix during a build.
+    """
+    prefix = os.path.abspath(prefix)
+    previous = _prefix_snapshots.get(prefix)
+    snapshot = previous.refresh() if previous else PrefixSnapshot(prefix)
+    _prefix_snapshots[prefix] = snapshot
+    return snapshot
+
+
+def forget_prefix_snapshots(path: str | os.PathLike | Path | None = None) -> None:
+    """
+    Drop the snapshots :func:`prefix_snapshot` keeps of ``path`` and of the prefixes
+    inside it, or of all prefixes if ``path`` is None, e.g. at the start of a build.
+    """
+    if path is None:
+        _prefix_snapshots.clear()
+        return
+    path = os.path.abspath(path)
+    for prefix in list(_prefix_snapshots):
+        if prefix == path or prefix.startswith(path + os.sep):
+            del _prefix_snapshots[prefix]
+
+
 def mmap_mmap(
     fileno,
     length,
@@ -1838,6 +2153,52 @@ def mmap_mmap(
             return mmap.mmap(fileno, length, flags=flags, prot=prot)
 
 
+# (device, inode, size, mtime) -> whether the file is binary, see is_binary_file()
+_binary_file_cache: dict[tuple[int, int, int, int], bool] = {}
+
+
+def reset_binary_file_cache():
+    """Forget the text/binary classification of files, e.g. at the start of a build."""
+    _binary_file_cache.clear()
+
+
+def is_binary_file(path: str | os.PathLike, head_size: int = 8192) -> bool:
+    """
+    Whether the file at ``path`` is binary, i.e. contains a NUL byte anywhere.
+
+    This is the classification used for prefix replacement, so it has to look at the
+    whole file for text files. Binaries (executables, libraries, archives, ...) have a
+    NUL byte in their headers and are recognized from the first ``head_size`` bytes
+    alone; only files without one there are searched further, with a memory map.
+
+    Results are cached per (device, inode, size, mtime), so the different packaging steps
+    asking about the same file only read it once.
+    """
+    st = os.stat(path)
+    key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+    if key in _binary_file_cache:
+        return _binary_file_cache[key]
+
+    with open(path, "rb") as fh:
+        head = fh.read(head_size)
+        if b"\x00" in head:
+            binary = True
+        elif len(head) < head_size:
+            binary = False
+        else:
+            try:
+                with mmap_mmap(
+                    fh.fileno(), 0, tagname=None, flags=mmap_MAP_PRIVATE
+                ) as mm:
+                    binary = mm.find(b"\x00", head_size) != -1
+            except (OSError, ValueError):
+                binary = any(
+                    b"\x00" in chunk for chunk in iter(partial(fh.read, 1 << 20), b"")
+                )
+    _binary_file_cache[key] = binary
+    return binary
+
+
 def remove_pycache_from_scripts(build_prefix):
     """Remove pip created pycache directory from bin or Scripts."""
     if on_win:
@@ -2011,6 +2372,69 @@ def expand_reqs(reqs_entry):
     return reqs_entry
 
 
+class MultiHasher:
+    """Feed the same stream of bytes to several ``hashlib`` algorithms at once."""
+
+    def __init__(self, algorithms: Iterable[str]):
+        self.hashers = {algorithm: hashlib.new(algorithm) for algorithm in algorithms}
+
+    def update(self, data: bytes) -> None:
+        for hasher in self.hashers.values():
+            hasher.update(data)
+
+    def hexdigests(self) -> dict[str, str]:
+        return {
+            algorithm: hasher.hexdigest() for algorithm, hasher in self.hashers.items()
+        }
+
+
+def compute_sums(
+    path: str | os.PathLike, algorithms: Iterable[str], buffersize: int = 1 << 18
+) -> dict[str, str]:
+    """Compute the hexdigest of ``path`` for every algorithm in a single read."""
+    hasher = MultiHasher(algorithms)
+    with open(path, "rb") as fh:
+        for chunk in iter(partial(fh.read, buffersize), b""):
+            hasher.update(chunk)
+    return hasher.hexdigests()
+
+
+def download_with_sums(
+    url: str, target_path: str | os.PathLike, algorithms: Iterable[str]
+) -> dict[str, str]:
+    """
+    Download ``url`` to ``target_path`` and return the hexdigests of the downloaded
+    bytes for every algorithm in ``algorithms``.
+
+    The digests are updated while the response is streamed to disk, so the file never
+    has to be read back. The data is written to a ``.partial`` file next to
+    ``target_path`` which is only renamed once the download is complete.
+    """
+    if not context.ssl_verify:
+        disable_ssl_verify_warning()
+    hasher = MultiHasher(algorithms)
+    partial_path = f"{target_path}.partial"
+    try:
+        with download_http_errors(url):
+            timeout = (
+                context.remote_connect_timeout_secs,
+                context.remote_read_timeout_secs,
+            )
+            session = get_session(url)
+            resp = session.get(
+                url, stream=True, proxies=session.proxies, timeout=timeout
+            )
+            resp.raise_for_status()
+            with open(partial_path, "wb") as fh:
+                for chunk in resp.iter_content(chunk_size=1 << 18):
+                    fh.write(chunk)
+                    hasher.update(chunk)
+        os.replace(partial_path, target_path)
+    finally:
+        rm_rf(partial_path)
+    return hasher.hexdigests()
+
+
 def sha256_checksum(filename, buffersize=65536):
     is_link = islink(filename)
     is_file = isfile(filename)
@@ -2027,6 +2451,131 @@ def sha256_checksum(filename, buffersize=65536):
     return sha256.hexdigest()
 
 
+class _SkipRules:
+    """
+    ``content_hash_skip`` entries compiled into a prefix trie over path components.
+
+    Entries ending with a slash skip a directory and everything below it, other entries
+    only skip the exact relative path they name.
+    """
+
+    _LEAF = object()
+
+    def __init__(self, skip: Iterable[str] = ()):
+        self.exact = set()
+        self.trie = {}
+        for item in skip:
+            if item.endswith("/"):
+                node = self.trie
+                for part in item[:-1].split("/"):
+                    node = node.setdefault(part, {})
+                node[self._LEAF] = True
+            else:
+                self.exact.add(item)
+
+    def skips_tree(self, relpath: str) -> bool:
+        """Whether ``relpath`` lies in (or is) a skipped directory."""
+        node = self.trie
+        for part in relpath.split("/"):
+            node = node.get(part)
+            if node is None:
+                return False
+            if self._LEAF in node:
+                return True
+        return False
+
+    def skips(self, relpath: str) -> bool:
+        return relpath in self.exact or self.skips_tree(relpath)
+
+
+# files up to this size are read and normalized by worker threads ahead of hashing,
+# larger ones are streamed by the hashing thread itself to bound memory use
+_CONTENT_HASH_PREFETCH_SIZE = 4 * 1024 * 1024
+# at most this many bytes of files are read ahead of hashing at any time
+_CONTENT_HASH_PREFETCH_WINDOW = 64 * 1024 * 1024
+_CONTENT_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _normalize_newlines(text: str) -> str:
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _content_hash_file_bytes(path: str, encoding: str) -> bytes:
+    """
+    The bytes a file contributes to the content hash: its line-ending normalized text
+    re-encoded as UTF-8 if it decodes as text, its raw bytes otherwise.
+    """
+    with open(path, "rb") as fh:
+        data = fh.read()
+    try:
+        text = data.decode(encoding)
+    except UnicodeDecodeError:
+        return data
+    return _normalize_newlines(text).encode("utf-8")
+
+
+def _update_content_hash_streaming(hasher, path: str, encoding: str):
+    """
+    Stream a large file into ``hasher``, feeding a text and a binary candidate in a
+    single read and returning whichever applies once the whole file has been seen.
+    """
+    text_hasher = hasher.copy()
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending_cr = False
+    is_text = True
+    with open(path, "rb") as fh:
+        for chunk in iter(partial(fh.read, _CONTENT_HASH_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+            if not is_text:
+                continue
+            try:
+                text = decoder.decode(chunk)
+            except UnicodeDecodeError:
+                is_text = False
+                continue
+            if pending_cr:
+                text = "\r" + text
+            # a trailing \r might be the first half of a \r\n split across chunks
+            pending_cr = text.endswith("\r")
+            if pending_cr:
+                text = text[:-1]
+            text_hasher.update(_normalize_newlines(text).encode("utf-8"))
+    if is_text:
+        try:
+            text = decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            return hasher
+        text_hasher.update(
+            _normalize_newlines(("\r" if pending_cr else "") + text).encode("utf-8")
+        )
+        return text_hasher
+    return hasher
+
+
+def _content_hash_entries(directory: str, skip: _SkipRules):
+    """
+    Yield ``(relpath, path, entry)`` for everything below ``directory`` (not following
+    symlinks), sorted by path. Directories skipped by a trailing-slash rule are pruned.
+    """
+    entries = []
+    stack = [("", directory)]
+    while stack:
+        relroot, root = stack.pop()
+        with os.scandir(root) as it:
+            for entry in it:
+                relpath = os.path.join(relroot, entry.name) if relroot else entry.name
+                entries.append((relpath, entry))
+                if entry.is_dir(follow_symlinks=False) and not skip.skips_tree(
+                    relpath.replace("\\", "/")
+                ):
+                    stack.append((relpath, entry.path))
+    entries.sort(key=lambda item: item[0])
+    for relpath, entry in entries:
+        relpathstr = relpath.replace("\\", "/")
+        if not skip.skips(relpathstr):
+            yield relpath, relpathstr, entry
+
+
 def compute_content_hash(
     directory: str | Path, algorithm="sha256", skip: Iterable[str] = ()
 ) -> str:
@@ -2049,6 +2598,9 @@ def compute_content_hash(
         - For any other types, error out.
     - UTF-8 encoded bytes of the string `-`, as separator.
 
+    Each file is read exactly once. Small files are read and normalized by a pool of
+    threads ahead of the (inherently sequential) hashing, large files are streamed.
+
     Parameters
     ----------
     directory: The path whose contents will be hashed
@@ -2062,66 +2614,77 @@ def compute_content_hash(
     str
         The hexdigest of the computed hash, as described above.
     """
+    directory = str(Path(directory))
+    # files are decoded like open() in text mode would
+    encoding = getpreferredencoding(False)
     hasher = hashlib.new(algorithm)
-    for path in sorted(Path(directory).rglob("*"), key=str):
-        relpath = path.relative_to(directory)
-        relpathstr = str(relpath).replace("\\", "/")
-        if skip and any(
-            (
-                # Skip directories like .git/
-                skip_item.endswith("/")
-                and relpathstr.startswith(skip_item)
-                or f"{relpathstr}/" == skip_item
-            )
-            # Skip full relpath match
-            or relpathstr == skip_item
-            for skip_item in skip
+
+    def read_error(relpath, exc):
+        return RuntimeError(
+            f"Could not read file '{relpath}' in directory '{directory}'. "
+            f"Content hash verification cannot continue. Error: {exc}"
+        )
+
+    workers = min(32, (os.cpu_count() or 1) + 4)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        window = workers * 4
+
+        def prefetch(entries):
+            # keep a window of small files being read ahead of the hasher, bounded by
+            # their number and their total size
+            pending = deque()
+            pending_size = 0
+            for relpath, relpathstr, entry in entries:
+                future = None
+                size = 0
+                if not entry.is_symlink() and entry.is_file(follow_symlinks=False):
+                    size = entry.stat(follow_symlinks=False).st_size
+                    if size <= _CONTENT_HASH_PREFETCH_SIZE:
+                        future = executor.submit(
+                            _content_hash_file_bytes, entry.path, encoding
+                        )
+                    else:
+                        size = 0
+                pending.append((relpath, relpathstr, entry, future, size))
+                pending_size += size
+                while pending and (
+                    len(pending) >= window
+                    or pending_size > _CONTENT_HASH_PREFETCH_WINDOW
+                ):
+                    *item, size = pending.popleft()
+                    pending_size -= size
+                    yield item
+            for *item, _ in pending:
+                yield item
+
+        for relpath, relpathstr, entry, future in prefetch(
+            _content_hash_entries(directory, _SkipRules(skip))
         ):
-            continue
-        # encode the relative path to directory, for files, dirs and others
-        hasher.update(relpathstr.encode("utf-8"))
-        if path.is_symlink():
-            hasher.update(b"L")
-            hasher.update(str(path.readlink()).replace("\\", "/").encode("utf-8"))
-        elif path.is_dir():
-            hasher.update(b"D")
-        elif path.is_file():
-            hasher.update(b"F")
-            # We need to normalize line endings for Windows-Unix compat
-            # Attempt normalized line-by-line hashing (text mode). If
-            # Python fails to open in text mode, then it's binary and we hash
-            # the raw bytes directly.
-            try:
+            # encode the relative path to directory, for files, dirs and others
+            hasher.update(relpathstr.encode("utf-8"))
+            if entry.is_symlink():
+                hasher.update(b"L")
+                target = str(Path(os.readlink(entry.path)))
+                hasher.update(target.replace("\\", "/").encode("utf-8"))
+            elif entry.is_dir(follow_symlinks=False):
+                hasher.update(b"D")
+            elif entry.is_file(follow_symlinks=False):
+                hasher.update(b"F")
                 try:
-                    ten_mb = 10 * 1024 * 1024
-                    with tempfile.SpooledTemporaryFile(max_size=ten_mb) as tmp:
-                        with open(path) as fh:
-                            for line in fh:
-                                # Accumulate all line-ending normalized lines first
-                                # to make sure the whole file is read. This prevents
-                                # partial updates to the hash with hybrid text/binary
-                                # files (e.g. like the constructor shell installers).
-                                tmp.write(line.replace("\r\n", "\n").encode("utf-8"))
-                        tmp.flush()
-                        tmp.seek(0)
-                        for chunk in iter(partial(tmp.read, 8192), b""):
-                            hasher.update(chunk)
-                except UnicodeDecodeError:
-                    # file must be binary, read the bytes directly
-                    with open(path, "rb") as fh:
-                        for chunk in iter(partial(fh.read, 8192), b""):
-                            hasher.update(chunk)
-            except OSError as exc:
+                    if future is not None:
+                        hasher.update(future.result())
+                    else:
+                        hasher = _update_content_hash_streaming(
+                            hasher, entry.path, encoding
+                        )
+                except OSError as exc:
+                    raise read_error(relpath, exc)
+            else:
                 raise RuntimeError(
-                    f"Could not read file '{relpath}' in directory '{directory}'. "
-                    f"Content hash verification cannot continue. Error: {exc}"
+                    f"Can't detect type for path '{relpath}' in directory '{directory}'. "
+                    "Content hash verification cannot continue."
                 )
-        else:
-            raise RuntimeError(
-                f"Can't detect type for path '{relpath}' in directory '{directory}'. "
-                "Content hash verification cannot continue."
-            )
-        hasher.update(b"-")
+            hasher.update(b"-")
     return hasher.hexdigest()
 
 
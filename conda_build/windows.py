@@ -528,6 +528,11 @@ def build(m, bld_bat, stats, provision_only=False):
             }
             print(f"Rewriting env in output: {pprint.pformat(rewrite_env)}")
         check_call_env(
-            cmd, cwd=m.config.work_dir, stats=stats, rewrite_stdout_env=rewrite_env
+            cmd,
+            cwd=m.config.work_dir,
+            stats=stats,
+            rewrite_stdout_env=rewrite_env,
+            time_int=m.config.stats_interval,
+            disk_time_int=m.config.stats_disk_interval,
         )
         fix_staged_scripts(join(m.config.host_prefix, "Scripts"), config=m.config)
@@ -534,6 +534,34 @@ def test_zstd_compression_level(
         assert config.zstd_compression_level == zstd_compression_level_default
 
 
+@pytest.mark.serial
+@pytest.mark.parametrize(
+    "ldm_condarc, ldm_cli, expected",
+    [
+        (None, [], False),
+        (True, [], True),
+        (None, ["--zstd-long-distance-matching"], True),
+        (True, ["--no-zstd-long-distance-matching"], False),
+    ],
+)
+def test_zstd_long_distance_matching(
+    testing_workdir, request, ldm_condarc, ldm_cli, expected
+):
+    if ldm_condarc:
+        with open(os.path.join(testing_workdir, ".condarc"), "w") as f:
+            print(
+                "conda_build:",
+                f"  zstd_long_distance_matching: {ldm_condarc}",
+                sep="\n",
+                file=f,
+            )
+    request.addfinalizer(_reset_config)
+    _reset_config([os.path.join(testing_workdir, ".condarc")])
+    parser, args = main_build.parse_args(["non_existing_recipe", *ldm_cli])
+    config = Config(**args.__dict__)
+    assert config.zstd_long_distance_matching is expected
+
+
 def test_user_warning(tmpdir, recwarn):
     dir_recipe_path = tmpdir.mkdir("recipe-path")
     recipe = dir_recipe_path.join("meta.yaml")
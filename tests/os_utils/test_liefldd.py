@@ -0,0 +1,169 @@
+# Copyright (C) 2014 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+from __future__ import annotations
+
+import hashlib
+import os
+from typing import TYPE_CHECKING
+
+from conda_build.os_utils import liefldd
+from conda_build.os_utils.liefldd import (
+    SearchPathCache,
+    StaticLibSymbolIndex,
+    _get_archive_member_names,
+)
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def ar_member(name: bytes, data: bytes) -> bytes:
+    header = b"%-16s%-12d%-6d%-6d%-8o%-10d`\n" % (name, 0, 0, 0, 0o644, len(data))
+    return header + data + (b"\n" if len(data) & 1 else b"")
+
+
+def test_get_archive_member_names_gnu():
+    long_names = b"a_very_long_member_name.o/\n"
+    content = b"".join(
+        (
+            b"!<arch>\n",
+            ar_member(b"/", b"\0" * 8),
+            ar_member(b"//", long_names),
+            ar_member(b"a.o/", b"abc"),
+            ar_member(b"/0", b"defg"),
+        )
+    )
+    names = _get_archive_member_names(content)
+    assert list(names.values()) == ["a.o", "a_very_long_member_name.o"]
+    (offset,) = (o for o, name in names.items() if name == "a.o")
+    assert content[offset : offset + 3] == b"abc"
+
+
+def test_get_archive_member_names_bsd():
+    content = b"".join(
+        (
+            b"!<arch>\n",
+            ar_member(b"#1/20", b"__.SYMDEF SORTED\0\0\0\0"),
+            ar_member(b"#1/28", b"a_very_long_member_name.o\0\0\0" + b"xyz"),
+        )
+    )
+    names = _get_archive_member_names(content)
+    assert list(names.values()) == ["a_very_long_member_name.o"]
+    (offset,) = names
+    assert content[offset : offset + 3] == b"xyz"
+
+
+def test_static_lib_symbol_index(tmp_path: Path, mocker):
+    lib = tmp_path / "libx.a"
+    lib.write_bytes(b"!<arch>\n")
+    parse = mocker.patch(
+        "conda_build.os_utils.liefldd.get_static_lib_member_exports",
+        return_value=[("a.o", ["foo"]), ("b.o", ["bar", "baz"])],
+    )
+    cache_dir = tmp_path / "index"
+
+    index = StaticLibSymbolIndex(str(cache_dir))
+    assert index.exports(lib) == ["foo", "bar", "baz"]
+    (table,) = cache_dir.iterdir()
+    assert f"-v{liefldd._STATIC_LIB_INDEX_VERSION}-lief" in table.name
+
+    # another build loads the table instead of parsing the archive again
+    index = StaticLibSymbolIndex(str(cache_dir))
+    assert index.members(lib) == [("a.o", ["foo"]), ("b.o", ["bar", "baz"])]
+    assert parse.call_count == 1
+
+    # a changed archive is parsed again and replaces the old symbols
+    lib.write_bytes(b"!<arch>\n\n")
+    parse.return_value = [("c.o", ["qux"])]
+    assert index.exports(lib) == ["qux"]
+    assert index.members(lib) == [("c.o", ["qux"])]
+    assert parse.call_count == 2
+
+
+def test_static_lib_symbol_index_unwritable(tmp_path: Path, mocker):
+    lib = tmp_path / "libx.a"
+    lib.write_bytes(b"!<arch>\n")
+    parse = mocker.patch(
+        "conda_build.os_utils.liefldd.get_static_lib_member_exports",
+        return_value=[("a.o", ["foo"])],
+    )
+    # a file where the cache directory should be, as good as a read-only one
+    cache_dir = tmp_path / "index"
+    cache_dir.touch()
+
+    index = StaticLibSymbolIndex(str(cache_dir))
+    assert index.exports(lib) == ["foo"]
+    assert index.exports(lib) == ["foo"]
+    assert parse.call_count == 1
+
+
+def test_file_sha256(tmp_path: Path, mocker):
+    path = tmp_path / "libx.a"
+    path.write_bytes(b"!<arch>\n")
+    digest = hashlib.sha256(b"!<arch>\n").hexdigest()
+    hashed = mocker.spy(liefldd.hashlib, "sha256")
+
+    # a file modified too recently is hashed on every call
+    assert liefldd.file_sha256(path) == liefldd.file_sha256(path) == digest
+    assert hashed.call_count == 2
+
+    # an older one only once, for the memoized functions and the static lib index
+    os.utime(path, ns=(0, 0))
+    assert liefldd.file_sha256(path) == digest
+    assert liefldd.StaticLibSymbolIndex._signature(path) == (8, digest)
+    assert hashed.call_count == 3
+
+
+def test_get_static_lib_index_is_shared(tmp_path: Path):
+    index = liefldd.get_static_lib_index(str(tmp_path))
+    assert liefldd.get_static_lib_index(str(tmp_path)) is index
+    assert liefldd.get_static_lib_index() is not index
+
+
+def test_search_path_cache(tmp_path: Path, mocker):
+    lib = tmp_path / "lib"
+    lib.mkdir()
+    (lib / "liba.so").touch()
+    (lib / "dangling.so").symlink_to(lib / "missing.so")
+    # old enough for its mtime to reliably reveal changes
+    os.utime(lib, ns=(0, 0))
+    cache = SearchPathCache()
+    exists = mocker.spy(liefldd.os.path, "exists")
+
+    with cache.scope():
+        for _ in range(3):
+            assert cache.exists(str(lib / "liba.so"))
+            assert not cache.exists(str(lib / "libb.so"))
+            assert not cache.exists(str(lib / "dangling.so"))
+            assert not cache.exists(str(tmp_path / "missing" / "liba.so"))
+    assert cache.stats == {"lookups": 12, "stats": 2, "listings": 2, "fallbacks": 0}
+    # only the dangling symlink was checked while listing lib
+    assert exists.call_count == 1
+
+    # unchanged directories are not listed again by the next scope
+    with cache.scope():
+        assert cache.exists(str(lib / "liba.so"))
+    assert cache.stats == {"lookups": 1, "stats": 1, "listings": 0, "fallbacks": 0}
+
+    # changed ones are
+    (lib / "libb.so").touch()
+    with cache.scope():
+        assert cache.exists(str(lib / "libb.so"))
+    assert cache.stats["listings"] == 1
+
+    # and listed again as long as their mtime is too recent to reveal later changes
+    (lib / "libd.so").touch()
+    with cache.scope():
+        assert cache.exists(str(lib / "libd.so"))
+    assert cache.stats["listings"] == 1
+
+    # outside of a scope, the filesystem is asked every time
+    (lib / "libc.so").touch()
+    assert cache.exists(str(lib / "libc.so"))
+    assert cache.stats["lookups"] == 1
+
+    # the next scope drops the listings not used by the last one
+    with cache.scope():
+        assert not cache.exists(str(tmp_path / "liba.so"))
+    with cache.scope():
+        assert set(cache._listings) == {str(tmp_path)}
@@ -0,0 +1,99 @@
+# Copyright (C) 2014 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import pytest
+
+from conda_build.os_utils.pyldd import (
+    DT_RPATH,
+    DT_RUNPATH,
+    _elf_dynamic,
+    elf_get_rpath,
+    elf_set_rpath,
+)
+from conda_build.post import mk_relative_linux, post_process_shared_libs
+
+LDD = Path(__file__).parent.parent / "data" / "ldd"
+
+
+@pytest.fixture
+def elf(tmp_path: Path) -> Path:
+    path = tmp_path / "lib" / "clear.elf"
+    path.parent.mkdir()
+    shutil.copyfile(LDD / "clear.elf", path)
+    return path
+
+
+def rpath_tags(path: Path) -> list[int]:
+    with open(path, "rb") as file:
+        _, entries, _ = _elf_dynamic(file)
+    return [tag for tag, _, _ in entries if tag in (DT_RPATH, DT_RUNPATH)]
+
+
+def test_elf_get_rpath(elf: Path):
+    assert elf_get_rpath(elf) == ["$ORIGIN/../lib"]
+
+
+def test_elf_get_rpath_not_elf(tmp_path: Path):
+    (path := tmp_path / "not.elf").write_bytes(b"\0" * 64)
+    assert elf_get_rpath(path) is None
+
+
+@pytest.mark.parametrize("rpath", ["$ORIGIN", "/lib", "$ORIGIN/../lib", ""])
+def test_elf_set_rpath(elf: Path, rpath: str):
+    size = elf.stat().st_size
+    assert elf_set_rpath(elf, rpath)
+    assert elf_get_rpath(elf) == (rpath.split(":") if rpath else [])
+    assert rpath_tags(elf) == [DT_RPATH]
+    assert elf.stat().st_size == size
+
+
+def test_elf_set_rpath_runpath(elf: Path):
+    assert elf_set_rpath(elf, "$ORIGIN", force_rpath=False)
+    assert elf_get_rpath(elf) == ["$ORIGIN"]
+    assert rpath_tags(elf) == [DT_RUNPATH]
+
+
+def test_elf_set_rpath_too_long(elf: Path):
+    data = elf.read_bytes()
+    assert not elf_set_rpath(elf, "$ORIGIN/../lib:$ORIGIN/../lib64")
+    assert elf.read_bytes() == data
+
+
+def test_mk_relative_linux(elf: Path, mocker):
+    call = mocker.patch("conda_build.post.call")
+    set_rpath = mocker.patch("conda_build.post.set_rpath")
+    assert elf_set_rpath(elf, "/usr/lib64:/x")
+    mk_relative_linux("lib/clear.elf", str(elf.parent.parent), rpaths=("lib",))
+    # /usr/lib64 and /x are outside of the prefix and the new value fits in place
+    assert elf_get_rpath(elf) == ["$ORIGIN/."]
+    call.assert_not_called()
+    set_rpath.assert_not_called()
+
+
+def test_post_process_shared_libs_hardlinks(tmp_path: Path, mocker):
+    prefix = tmp_path / "prefix"
+    for name in ("bin/a", "libexec/a", "libexec/b", "lib/c"):
+        (prefix / name).parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(LDD / "clear.elf", prefix / "bin" / "a")
+    os.link(prefix / "bin" / "a", prefix / "libexec" / "a")
+    os.link(prefix / "bin" / "a", prefix / "libexec" / "b")
+    shutil.copyfile(LDD / "clear.elf", prefix / "lib" / "c")
+    calls = []
+    mocker.patch(
+        "conda_build.post.post_process_shared_lib",
+        side_effect=lambda m, f, *args: calls.append((f, threading.get_ident())),
+    )
+    files = ["libexec/b", "lib/c", "bin/a", "libexec/a"]
+    post_process_shared_libs(mocker.Mock(), files, files, str(prefix))
+
+    # all links of one inode are patched in order, by one worker
+    linked = [(f, ident) for f, ident in calls if f != "lib/c"]
+    assert [f for f, _ in linked] == ["libexec/b", "bin/a", "libexec/a"]
+    assert len({ident for _, ident in linked}) == 1
+    assert sorted(f for f, _ in calls) == sorted(files)
@@ -5,12 +5,16 @@ import hashlib
 import json
 import os
 import tarfile
+import threading
 
 import pytest
 from conda.gateways.connection.download import download
 
+import conda_build.convert
 from conda_build import api
+from conda_build.convert import _MemberBuffer, conda_convert, iter_package
 from conda_build.exceptions import CondaBuildUserError
+from conda_build.package_writer import CondaPackageWriter, zstd_compressor
 from conda_build.utils import on_win, package_has_file
 
 from .utils import assert_package_consistency, metadata_dir
@@ -353,3 +357,208 @@ def test_renaming_executables(base_platform, package):
             if expected_paths_json:
                 assert package_has_file(package, "info/paths.json")
                 assert_package_paths_matches_files(package)
+
+
+def make_package(path, files, index):
+    """Write a .tar.bz2 or .conda package with ``files`` (a path to content mapping)."""
+    prefix = path.parent / "prefix"
+    paths = [
+        {
+            "_path": name,
+            "path_type": "hardlink",
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "size_in_bytes": len(content),
+        }
+        for name, content in files.items()
+    ]
+    files = {
+        **files,
+        "info/index.json": json.dumps(index).encode(),
+        "info/paths.json": json.dumps({"paths": paths, "paths_version": 1}).encode(),
+        "info/files": "".join(f"{name}\n" for name in files).encode(),
+    }
+    for name, content in files.items():
+        (prefix / name).parent.mkdir(parents=True, exist_ok=True)
+        (prefix / name).write_bytes(content)
+    info = sorted(name for name in files if name.startswith("info/"))
+    pkg = sorted(name for name in files if not name.startswith("info/"))
+    if path.name.endswith(".conda"):
+        with CondaPackageWriter(path, zstd_compressor(3)) as writer:
+            writer.add_component("pkg", prefix, pkg)
+            writer.add_component("info", prefix, info)
+    else:
+        with tarfile.open(path, "w:bz2") as tar:
+            for name in info + pkg:
+                tar.add(prefix / name, arcname=name)
+    return str(path)
+
+
+def package_contents(path):
+    return {
+        tarinfo.name: fileobj.read()
+        for tarinfo, fileobj in iter_package(path)
+        if fileobj is not None
+    }
+
+
+UNIX_INDEX = {
+    "name": "foo",
+    "version": "1.0",
+    "build": "py36_0",
+    "build_number": 0,
+    "depends": ["python 3.6*"],
+    "platform": "linux",
+    "arch": "x86_64",
+    "subdir": "linux-64",
+}
+
+
+@pytest.mark.parametrize("extension", [".tar.bz2", ".conda"])
+def test_convert_streaming(tmp_path, extension):
+    fn = make_package(
+        tmp_path / f"foo-1.0-py36_0{extension}",
+        {
+            "lib/python3.6/site-packages/foo/__init__.py": b"x = 1\n",
+            "bin/foo": b"#!/opt/anaconda1anaconda2anaconda3/bin/python\nimport foo\n",
+            "bin/binary": b"\0binary",
+        },
+        UNIX_INDEX,
+    )
+    output_dir = tmp_path / "out"
+    api.convert(
+        fn,
+        output_dir=str(output_dir),
+        platforms=["osx-arm64", "linux-aarch64", "win-64"],
+        dependencies=["bar 1.0"],
+    )
+
+    for platform in ["osx-arm64", "linux-aarch64"]:
+        contents = package_contents(str(output_dir / platform / os.path.basename(fn)))
+        index = json.loads(contents.pop("info/index.json"))
+        assert index["subdir"] == platform
+        assert index["depends"] == ["python 3.6*", "bar 1.0"]
+        source = package_contents(fn)
+        del source["info/index.json"]
+        assert contents == source
+
+    contents = package_contents(str(output_dir / "win-64" / os.path.basename(fn)))
+    assert contents["Scripts/foo-script.py"] == b"import foo\n"
+    assert contents["Scripts/binary"] == b"\0binary"
+    assert "Scripts/foo.exe" in contents
+    assert "Lib/site-packages/foo/__init__.py" in contents
+    assert json.loads(contents["info/index.json"])["subdir"] == "win-64"
+    assert contents["info/has_prefix"] == (
+        b"/opt/anaconda1anaconda2anaconda3 text Scripts/foo-script.py\n"
+    )
+    files = contents["info/files"].decode().splitlines()
+    assert files == sorted(name for name in contents if not name.startswith("info/"))
+    paths = json.loads(contents["info/paths.json"])["paths"]
+    assert sorted(path["_path"] for path in paths) == files
+    for path in paths:
+        content = contents[path["_path"]]
+        assert path["sha256"] == hashlib.sha256(content).hexdigest()
+        assert path["size_in_bytes"] == len(content)
+
+    # nothing is left behind next to the converted packages
+    for platform in ["osx-arm64", "linux-aarch64", "win-64"]:
+        assert os.listdir(output_dir / platform) == [os.path.basename(fn)]
+
+
+def test_convert_streaming_from_windows(tmp_path):
+    fn = make_package(
+        tmp_path / "foo-1.0-py36_0.conda",
+        {
+            "Lib/site-packages/foo/__init__.py": b"x = 1\n",
+            "Scripts/foo-script.py": b"import foo\n",
+            "Scripts/foo.exe": b"MZ\0",
+        },
+        {**UNIX_INDEX, "platform": "win", "subdir": "win-64"},
+    )
+    api.convert(fn, output_dir=str(tmp_path), platforms="linux-64")
+
+    contents = package_contents(str(tmp_path / "linux-64" / os.path.basename(fn)))
+    assert contents["bin/foo"] == (
+        b"#!/opt/anaconda1anaconda2anaconda3/bin/python\nimport foo\n"
+    )
+    assert "lib/python3.6/site-packages/foo/__init__.py" in contents
+    assert not any(name.startswith("Scripts/") for name in contents)
+    paths = json.loads(contents["info/paths.json"])["paths"]
+    assert sorted(path["_path"] for path in paths) == [
+        "bin/foo",
+        "lib/python3.6/site-packages/foo/__init__.py",
+    ]
+    assert contents["info/has_prefix"] == (
+        b"/opt/anaconda1anaconda2anaconda3 text bin/foo\n"
+    )
+
+
+def test_convert_streaming_c_extension(tmp_path, capsys):
+    fn = make_package(
+        tmp_path / "foo-1.0-py36_0.tar.bz2",
+        {"lib/python3.6/site-packages/foo/_speedups.so": b"\0elf"},
+        UNIX_INDEX,
+    )
+    with pytest.raises(CondaBuildUserError, match="contains C extensions"):
+        conda_convert(
+            fn, output_dir=str(tmp_path / "out"), platforms=["osx-64"], quiet=False
+        )
+    # refused before announcing or starting any conversion
+    assert "Converting" not in capsys.readouterr().out
+    assert not (tmp_path / "out").exists()
+
+
+def test_member_buffer():
+    buffer = _MemberBuffer(1000, consumers=2)
+    first, second = tarfile.TarInfo("first"), tarfile.TarInfo("second")
+    first.size = second.size = 600
+    buffer.acquire(first)
+    acquired = threading.Event()
+    reader = threading.Thread(target=lambda: (buffer.acquire(second), acquired.set()))
+    reader.start()
+
+    # the second member waits until every consumer wrote the first one
+    buffer.release(first)
+    assert not acquired.wait(0.2)
+    buffer.release(first)
+    assert acquired.wait(5)
+    reader.join()
+    assert buffer.used == 600
+
+
+def test_convert_streaming_bounded_buffer(tmp_path, monkeypatch):
+    # members larger than the buffer are converted one at a time
+    monkeypatch.setattr("conda_build.convert.MEMBER_BUFFER_SIZE", 1)
+    files = {f"lib/data{i}": os.urandom(4096) for i in range(8)}
+    fn = make_package(tmp_path / "foo-1.0-py36_0.conda", files, UNIX_INDEX)
+    api.convert(fn, output_dir=str(tmp_path), platforms=["osx-64", "linux-aarch64"])
+
+    for platform in ["osx-64", "linux-aarch64"]:
+        contents = package_contents(str(tmp_path / platform / os.path.basename(fn)))
+        assert {name: contents[name] for name in files} == files
+
+
+def test_convert_streaming_zstd_config(tmp_path, testing_config, mocker):
+    fn = make_package(
+        tmp_path / "foo-1.0-py36_0.conda", {"lib/data": b"data"}, UNIX_INDEX
+    )
+    testing_config.zstd_compression_level = 7
+    testing_config.zstd_threads = 2
+    testing_config.zstd_long_distance_matching = True
+    testing_config.zstd_window_log = 20
+    compressor = mocker.spy(conda_build.convert, "zstd_compressor")
+    conda_convert(
+        fn, output_dir=str(tmp_path), platforms="osx-64", config=testing_config
+    )
+
+    compressor.assert_called_once_with(
+        7, threads=2, long_distance_matching=True, window_log=20
+    )
+    assert package_contents(str(tmp_path / "osx-64" / os.path.basename(fn)))
+
+
+def test_cross_package_conversion_requires_move():
+    class IncompleteConversion(conda_build.convert.CrossPackageConversion):
+        pass
+
+    with pytest.raises(TypeError, match="move"):
+        IncompleteConversion("win-64", {"subdir": "linux-64"}, (), False)
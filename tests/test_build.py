@@ -20,7 +20,7 @@ from typing import TYPE_CHECKING
 import pytest
 from conda.common.compat import on_win
 
-from conda_build import api, build, windows
+from conda_build import api, build, utils, windows
 from conda_build.build import INTERPRETER_BAT
 from conda_build.exceptions import CondaBuildUserError
 from conda_build.metadata import MetaData
@@ -233,6 +233,32 @@ def test_create_info_files_json_symlinks(testing_workdir, testing_metadata):
     }
 
 
+def test_build_info_files_json_v1_hashes_content(testing_workdir, testing_metadata):
+    for i in range(20):
+        Path(testing_workdir, f"file{i}").write_bytes(b"x" * i * 100_000)
+    os.symlink("file3", Path(testing_workdir, "link"))
+    files = [*(f"file{i}" for i in range(20)), "link"]
+    files_with_prefix = [
+        ("prefix/one", "text", "file1"),
+        ("prefix/two", "binary", "file1"),
+    ]
+
+    paths = {
+        info["_path"]: info
+        for info in build.build_info_files_json_v1(
+            testing_metadata, testing_workdir, files, files_with_prefix
+        )
+    }
+    for i in range(20):
+        assert paths[f"file{i}"]["sha256"] == utils.sha256_checksum(f"file{i}")
+        assert paths[f"file{i}"]["size_in_bytes"] == i * 100_000
+    assert paths["link"]["sha256"] == paths["file3"]["sha256"]
+    assert paths["link"]["size_in_bytes"] == 300_000
+    # the first entry for a file wins
+    assert paths["file1"]["prefix_placeholder"] == "prefix/one"
+    assert paths["file1"]["file_mode"] == "text"
+
+
 def test_create_info_files_json_no_inodes(testing_workdir, testing_metadata):
     info_dir = Path(testing_workdir, "info")
     info_dir.mkdir()
@@ -372,6 +398,38 @@ def test_wsl_unsupported(
         )
 
 
+def test_bundle_conda_component_size_fallback(
+    testing_metadata: MetaData, mocker: MockerFixture
+):
+    mocker.patch(
+        "conda_build.build.CondaPackageWriter.add_component",
+        side_effect=build.ComponentSizeError("pkg-x.tar.zst came out at 1 bytes"),
+    )
+    testing_metadata.meta["package"]["name"] = "pkg"
+    host_prefix = Path(testing_metadata.config.host_prefix)
+    (host_prefix / "share").mkdir(parents=True, exist_ok=True)
+    (host_prefix / "share" / "file").write_text("file")
+    (package,) = build.bundle_conda(
+        {"name": "pkg", "files": ["share/file"]},
+        testing_metadata,
+        env={},
+        stats={},
+    )
+    assert utils.package_has_file(package, "share/file") == "file"
+    assert utils.package_has_file(package, "info/paths.json")
+
+
+def test_build_tree_failure_disables_tracer(
+    testing_config: Config, mocker: MockerFixture, tmp_path: Path
+):
+    mocker.patch("conda_build.build.render_recipe", side_effect=RuntimeError("oops"))
+    testing_config.stats_file = str(tmp_path / "stats.json")
+    with pytest.raises(RuntimeError, match="oops"):
+        build.build_tree([str(tmp_path)], testing_config, stats={})
+    assert not build.tracer.enabled
+    assert not build.tracer.spans
+
+
 def test_handle_anaconda_upload(testing_config: Config, mocker: MockerFixture):
     mocker.patch(
         "conda_build.os_utils.external.find_executable",
@@ -743,3 +801,53 @@ def test_write_build_scripts_isolated_activation(
         assert 'set "_CE_CONDA=conda"' in content
     # Dead `_CE_I` must never appear; conda only expands _CE_M / _CE_CONDA.
     assert "_CE_I" not in content
+
+
+def test_test_packages_sequential(testing_metadata: MetaData, mocker: MockerFixture):
+    test = mocker.patch("conda_build.build.test")
+    tests = [("a.conda", testing_metadata.config), ("b.conda", testing_metadata.config)]
+    stats = {}
+    testing_metadata.config.test_jobs = 1
+    build._test_packages(tests, stats, testing_metadata)
+    assert [call.args[0] for call in test.call_args_list] == ["a.conda", "b.conda"]
+
+
+def test_init_test_process(mocker: MockerFixture):
+    init = mocker.patch.object(build.context, "__init__")
+    mocker.patch.object(build, "_tests_failed_lock")
+    lock = object()
+    build._init_test_process({"channel": ["conda-forge"]}, lock)
+    init.assert_called_once_with(argparse_args={"channel": ["conda-forge"]})
+    assert build._tests_failed_lock is lock
+
+
+def test_test_packages_concurrent(testing_metadata: MetaData, capsys):
+    # nothing to test in these packages, so no test environment needs to be created
+    del testing_metadata.meta["test"]
+    packages = []
+    for name in ("first", "second"):
+        metadata = testing_metadata.copy()
+        metadata.meta["package"]["name"] = name
+        host_prefix = Path(metadata.config.host_prefix)
+        (host_prefix / "share").mkdir(parents=True, exist_ok=True)
+        (host_prefix / "share" / name).write_text(name)
+        packages += build.bundle_conda(
+            {"name": name, "files": [f"share/{name}"]},
+            metadata,
+            env={},
+            stats={},
+        )
+        utils.rm_rf(host_prefix / "share")
+    capsys.readouterr()
+
+    testing_metadata.config.test_jobs = 2
+    build._test_packages(
+        [(package, testing_metadata.config.copy()) for package in packages],
+        {},
+        testing_metadata,
+    )
+    out = capsys.readouterr().out
+    for package in packages:
+        assert f"Nothing to test for: {package}" in out
+    # the build folders of the tests are removed once they pass
+    assert not list(Path(testing_metadata.config.croot).glob("*_test[0-9]"))
@@ -10,6 +10,7 @@ from uuid import uuid4
 import pytest
 from conda.core.prefix_data import PrefixData
 
+from conda_build import inspect_pkg
 from conda_build.exceptions import CondaBuildUserError
 from conda_build.inspect_pkg import inspect_linkages, inspect_objects, which_package
 from conda_build.utils import on_mac, on_win
@@ -205,6 +206,43 @@ def test_which_package(tmp_path: Path):
     assert set(precs_reused) == {precC}
 
 
+def test_which_package_index(tmp_path: Path, mocker):
+    (tmp_path / "conda-meta").mkdir()
+
+    def add_package(name: str, files: list[str]) -> None:
+        (tmp_path / "conda-meta" / f"{name}-1-0.json").write_text(
+            json.dumps(
+                {
+                    "build": "0",
+                    "build_number": 0,
+                    "channel": f"{name}-channel",
+                    "files": files,
+                    "name": name,
+                    "version": "1",
+                }
+            )
+        )
+        PrefixData._cache_.clear()
+
+    add_package("packageA", ["lib/a", "lib/shared"])
+    iter_records = mocker.spy(PrefixData, "iter_records")
+
+    assert [prec.name for prec in which_package("lib/a", tmp_path)] == ["packageA"]
+    assert [prec.name for prec in which_package("lib/shared", tmp_path)] == ["packageA"]
+    assert not list(which_package("lib/b", tmp_path))
+    # the packages are only looked at once for all the paths
+    assert iter_records.call_count == 1
+
+    # installing a package updates the index
+    add_package("packageB", ["lib/b", "lib/shared"])
+    assert [prec.name for prec in which_package("lib/b", tmp_path)] == ["packageB"]
+    assert {prec.name for prec in which_package("lib/shared", tmp_path)} == {
+        "packageA",
+        "packageB",
+    }
+    assert iter_records.call_count == 2
+
+
 @pytest.mark.benchmark
 def test_which_package_battery(tmp_path: Path):
     # regression: https://github.com/conda/conda-build/issues/5126
@@ -274,6 +312,23 @@ def test_which_package_battery(tmp_path: Path):
     assert not len(list(which_package(tmp_path / "missing", tmp_path)))
 
 
+def test_which_package_indexes_bounded(tmp_path: Path, mocker):
+    indexes = mocker.patch.dict(inspect_pkg._prefix_path_indexes, clear=True)
+    prefixes = [
+        tmp_path / str(i) for i in range(inspect_pkg._PREFIX_PATH_INDEXES_MAX + 1)
+    ]
+    for prefix in prefixes:
+        (prefix / "conda-meta").mkdir(parents=True)
+        list(which_package(prefix / "file", prefix))
+    # the first prefix was evicted, reusing the second one evicts the third instead
+    list(which_package(prefixes[1] / "file", prefixes[1]))
+    list(which_package(prefixes[0] / "file", prefixes[0]))
+
+    assert len(indexes) == inspect_pkg._PREFIX_PATH_INDEXES_MAX
+    assert list(indexes)[-2:] == [str(prefixes[1]), str(prefixes[0])]
+    assert str(prefixes[2]) not in indexes
+
+
 def test_inspect_linkages_no_packages():
     with pytest.raises(CondaBuildUserError):
         inspect_linkages([])
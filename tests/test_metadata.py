@@ -25,6 +25,7 @@ from conda_build.metadata import (
     MetaData,
     OSModuleSubset,
     _hash_dependencies,
+    _pinned_subpackage_names,
     check_bad_chrs,
     eval_selector,
     get_output_dicts_from_metadata,
@@ -888,3 +889,78 @@ def test_extract_single_output_text_logging_warning(meta_yaml, caplog, tmp_path)
     # Check if the specific warning message is in logs
     for record in caplog.records:
         assert expected_message not in caplog.text
+
+
+@pytest.mark.parametrize(
+    "requirement,expected",
+    [
+        pytest.param("dep1", frozenset(), id="none"),
+        pytest.param(
+            "{{ pin_subpackage('lib1', exact=True) }}",
+            frozenset({"lib1"}),
+            id="literal",
+        ),
+        pytest.param('{{ pin_subpackage("lib1") }}', frozenset({"lib1"}), id="quoted"),
+        pytest.param("{{ pin_subpackage('lib' ~ suffix) }}", None, id="concatenated"),
+        pytest.param("{{ pin_subpackage(name) }}", None, id="variable"),
+    ],
+)
+def test_pinned_subpackage_names(
+    tmp_path: Path, requirement: str, expected: frozenset[str] | None
+):
+    (tmp_path / "meta.yaml").write_text(
+        textwrap.dedent(
+            f"""
+            package:
+              name: parent
+              version: 1.0
+            outputs:
+              - name: lib1
+              - name: py1
+                requirements:
+                  - {requirement}
+            """
+        )
+    )
+    assert _pinned_subpackage_names(MetaData(str(tmp_path))) == expected
+
+
+def test_finalize_outputs_reuses_resolved_parent(
+    tmp_path: Path, testing_config: Config, mocker
+):
+    (tmp_path / "meta.yaml").write_text(
+        textwrap.dedent(
+            """
+            package:
+              name: parent
+              version: 1.0
+            outputs:
+              - name: out1
+              - name: out2
+              - name: out3
+                requirements:
+                  - {{ pin_subpackage('out1', exact=True) }}
+            """
+        )
+    )
+
+    def render():
+        parse_until_resolved = mocker.spy(MetaData, "parse_until_resolved")
+        metadata_tuples = api.render(
+            str(tmp_path), config=testing_config, bypass_env_check=True
+        )
+        outputs = {m.name(): m for m, _, _ in metadata_tuples}
+        assert sorted(outputs) == ["out1", "out2", "out3"]
+        assert any(
+            req.startswith("out1 1.0 ")
+            for req in outputs["out3"].meta["requirements"]["run"]
+        )
+        count = parse_until_resolved.call_count
+        mocker.stop(parse_until_resolved)
+        return count
+
+    cached = render()
+    # without knowing what the recipe pins, any finalized output invalidates the parent
+    mocker.patch("conda_build.metadata._pinned_subpackage_names", return_value=None)
+    # the parent of out2 or out3, whichever comes last, is reused
+    assert render() - cached == 1
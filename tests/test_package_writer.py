@@ -0,0 +1,144 @@
+# Copyright (C) 2014 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import TYPE_CHECKING
+
+import pytest
+import zstandard
+from conda_package_handling.api import extract
+
+from conda_build import tarcheck
+from conda_build.package_writer import (
+    ComponentSizeError,
+    CondaPackageWriter,
+    _compression_order,
+    zstd_compressor,
+)
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def test_conda_package_writer_hashes_payload(tmp_path: Path):
+    prefix = tmp_path / "prefix"
+    (prefix / "lib").mkdir(parents=True)
+    (prefix / "info").mkdir()
+    files = []
+    for i in range(10):
+        (prefix / "lib" / f"file{i}").write_bytes(os.urandom(i * 10_000))
+        files.append(f"lib/file{i}")
+    (prefix / "lib" / ("long" * 40)).write_text("long name")
+    os.link(prefix / "lib" / "file3", prefix / "lib" / "file3_hardlink")
+    os.symlink("file4", prefix / "lib" / "file4_symlink")
+    (prefix / "info" / "index.json").write_text("{}")
+    files += ["lib/" + "long" * 40, "lib/file3_hardlink", "lib/file4_symlink"]
+
+    path = tmp_path / "pkg-1.0-0.conda"
+    with CondaPackageWriter(path, lambda: zstandard.ZstdCompressor(level=1)) as writer:
+        sha256s = writer.add_component("pkg", prefix, files)
+        writer.add_component("info", prefix, ["info/index.json"])
+    assert sorted(writer.members) == sorted([*files, "info/index.json"])
+
+    for file in files[:-1]:
+        expected = hashlib.sha256((prefix / file).read_bytes()).hexdigest()
+        assert sha256s[file] == expected
+    # the content of symlinks is not read
+    assert "lib/file4_symlink" not in sha256s
+
+    extract(str(path), str(tmp_path / "extracted"))
+    for file in files:
+        assert (tmp_path / "extracted" / file).read_bytes() == (
+            prefix / file
+        ).read_bytes()
+    assert (tmp_path / "extracted" / "lib" / "file4_symlink").is_symlink()
+    assert (
+        json.loads((tmp_path / "extracted" / "info" / "index.json").read_text()) == {}
+    )
+
+
+@pytest.mark.parametrize(
+    "threads, long_distance_matching, window_log",
+    [(0, False, 0), (2, True, 0), (-1, False, 20)],
+)
+def test_zstd_compressor(
+    tmp_path: Path, threads: int, long_distance_matching: bool, window_log: int
+):
+    prefix = tmp_path / "prefix"
+    (prefix / "lib").mkdir(parents=True)
+    data = os.urandom(100_000) * 20
+    (prefix / "lib" / "file").write_bytes(data)
+
+    path = tmp_path / "pkg-1.0-0.conda"
+    compressor = zstd_compressor(3, threads, long_distance_matching, window_log)
+    with CondaPackageWriter(path, compressor) as writer:
+        writer.add_component("pkg", prefix, ["lib/file"])
+        writer.add_component("info", prefix, [])
+
+    extract(str(path), str(tmp_path / "extracted"))
+    assert (tmp_path / "extracted" / "lib" / "file").read_bytes() == data
+
+
+def test_compression_order(tmp_path: Path):
+    sizes = {
+        "lib/libb.so.1.2": 30,
+        "lib/liba.dylib": 20,
+        "lib/liba.so": 10,
+        "bin/tool": 5,
+        "bin/other": 0,
+        "share/doc.txt": 1,
+        "lib/README": 1,
+    }
+    for file, size in sizes.items():
+        (tmp_path / file).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / file).write_bytes(b"x" * size)
+
+    assert _compression_order(str(tmp_path), sizes) == [
+        "bin/tool",
+        "bin/other",
+        "lib/README",
+        "lib/liba.so",
+        "lib/liba.dylib",
+        "lib/libb.so.1.2",
+        "share/doc.txt",
+    ]
+
+
+@pytest.mark.parametrize("size", [512, 1 << 20])
+def test_component_size_error(tmp_path: Path, size: int):
+    prefix = tmp_path / "prefix"
+    prefix.mkdir()
+    (prefix / "file").write_bytes(os.urandom(10_000))
+
+    path = tmp_path / "pkg-1.0-0.conda"
+    with pytest.raises(ComponentSizeError, match="pkg-pkg-1.0-0.tar.zst"):
+        with CondaPackageWriter(path, zstd_compressor(1)) as writer:
+            with writer.component("pkg", size) as tar:
+                tar.add(prefix / "file", arcname="file")
+    assert not path.exists()
+
+
+def test_check_members(tmp_path: Path, testing_config):
+    info_dir = tmp_path / "info"
+    info_dir.mkdir()
+    (info_dir / "files").write_text("lib/a\nlib/b\n")
+    (info_dir / "index.json").write_text(
+        json.dumps(
+            {
+                "name": "pkg",
+                "version": "1.0",
+                "build_number": 0,
+                "subdir": testing_config.host_subdir,
+            }
+        )
+    )
+    members = ["lib/a", "lib/b", "info/index.json", "info/files"]
+    tarcheck.check_members("pkg-1.0-0.conda", members, info_dir, testing_config)
+
+    with pytest.raises(Exception, match="info/files"):
+        tarcheck.check_members("pkg-1.0-0.conda", members[1:], info_dir, testing_config)
+    with pytest.raises(Exception, match="version"):
+        tarcheck.check_members("pkg-2.0-0.conda", members, info_dir, testing_config)
@@ -9,6 +9,7 @@ from types import SimpleNamespace
 
 import pytest
 
+import conda_build.source
 from conda_build.source import (
     _ensure_CRLF,
     _ensure_LF,
@@ -172,3 +173,15 @@ def test_crlf_source_crlf_patch(tmp_path, patch_paths, testing_config):
     apply_patch(str(tmp_path), patch_paths.diff, testing_config)
 
     assert patch_paths.modification.read_bytes() == b"43770\r\n"
+
+
+def test_patch_dry_run_after_analysis(tmp_path, patch_paths, testing_config, mocker):
+    check_call_env = mocker.spy(conda_build.source, "check_call_env")
+
+    apply_patch(str(tmp_path), patch_paths.diff, testing_config)
+
+    # patch is the judge of whether the patch applies, not the analysis
+    (dry_run, _), (apply, _) = check_call_env.call_args_list
+    assert "--dry-run" in dry_run[0]
+    assert "--dry-run" not in apply[0]
+    assert patch_paths.modification.read_text() == "43770\n"
@@ -0,0 +1,180 @@
+# Copyright (C) 2014 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+from __future__ import annotations
+
+from textwrap import dedent
+
+import pytest
+
+from conda_build.patch_analysis import (
+    PatchAnalysis,
+    UnsupportedPatch,
+    analyze_patch,
+    parse_patch,
+)
+
+SOURCE = "".join(f"line {i}\n" for i in range(1, 21))
+
+PATCH = dedent(
+    """\
+    diff --git a/src/file.txt b/src/file.txt
+    index 0000000..1111111 100644
+    --- a/src/file.txt
+    +++ b/src/file.txt
+    @@ -4,7 +4,7 @@
+     line 4
+     line 5
+     line 6
+    -line 7
+    +line seven
+     line 8
+     line 9
+     line 10
+    """
+)
+
+
+@pytest.fixture
+def src_dir(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "file.txt").write_text(SOURCE)
+    return tmp_path
+
+
+def write_patch(tmp_path, text, newline="\n"):
+    path = tmp_path / "test.patch"
+    path.write_bytes(text.replace("\n", newline).encode())
+    return path
+
+
+def test_parse_patch():
+    (file_patch,) = parse_patch(PATCH.encode())
+    assert file_patch.old_path == "a/src/file.txt"
+    assert file_patch.new_path == "b/src/file.txt"
+    (hunk,) = file_patch.hunks
+    assert (hunk.old_start, hunk.new_start) == (4, 4)
+    assert hunk.old[3] == b"line 7\n"
+    assert hunk.new[3] == b"line seven\n"
+    assert (hunk.leading_context, hunk.trailing_context) == (3, 3)
+
+
+def test_parse_patch_no_newline_at_end_of_file():
+    (file_patch,) = parse_patch(
+        dedent(
+            """\
+            --- a/file.txt
+            +++ b/file.txt
+            @@ -1 +1 @@
+            -old
+            \\ No newline at end of file
+            +new
+            """
+        ).encode()
+    )
+    assert file_patch.hunks[0].old == [b"old"]
+    assert file_patch.hunks[0].new == [b"new\n"]
+
+
+def test_parse_patch_binary():
+    with pytest.raises(UnsupportedPatch):
+        parse_patch(b"--- a/x\n+++ b/x\nGIT binary patch\nliteral 0\n")
+
+
+def test_analyze_patch(tmp_path, src_dir):
+    path = write_patch(tmp_path, PATCH)
+    assert analyze_patch(path, src_dir, [1]) == PatchAnalysis(
+        level=1,
+        format="native",
+        applicable=True,
+        reversible=True,
+        offsets=False,
+        fuzzy=False,
+    )
+    # the source is not changed
+    assert (src_dir / "src" / "file.txt").read_text() == SOURCE
+
+
+def test_analyze_patch_strip_level(tmp_path, src_dir):
+    path = write_patch(tmp_path, PATCH)
+    assert analyze_patch(path, src_dir, [0, 1, 2]).level == 1
+    assert not analyze_patch(path, src_dir, [0, 2]).applicable
+
+
+@pytest.mark.parametrize(
+    "source,patch,format",
+    [
+        ("\n", "\n", "native"),
+        ("\n", "\r\n", "lf"),
+        ("\r\n", "\n", "crlf"),
+        ("\r\n", "\r\n", "native"),
+    ],
+)
+def test_analyze_patch_line_endings(tmp_path, src_dir, source, patch, format):
+    (src_dir / "src" / "file.txt").write_bytes(SOURCE.replace("\n", source).encode())
+    path = write_patch(tmp_path, PATCH, patch)
+    analysis = analyze_patch(path, src_dir, [1])
+    assert analysis.applicable
+    assert analysis.format == format
+
+
+def test_analyze_patch_offsets_and_fuzz(tmp_path, src_dir):
+    (src_dir / "src" / "file.txt").write_text("new line\n" + SOURCE)
+    analysis = analyze_patch(write_patch(tmp_path, PATCH), src_dir, [1])
+    assert analysis.applicable
+    assert analysis.offsets
+    assert not analysis.fuzzy
+
+    (src_dir / "src" / "file.txt").write_text(SOURCE.replace("line 4\n", "line 4'\n"))
+    analysis = analyze_patch(write_patch(tmp_path, PATCH), src_dir, [1])
+    assert analysis.applicable
+    assert analysis.fuzzy
+
+
+def test_analyze_patch_already_applied(tmp_path, src_dir):
+    (src_dir / "src" / "file.txt").write_text(SOURCE.replace("line 7", "line seven"))
+    analysis = analyze_patch(write_patch(tmp_path, PATCH), src_dir, [1])
+    assert not analysis.applicable
+    assert not analysis.reversible
+
+
+@pytest.mark.parametrize(
+    "header,level",
+    [
+        ("--- /dev/null\n+++ b/new.txt\n", 1),
+        # plain diffs name the created file on both sides
+        ("--- new.txt\n+++ new.txt\n", 0),
+    ],
+)
+def test_analyze_patch_creation(tmp_path, src_dir, header, level):
+    path = write_patch(tmp_path, header + "@@ -0,0 +1,2 @@\n+hello\n+world\n")
+    analysis = analyze_patch(path, src_dir, [level])
+    assert analysis.applicable
+    assert analysis.reversible
+
+
+def test_analyze_patch_creation_existing(tmp_path, src_dir):
+    path = write_patch(
+        tmp_path, "--- /dev/null\n+++ b/src/file.txt\n@@ -0,0 +1 @@\n+x\n"
+    )
+    assert not analyze_patch(path, src_dir, [1]).applicable
+
+
+def test_analyze_patch_deletion(tmp_path, src_dir):
+    lines = "".join(f"-{line}\n" for line in SOURCE.splitlines())
+    path = write_patch(
+        tmp_path, f"--- a/src/file.txt\n+++ /dev/null\n@@ -1,20 +0,0 @@\n{lines}"
+    )
+    analysis = analyze_patch(path, src_dir, [1])
+    assert analysis.applicable
+    assert analysis.reversible
+
+
+def test_analyze_patch_unsupported(tmp_path, src_dir):
+    path = write_patch(
+        tmp_path,
+        "diff --git a/src/file.txt b/src/moved.txt\n"
+        "similarity index 100%\n"
+        "rename from src/file.txt\n"
+        "rename to src/moved.txt\n",
+    )
+    assert analyze_patch(path, src_dir, [1]) is None
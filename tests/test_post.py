@@ -42,12 +42,57 @@ def test_compile_missing_pyc(testing_workdir):
     assert not os.path.isfile(os.path.join(tmp, add_mangling(bad_file)))
 
 
+def test_compile_missing_pyc_parallel(tmp_path: Path, mocker):
+    py_files = []
+    for i in range(50):
+        (tmp_path / f"mod_{i:03d}.py").write_text("x = 1\n")
+        py_files.append(f"mod_{i:03d}.py")
+    (tmp_path / "bad.py").write_text("def (\n")
+    (tmp_path / "skipped.py").write_text("x = 1\n")
+    spy_call = mocker.spy(post, "call")
+
+    failures = post.compile_missing_pyc(
+        [*py_files, "bad.py", "skipped.py"],
+        cwd=str(tmp_path),
+        python_exe=sys.executable,
+        skip_compile_pyc=["skip*.py"],
+        jobs=4,
+    )
+
+    assert list(failures) == ["bad.py"]
+    assert "SyntaxError" in failures["bad.py"]
+    for name in py_files:
+        assert (tmp_path / add_mangling(name)).is_file()
+    assert not (tmp_path / add_mangling("skipped.py")).exists()
+    # no fallback to chunked py_compile calls
+    assert not spy_call.called
+
+
+def test_compile_missing_pyc_noisy_startup(tmp_path: Path, monkeypatch, mocker):
+    site = tmp_path / "site"
+    site.mkdir()
+    # lines a .pth file or sitecustomize might print when the interpreter starts
+    (site / "sitecustomize.py").write_text("print('hello')\nprint('[1, 2]')\n")
+    monkeypatch.setenv("PYTHONPATH", str(site))
+    (tmp_path / "mod.py").write_text("x = 1\n")
+    spy_call = mocker.spy(post, "call")
+
+    failures = post.compile_missing_pyc(
+        ["mod.py"], cwd=str(tmp_path), python_exe=sys.executable
+    )
+
+    assert not failures
+    assert (tmp_path / add_mangling("mod.py")).is_file()
+    assert not spy_call.called
+
+
 def test_compile_missing_pyc_chunking(tmp_path: Path, monkeypatch, mocker):
     """
     Regression test for the command-line-too-long bug fixed in PR #5780.
 
-    compile_missing_pyc() uses chunks() to split the file list into groups that
-    respect MAX_CHUNK_SIZE.  This test verifies that:
+    When the parallel compile worker cannot run, compile_missing_pyc() falls back
+    to chunks() to split the file list into groups that respect MAX_CHUNK_SIZE.
+    This test verifies that:
       1. All .py files are compiled even when the limit forces multiple batches.
       2. The limit is actually respected: no single call receives more arguments
          than the limit allows.
@@ -74,6 +119,10 @@ def test_compile_missing_pyc_chunking(tmp_path: Path, monkeypatch, mocker):
     small_limit = prefix_len + file_budget
     monkeypatch.setattr(conda_build.utils, "MAX_CHUNK_SIZE", small_limit)
     monkeypatch.setattr(post, "MAX_CHUNK_SIZE", small_limit)
+    broken_script = tmp_path / "broken" / "_compile_pyc.py"
+    broken_script.parent.mkdir()
+    broken_script.write_text("raise SystemExit(1)\n")
+    monkeypatch.setattr(post, "COMPILE_PYC_SCRIPT", str(broken_script))
 
     spy_call = mocker.spy(post, "call")
 
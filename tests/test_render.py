@@ -11,12 +11,16 @@ from uuid import uuid4
 
 import pytest
 
+from conda_build import api
 from conda_build.api import get_output_file_paths
 from conda_build.render import (
     _simplify_to_exact_constraints,
+    bldpkg_path,
+    filename_needs_solve,
     find_pkg_dir_or_file_in_pkgs_dirs,
     get_pin_from_build,
     open_recipe,
+    plan_output_paths,
     render_recipe,
 )
 from conda_build.utils import CONDA_PACKAGE_EXTENSION_V1, on_linux
@@ -188,3 +192,120 @@ python:
     render_recipe(recipe, config=testing_config)
 
     assert "No numpy version specified" not in caplog.text
+
+
+def write_recipe(
+    path: Path, name: str, build: str = "", requirements: str = ""
+) -> Path:
+    path.mkdir(parents=True)
+    (path / "meta.yaml").write_text(
+        f"package:\n  name: {name}\n  version: 1.0\n"
+        f"build:\n  number: 3\n{build}"
+        f"requirements:\n  run:\n    - __glibc >=2.17\n{requirements}",
+        encoding="utf-8",
+    )
+    return path
+
+
+@pytest.mark.parametrize(
+    "build,requirements,filename_hashing,expected",
+    [
+        pytest.param("", "", True, False, id="no-deps"),
+        pytest.param("", "  host:\n    - zlib\n", True, True, id="host"),
+        pytest.param("", "  host:\n    - zlib\n", False, True, id="no-hashing"),
+        pytest.param(
+            "  string: custom_{{ PKG_BUILDNUM }}\n",
+            "  build:\n    - zlib\n",
+            True,
+            False,
+            id="manual-string",
+        ),
+        pytest.param(
+            "  string: custom_h{{ PKG_HASH }}_{{ PKG_BUILDNUM }}\n",
+            "  build:\n    - zlib\n",
+            True,
+            True,
+            id="manual-string-hash",
+        ),
+        pytest.param(
+            "  ignore_run_exports_from:\n    - zlib\n",
+            "  host:\n    - zlib\n",
+            True,
+            True,
+            id="ignored",
+        ),
+    ],
+)
+def test_filename_needs_solve(
+    tmp_path: Path,
+    testing_config: Config,
+    build: str,
+    requirements: str,
+    filename_hashing: bool,
+    expected: bool,
+):
+    testing_config.filename_hashing = filename_hashing
+    recipe = write_recipe(tmp_path / "recipe", "pkg", build, requirements)
+    (metadata, _, _), *_ = api.render(
+        recipe, config=testing_config, finalize=False, bypass_env_check=True
+    )
+    assert filename_needs_solve(metadata) is expected
+
+
+def test_plan_output_paths(tmp_path: Path, testing_config: Config, mocker):
+    solve = mocker.patch(
+        "conda_build.render.get_env_dependencies",
+        return_value=(["zlib 1.3.1 h0_0"], [], None),
+    )
+    plain = write_recipe(tmp_path / "plain", "plain")
+    custom = write_recipe(
+        tmp_path / "custom",
+        "custom",
+        "  string: custom_{{ PKG_BUILDNUM }}\n",
+        "  host:\n    - zlib\n",
+    )
+    hashed = write_recipe(
+        tmp_path / "hashed", "hashed", requirements="  host:\n    - zlib\n"
+    )
+
+    paths = plan_output_paths([plain, custom], config=testing_config)
+    # neither filename depends on a solved environment
+    solve.assert_not_called()
+    assert [os.path.basename(path) for path in paths] == [
+        "custom-1.0-custom_3.conda",
+        f"plain-1.0-{api.render(plain, config=testing_config)[0][0].build_id()}.conda",
+    ]
+    assert re.search(r"plain-1\.0-h[0-9a-f]{7}_3", paths[1])
+
+    # the hash of this one may pick up run_exports of zlib
+    (path,) = get_output_file_paths(hashed, config=testing_config)
+    assert solve.called
+    assert re.search(r"hashed-1\.0-h[0-9a-f]{7}_3", path)
+
+
+@pytest.mark.parametrize("filename_hashing", [True, False])
+def test_plan_output_paths_run_exports(
+    tmp_path: Path, testing_config: Config, mocker, filename_hashing: bool
+):
+    testing_config.filename_hashing = filename_hashing
+    mocker.patch(
+        "conda_build.render.get_env_dependencies",
+        return_value=(["perl 5.32.1 h0_perl5"], [], None),
+    )
+    mocker.patch(
+        "conda_build.render.get_upstream_pins",
+        side_effect=lambda m, precs, env: (
+            {"weak": ["perl >=5.32.1,<5.33.0a0 *_perl5"]} if env == "host" else {}
+        ),
+    )
+    recipe = write_recipe(
+        tmp_path / "recipe", "pkg", requirements="  host:\n    - perl\n"
+    )
+
+    # the pl5321 prefix only shows up once run_exports add perl to run
+    (path,) = plan_output_paths([recipe], config=testing_config)
+    assert "-pl5321" in path
+    assert [path] == [
+        bldpkg_path(metadata)
+        for metadata, _, _ in api.render(recipe, config=testing_config, finalize=True)
+    ]
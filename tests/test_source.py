@@ -209,3 +209,109 @@ def test_empty_archive(tmp_path, testing_metadata):
 
     # Just make sure that it doesn't fail
     source.provide(testing_metadata)
+
+
+def test_download_to_cache_verifies_all_hashes(tmp_path):
+    archive = os.path.join(thisdir, "archives", "a.tar.bz2")
+    source_dict = {
+        "url": archive,
+        "md5": compute_sum(archive, "md5"),
+        "sha256": compute_sum(archive, "sha256"),
+    }
+    path, unhashed_fn = download_to_cache(str(tmp_path), "", source_dict)
+    assert unhashed_fn == "a.tar.bz2"
+    assert compute_sum(path, "sha256") == source_dict["sha256"]
+    assert not os.path.exists(f"{path}.partial")
+
+    # a mismatch in any declared hash removes the cached file
+    with TemporaryDirectory() as cache:
+        with pytest.raises(RuntimeError, match="SHA256 mismatch"):
+            download_to_cache(cache, "", {**source_dict, "sha256": "0" * 64})
+        assert not os.listdir(cache)
+
+
+def test_download_to_cache_without_hash(tmp_path):
+    archive = os.path.join(thisdir, "archives", "a.tar.bz2")
+    path, _ = download_to_cache(str(tmp_path), "", {"url": archive})
+    assert os.path.basename(path) == source.append_hash_to_fn(
+        "a.tar.bz2", compute_sum(archive, "sha256")
+    )
+
+
+def test_unpack_hoists_without_staging_leftovers(testing_metadata):
+    testing_metadata.meta["source"] = {
+        "url": os.path.join(thisdir, "archives", "subfolder.tar.bz2")
+    }
+    source.provide(testing_metadata)
+    assert os.listdir(testing_metadata.config.work_dir) == ["abc"]
+
+
+def test_git_mirror_skips_fetch_for_known_commit(tmp_path, mocker):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    git = ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"]
+    subprocess.check_call([*git, "init", "-q"], cwd=repo)
+    (repo / "README").write_text("hello")
+    subprocess.check_call([*git, "add", "README"], cwd=repo)
+    subprocess.check_call([*git, "commit", "-q", "-m", "init"], cwd=repo)
+    commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=repo, text=True)
+
+    source_dict = {"git_url": str(repo), "git_rev": commit.strip()}
+    git_cache = str(tmp_path / "git_cache")
+    source.git_source(source_dict, git_cache, str(tmp_path / "src1"), verbose=False)
+
+    # a new process would not know about the earlier fetch, only the mirror contents
+    mocker.patch.object(source, "_fetched_git_mirrors", set())
+    check_call_env = mocker.spy(source, "check_call_env")
+    source.git_source(source_dict, git_cache, str(tmp_path / "src2"), verbose=False)
+    assert (tmp_path / "src2" / "README").read_text() == "hello"
+    assert not any("fetch" in call.args[0] for call in check_call_env.call_args_list)
+
+
+def test_git_mirror_fetches_each_ref(tmp_path, mocker):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    git = ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"]
+    subprocess.check_call([*git, "init", "-q"], cwd=repo)
+    git_cache = str(tmp_path / "git_cache")
+    mocker.patch.object(source, "_fetched_git_mirrors", set())
+    for i, text in enumerate(("hello", "world")):
+        (repo / "README").write_text(text)
+        subprocess.check_call([*git, "add", "README"], cwd=repo)
+        subprocess.check_call([*git, "commit", "-q", "-m", text], cwd=repo)
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=repo, text=True
+        )
+
+        # the commit made after the mirror was cloned is fetched in the same process
+        source_dict = {"git_url": str(repo), "git_rev": commit.strip()}
+        source.git_source(
+            source_dict, git_cache, str(tmp_path / f"src{i}"), verbose=False
+        )
+        assert (tmp_path / f"src{i}" / "README").read_text() == text
+
+
+@pytest.mark.parametrize("locking", [True, False])
+def test_git_mirror_lock(tmp_path, mocker, locking):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    git = ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"]
+    subprocess.check_call([*git, "init", "-q"], cwd=repo)
+    (repo / "README").write_text("hello")
+    subprocess.check_call([*git, "add", "README"], cwd=repo)
+    subprocess.check_call([*git, "commit", "-q", "-m", "init"], cwd=repo)
+
+    get_lock = mocker.spy(source, "get_lock")
+    source.git_source(
+        {"git_url": str(repo)},
+        str(tmp_path / "git_cache"),
+        str(tmp_path / "src"),
+        verbose=False,
+        timeout=42,
+        locking=locking,
+    )
+    assert (tmp_path / "src" / "README").read_text() == "hello"
+    if locking:
+        get_lock.assert_called_once_with(mocker.ANY, timeout=42)
+    else:
+        get_lock.assert_not_called()
@@ -0,0 +1,126 @@
+# Copyright (C) 2014 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+from __future__ import annotations
+
+import io
+import json
+import tarfile
+from typing import TYPE_CHECKING
+
+import pytest
+from conda_package_handling.api import create
+
+from conda_build import tarcheck
+from conda_build.tarcheck import TarCheck, read_info
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from conda_build.config import Config
+
+
+def make_package(
+    tmp_path: Path,
+    config: Config,
+    ext: str,
+    listed: list[str] | None = None,
+    subdir: str | None = None,
+) -> str:
+    prefix = tmp_path / "prefix"
+    (prefix / "lib").mkdir(parents=True)
+    (prefix / "info").mkdir()
+    files = ["lib/a", "lib/b"]
+    for file in files:
+        (prefix / file).write_text(file)
+    (prefix / "info" / "files").write_text(
+        "".join(f"{file}\n" for file in (files if listed is None else listed))
+    )
+    (prefix / "info" / "index.json").write_text(
+        json.dumps(
+            {
+                "name": "pkg",
+                "version": "1.0",
+                "build_number": 0,
+                "subdir": subdir or config.host_subdir,
+            }
+        )
+    )
+    (prefix / "info" / "has_prefix").write_text(
+        "/opt/anaconda1anaconda2anaconda3 binary lib/a\n"
+    )
+    info = ["info/files", "info/index.json", "info/has_prefix"]
+    create(str(prefix), info + files, f"pkg-1.0-0{ext}", out_folder=str(tmp_path))
+    return str(tmp_path / f"pkg-1.0-0{ext}")
+
+
+@pytest.mark.parametrize("ext", [".tar.bz2", ".conda"])
+def test_tarcheck(tmp_path: Path, testing_config: Config, ext: str):
+    path = make_package(tmp_path, testing_config, ext)
+    tarcheck.check_all(path, testing_config)
+
+    with TarCheck(path, testing_config) as tar:
+        assert sorted(tar.info) == ["info/files", "info/has_prefix", "info/index.json"]
+        assert tar.prefix_length() == len("/opt/anaconda1anaconda2anaconda3")
+        assert {"lib/a", "lib/b", "info/files"} <= tar.paths
+
+
+@pytest.mark.parametrize("ext", [".tar.bz2", ".conda"])
+def test_read_info_stops_after_info(
+    tmp_path: Path, testing_config: Config, ext, mocker
+):
+    path = make_package(tmp_path, testing_config, ext)
+    entries = []
+    components = tarcheck._components
+
+    def spy(*args):
+        for entry in components(*args):
+            entries.append(entry.pathname)
+            yield entry
+
+    mocker.patch("conda_build.tarcheck._components", spy)
+    assert sorted(read_info(path)) == [
+        "info/files",
+        "info/has_prefix",
+        "info/index.json",
+    ]
+    # at most the first member of pkg is looked at
+    assert len([entry for entry in entries if not entry.startswith("info/")]) <= 1
+
+
+@pytest.mark.parametrize("ext", [".tar.bz2", ".conda"])
+def test_tarcheck_reports_all_violations(
+    tmp_path: Path, testing_config: Config, ext: str
+):
+    path = make_package(
+        tmp_path, testing_config, ext, listed=["lib/a", "lib/c"], subdir="other-64"
+    )
+    violations = TarCheck(path, testing_config).violations()
+    assert violations == [
+        "info/files: 'lib/b' not in info/files",
+        "info/files: 'lib/c' not in tarball",
+        f"Inconsistent subdir in package - index.json expecting {testing_config.host_subdir}, got other-64",
+    ]
+    with pytest.raises(Exception, match="lib/c' not in tarball"):
+        tarcheck.check_all(path, testing_config)
+    with pytest.raises(AssertionError, match="Inconsistent subdir"):
+        TarCheck(path, testing_config).correct_subdir()
+
+
+def test_tarcheck_duplicate_members(tmp_path: Path, testing_config: Config):
+    path = tmp_path / "pkg-1.0-0.tar.bz2"
+    members = {
+        "info/files": b"lib/a\n",
+        "info/index.json": json.dumps(
+            {"name": "pkg", "version": "1.0", "build_number": 0, "subdir": "noarch"}
+        ).encode(),
+        "lib/a": b"a",
+    }
+    with tarfile.open(path, "w:bz2") as tar:
+        for name, data in [*members.items(), ("lib/a", b"b")]:
+            tarinfo = tarfile.TarInfo(name)
+            tarinfo.size = len(data)
+            tar.addfile(tarinfo, io.BytesIO(data))
+
+    with TarCheck(str(path), testing_config) as tar:
+        assert tar.members.count("lib/a") == 2
+        assert tar.violations() == ["info/files: duplicate members"]
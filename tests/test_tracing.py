@@ -0,0 +1,80 @@
+# Copyright (C) 2014 Anaconda, Inc
+# SPDX-License-Identifier: BSD-3-Clause
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING
+
+from conda_build.tracing import (
+    Tracer,
+    argument_attributes,
+    metadata_attributes,
+    traced,
+    tracer,
+)
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def test_nested_spans_written_next_to_stats_file(tmp_path: Path):
+    trace = Tracer(enabled=True)
+    with trace.span("build", output="pkg", variant={"python": "3.12"}):
+        with trace.span("post_process") as child:
+            child.set(files=3)
+
+    chrome_path, jsonl_path = trace.write(tmp_path / "stats.json")
+    assert chrome_path == str(tmp_path / "stats.trace.json")
+    assert jsonl_path == str(tmp_path / "stats.spans.jsonl")
+
+    events = json.loads((tmp_path / "stats.trace.json").read_text())["traceEvents"]
+    assert [event["name"] for event in events] == ["build", "post_process"]
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+    # the output and variant of the enclosing span are inherited
+    assert events[1]["args"]["output"] == "pkg"
+    assert events[1]["args"]["variant"] == {"python": "3.12"}
+    assert events[1]["args"]["files"] == 3
+
+    build, post_process = (
+        json.loads(line) for line in (tmp_path / "stats.spans.jsonl").open()
+    )
+    assert build["parent_span_id"] is None
+    assert post_process["parent_span_id"] == build["span_id"]
+    assert post_process["trace_id"] == build["trace_id"]
+    assert build["start_time_unix_nano"] <= post_process["start_time_unix_nano"]
+    assert post_process["end_time_unix_nano"] <= build["end_time_unix_nano"]
+
+
+def test_traced_binds_arguments():
+    @traced("solve", argument_attributes(env="env"))
+    def solve(prefix, specs, env="host"):
+        return tracer.current().attributes
+
+    tracer.reset(enabled=True)
+    assert solve("/prefix", []) == {"env": "host"}
+    assert solve("/prefix", [], env="build") == {"env": "build"}
+    assert [span.name for span in tracer.spans] == ["solve", "solve"]
+    tracer.reset()
+    assert not tracer.spans
+
+
+def test_disabled_tracer(mocker):
+    attributes = mocker.Mock(return_value={})
+
+    @traced("solve", attributes)
+    def solve():
+        with tracer.span("inner") as inner:
+            inner.set(files=1)
+        return tracer.current()
+
+    tracer.reset()
+    assert solve() is None
+    # neither recorded nor described
+    assert not tracer.spans
+    attributes.assert_not_called()
+
+
+def test_metadata_attributes_survive_exit(mocker):
+    metadata = mocker.Mock()
+    metadata.name.side_effect = SystemExit("cannot render")
+    assert metadata_attributes(metadata) == {}
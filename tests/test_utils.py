@@ -1,8 +1,12 @@
 # Copyright (C) 2014 Anaconda, Inc
 # SPDX-License-Identifier: BSD-3-Clause
+import errno
+import hashlib
 import os
 import subprocess
 import sys
+import tarfile
+import time
 from pathlib import Path
 from typing import NamedTuple
 
@@ -280,6 +284,23 @@ def test_subprocess_stats_call(testing_workdir):
         utils.check_call_env(["bash", "-c", "exit 1"], cwd=testing_workdir)
 
 
+def test_subprocess_stats_sampling(testing_workdir):
+    Path(testing_workdir, "data.bin").write_bytes(b"x" * 1_000_000)
+    stats = {}
+    utils.check_call_env(
+        [sys.executable, "-c", "import time; time.sleep(0.5)"],
+        stats=stats,
+        cwd=testing_workdir,
+        time_int=0.1,
+        disk_time_int=0,
+    )
+    # returns as soon as the process exits instead of after a full sampling interval
+    assert stats["elapsed"] < 2
+    assert stats["disk"] > 0
+    assert stats["rss"] > 0
+    assert stats["processes"] >= 1
+
+
 def test_try_acquire_locks(testing_workdir):
     # Acquiring two unlocked locks should succeed.
     lock1 = filelock.FileLock(os.path.join(testing_workdir, "lock1"))
@@ -481,6 +502,51 @@ def test_prefix_files(tmp_path: Path):
     assert paths == utils.prefix_files(str(prefix))
 
 
+def test_prefix_snapshot(tmp_path: Path, mocker):
+    (prefix := tmp_path / "prefix").mkdir()
+    (prefix / "file1").touch()
+    (dirA := prefix / "dirA").mkdir()
+    (dirA / "file2").write_text("two")
+    (dirB := prefix / "dirB").mkdir()
+    (dirB / "file3").touch()
+    (prefix / "linkA").symlink_to(dirA)
+    # old enough for their mtime to reliably reveal changes
+    for directory in (prefix, dirA, dirB):
+        os.utime(directory, ns=(0, 0))
+
+    snapshot = utils.PrefixSnapshot(prefix)
+    assert snapshot.files == utils.prefix_files(prefix)
+    assert snapshot.stats["dirA/file2"].size == 3
+
+    (dirB / "file4").touch()
+    (dirA / "file2").unlink()
+    (dirA / "file2").write_text("2")
+    scan = mocker.spy(utils.PrefixSnapshot, "_scan")
+    refreshed = snapshot.refresh()
+    # only the directories that changed are listed again
+    assert sorted(call.args[0] for call in scan.call_args_list) == [
+        str(dirA),
+        str(dirB),
+    ]
+    assert refreshed.files == utils.prefix_files(prefix)
+    assert refreshed.diff(snapshot) == ({"dirB/file4"}, set(), {"dirA/file2"})
+    assert snapshot.diff(refreshed) == (set(), {"dirB/file4"}, {"dirA/file2"})
+
+
+def test_prefix_snapshot_forgotten(tmp_path: Path, mocker):
+    mocker.patch.dict(utils._prefix_snapshots, clear=True)
+    (prefix := tmp_path / "prefix").mkdir()
+    (other := tmp_path / "other").mkdir()
+    utils.prefix_snapshot(prefix)
+    utils.prefix_snapshot(other)
+
+    utils.rm_rf(prefix)
+    assert list(utils._prefix_snapshots) == [str(other)]
+
+    utils.forget_prefix_snapshots()
+    assert not utils._prefix_snapshots
+
+
 def test_chunks_empty():
     """chunks() on an empty list returns an empty list."""
     assert utils.chunks([], 100) == []
@@ -586,3 +652,131 @@ def test_create_entry_point(monkeypatch, tmp_path, testing_config, arch):
     )
     assert (path.parent / "example-script.py").is_file()
     assert (path.parent / "example.exe").is_file()
+
+
+def test_compute_sums(tmp_path: Path):
+    path = tmp_path / "file.bin"
+    path.write_bytes(b"conda-build" * 100_000)
+
+    sums = utils.compute_sums(path, ("md5", "sha256", "sha512"))
+    assert sums == {
+        algorithm: hashlib.new(algorithm, path.read_bytes()).hexdigest()
+        for algorithm in ("md5", "sha256", "sha512")
+    }
+
+
+def test_file_info(tmp_path: Path):
+    path = tmp_path / "file.txt"
+    path.write_text("hello")
+
+    info = utils.file_info(path)
+    assert info["size"] == 5
+    assert info["md5"] == hashlib.md5(b"hello").hexdigest()
+    assert info["sha256"] == hashlib.sha256(b"hello").hexdigest()
+
+
+@pytest.mark.parametrize("ext,mode", [(".tar.xz", "w:xz"), (".tar.bz2", "w:bz2")])
+def test_tar_xf(tmp_path: Path, ext: str, mode: str):
+    src = tmp_path / "src"
+    (src / "pkg").mkdir(parents=True)
+    (src / "pkg" / "data.txt").write_text("hello")
+    tarball = tmp_path / f"archive{ext}"
+    with tarfile.open(tarball, mode) as tar:
+        tar.add(src / "pkg", arcname="pkg")
+
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    utils.tar_xf(str(tarball), str(dest))
+    assert (dest / "pkg" / "data.txt").read_text() == "hello"
+
+
+def test_compute_content_hash(tmp_path: Path):
+    unix = tmp_path / "unix"
+    win = tmp_path / "win"
+    for root, newline in ((unix, b"\n"), (win, b"\r\n")):
+        (root / "pkg" / ".git").mkdir(parents=True)
+        (root / "pkg" / "module.py").write_bytes(newline.join([b"a", b"b", b""]))
+        (root / "pkg" / "data.bin").write_bytes(b"\xff\x00\r\n" * 10)
+        (root / "pkg" / ".git" / "HEAD").write_bytes(bytes(root.name, "utf-8"))
+
+    # only the .git contents differ once text line endings are normalized
+    assert utils.compute_content_hash(unix) != utils.compute_content_hash(win)
+    assert utils.compute_content_hash(
+        unix, skip=["pkg/.git/"]
+    ) == utils.compute_content_hash(win, skip=["pkg/.git/"])
+    # skipping only the directory entry still hashes its contents
+    assert utils.compute_content_hash(
+        unix, skip=["pkg/.git"]
+    ) != utils.compute_content_hash(win, skip=["pkg/.git"])
+
+
+def test_compute_content_hash_prefetch_window(tmp_path: Path, mocker):
+    for i in range(20):
+        (tmp_path / f"file{i}").write_bytes(b"x" * 1000 * i)
+    expected = utils.compute_content_hash(tmp_path)
+
+    # a window smaller than the files still hashes all of them, in order
+    mocker.patch.object(utils, "_CONTENT_HASH_PREFETCH_WINDOW", 2500)
+    read = mocker.spy(utils, "_content_hash_file_bytes")
+    assert utils.compute_content_hash(tmp_path) == expected
+    assert read.call_count == 20
+
+
+def test_is_binary_file(tmp_path: Path):
+    text = tmp_path / "text"
+    text.write_bytes(b"#!/bin/sh\n" * 10_000)
+    late_nul = tmp_path / "late_nul"
+    late_nul.write_bytes(b"#!/bin/sh\n" * 10_000 + b"\x00payload")
+    early_nul = tmp_path / "early_nul"
+    early_nul.write_bytes(b"\x7fELF\x02\x01\x01\x00" + b"x" * 100_000)
+
+    assert not utils.is_binary_file(text)
+    assert utils.is_binary_file(late_nul)
+    assert utils.is_binary_file(early_nul)
+
+    # a modified file is classified again
+    text.write_bytes(b"text\x00")
+    assert utils.is_binary_file(text)
+
+
+@pytest.mark.skipif(utils.on_win, reason="rewrites to %VAR% on Windows")
+def test_setup_rewrite_pipe(capsys):
+    w_fd = utils._setup_rewrite_pipe(
+        {"PREFIX": "/opt/prefix", "SRC_DIR": "/opt/prefix/work", "EMPTY": ""}
+    )
+    code = "print('cd /opt/prefix/work && ls /opt/prefix/lib'); print('done')"
+    subprocess.check_call([sys.executable, "-c", code], stdout=w_fd)
+
+    out = ""
+    deadline = time.monotonic() + 10
+    while "done" not in out and time.monotonic() < deadline:
+        time.sleep(0.05)
+        out += capsys.readouterr().out
+    assert out == "cd $SRC_DIR && ls $PREFIX/lib\ndone\n"
+
+
+def test_replace_file(tmp_path: Path, monkeypatch: MonkeyPatch):
+    src = tmp_path / "src" / "pkg-1.0-0.conda"
+    src.parent.mkdir()
+    dst = tmp_path / "dst" / "pkg-1.0-0.conda"
+    dst.parent.mkdir()
+    src.write_text("new")
+    dst.write_text("old")
+    utils.replace_file(src, dst)
+    assert dst.read_text() == "new"
+    assert not src.exists()
+
+    # across filesystems the file is copied next to the destination, then renamed
+    src.write_text("newer")
+    replace = os.replace
+
+    def cross_device_replace(a, b):
+        if Path(a) == src:
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        replace(a, b)
+
+    monkeypatch.setattr(os, "replace", cross_device_replace)
+    utils.replace_file(src, dst)
+    assert dst.read_text() == "newer"
+    assert not src.exists()
+    assert [path.name for path in dst.parent.iterdir()] == [dst.name]